@@ -1,16 +1,18 @@
 """Assetto Corsa app entry points."""
 
-import time
 import ac
 
 try:
-    from . import config, state
-    from .detectors import scan as scan_events
-    from .interest import pick_best_by_interest
+    from . import clock, config, state, spatial, proximity, profiler, logging_utils, event_queue
+    from . import scheduler
+    from . import candidates
+    from .race_order import refresh_order
+    from .gaps import refresh_gaps
+    from .detectors import scan as scan_events, scanned_last_tick, updated_last_scan
+    from .interest import pick_best_by_interest, note_events, update_race_intensity
     from .focus import maybe_focus_event, switch_to
     from .scheduler import (
         schedule_next_switch,
-        should_natural_switch,
         on_switch,
         is_locked,
     )
@@ -45,6 +47,11 @@ def acMain(ac_version):
             ac.addOnClickedListener(state.force_tv_button, force_tv_cam)
         ac.log("[{}] Force TV button added".format(config.APP_NAME))
 
+        # Stage timings when profiling
+        if getattr(config, "PROFILE_STAGES", False):
+            state.profile_label = ac.addLabel(state.app_window, "Profiling…")
+            ac.setPosition(state.profile_label, 10, 95)
+
         # Focus info label: current car and reason
         state.focus_label = ac.addLabel(state.app_window, "Focus: — | Reason: —")
         ac.setPosition(state.focus_label, 10, 130)
@@ -54,13 +61,11 @@ def acMain(ac_version):
         ac.log("[{}] Next switch scheduled".format(config.APP_NAME))
         # Initial focus to leader at race start
         try:
-            now = time.time()
+            now = clock.now()
             state.update_snapshot(now)
             n = state.car_count()
             if n > 0:
-                # Pick highest spline as leader
-                ranks = sorted([(state.spline(c), c) for c in range(n)], reverse=True)
-                leader = ranks[0][1]
+                leader = refresh_order(state).leader
                 if leader >= 0:
                     if switch_to(leader, now, "start_leader"):
                         on_switch(now, "start_leader")
@@ -68,6 +73,9 @@ def acMain(ac_version):
             ac.log("[{}] Initial leader focus failed: {}".format(config.APP_NAME, ex))
 
         update_ui()
+        # Periodic refreshes start on the first director tick
+        scheduler.schedule("ui", clock.now())
+        scheduler.schedule("intensity", clock.now())
         ac.log("[{}] UI initialized".format(config.APP_NAME))
     except Exception as ex:
         ac.log("[{}] Exception in acMain: {}".format(config.APP_NAME, ex))
@@ -76,12 +84,57 @@ def acMain(ac_version):
     return config.APP_NAME
 
 
+# Director loop: time banked from render frames until the next fixed tick
+_tick_accumulator = 0.0
+
+
 def acUpdate(deltaT):
+    """Per-frame entry point; runs the director at ``DIRECTOR_TICK_HZ``.
+
+    Frames in between only bank ``deltaT``, so per-frame cost does not grow
+    with FPS and detector histories get the same sample spacing on every rig.
+    """
+    global _tick_accumulator
+    try:
+        step = 1.0 / max(1.0, getattr(config, "DIRECTOR_TICK_HZ", 30.0))
+        _tick_accumulator += max(0.0, deltaT)
+        if _tick_accumulator < step:
+            return
+        _tick_accumulator -= step
+        if _tick_accumulator >= step:
+            # Fell behind (hitch or FPS below the tick rate). AC state only
+            # changes once per frame, so catching up would resample the same
+            # data; keep the phase and drop the backlog.
+            _tick_accumulator %= step
+        director_tick(clock.now())
+    except Exception as ex:
+        ac.log("[{}] Exception in acUpdate: {}".format(config.APP_NAME, ex))
+        raise
+
+
+def director_tick(now):
+    """One fixed-rate director step: sample, detect, focus, UI.
+
+    Sampling and detection run every tick; the event interrupt, natural
+    cut, race intensity and UI only run when their scheduler timer is due
+    (or, for the interrupt and UI, when something changed this tick).
+    """
     try:
-        now = time.time()
+        prof = profiler.active()
+        if prof:
+            prof.begin_tick()
+        fired = scheduler.due(now)
+        switched = False
 
-        # 1) Update snapshot
+        # 1) Update snapshot, the shared neighbour index, race order and gaps
         state.update_snapshot(now)
+        index = spatial.refresh_index(state, config.CELL_SIZE_M)
+        refresh_order(state)
+        refresh_gaps(state)
+        proximity.update(state, index, now)
+        if prof:
+            prof.mark("snapshot")
+            prof.count("distance_tests", proximity.tests_last_tick())
 
         # 1b) At start lights phase, focus leader once
         try:
@@ -91,39 +144,71 @@ def acUpdate(deltaT):
                     stopped_grid = 0
                     for i in range(n):
                         sp = state.speed_kmh(i)
-                        if sp <= max(2.0, getattr(config, "STOPPED_SPEED_KMH", 1.0) + 1.0) and (not state._in_pit[i]) and (not state._in_pitlane[i]):
+                        if sp <= max(2.0, getattr(config, "STOPPED_SPEED_KMH", 1.0) + 1.0) and (not state.in_pit(i)) and (not state.in_pitlane(i)):
                             stopped_grid += 1
                     if stopped_grid >= max(2, int(0.6 * n)):
-                        ranks = sorted([(state.spline(c), c) for c in range(n)], reverse=True)
-                        leader = ranks[0][1]
+                        leader = refresh_order(state).leader
                         if leader >= 0:
                             if switch_to(leader, now, "start_lights_leader"):
                                 on_switch(now, "start_lights_leader")
                                 state.start_leader_done = True
+                                switched = True
         except Exception as ex:
             ac.log("[{}] Start lights leader focus check failed: {}".format(config.APP_NAME, ex))
+        if prof:
+            prof.mark("start_lights")
 
-        # 2) Detect events
+        # 2) Detect events; advance race intensity when its timer is due
         events = scan_events(state, now)
-
-        # 3) Event interrupt if not locked
-        if state.enabled and (not is_locked(now)) and events:
-            if maybe_focus_event(events, now):
-                on_switch(now, events[0].type)
-                update_ui()
-                return
-
-        # 4) Natural switch
-        if state.enabled and should_natural_switch(now):
-            car = pick_best_by_interest(state, now)
-            if car >= 0:
-                if switch_to(car, now, "natural"):
-                    on_switch(now, "natural")
-
-        # 5) UI
-        update_ui()
+        event_queue.push(events, now)
+        event_queue.update(updated_last_scan())
+        note_events(len(events), now)
+        if "intensity" in fired:
+            update_race_intensity(state, now)
+            scheduler.every("intensity", now, getattr(config, "INTENSITY_REFRESH_HZ", 10.0))
+        if prof:
+            prof.mark("detect")
+            prof.count("cars_scanned", scanned_last_tick())
+            prof.count("timers_fired", len(fired))
+
+        # 3) Event interrupt if not locked: best queued, unexpired event.
+        # The queue can only offer something new when events arrived or the
+        # lock released.
+        interrupted = False
+        if state.enabled and (events or "unlock" in fired) and (not is_locked(now)):
+            ev = maybe_focus_event(now)
+            if ev is not None:
+                on_switch(now, ev.type)
+                interrupted = switched = True
+        if prof:
+            prof.mark("event")
+
+        # 4) Natural switch: candidates are kept warm every tick, so the
+        # switch itself only reads the best of them
+        candidates.update(state, now)
+        if "natural" in fired and not interrupted and state.enabled:
+            car = candidates.best(state)
+            if car < 0 and not candidates.top():
+                car = pick_best_by_interest(state, now)
+            if car >= 0 and switch_to(car, now, "natural"):
+                on_switch(now, "natural")
+                switched = True
+            else:
+                # Nothing to cut to yet: try again next tick
+                scheduler.schedule("natural", now)
+        if prof:
+            prof.mark("natural")
+
+        # 5) UI, at UI_REFRESH_HZ and right after a cut
+        if switched or "ui" in fired:
+            update_ui()
+            scheduler.every("ui", now, getattr(config, "UI_REFRESH_HZ", 10.0))
+        logging_utils.flush(now)
+        if prof:
+            prof.mark("ui")
+            prof.end_tick(now)
     except Exception as ex:
-        ac.log("[{}] Exception in acUpdate: {}".format(config.APP_NAME, ex))
+        ac.log("[{}] Exception in director tick: {}".format(config.APP_NAME, ex))
         raise
 
 
@@ -132,4 +217,12 @@ def acShutdown():
         ac.log("[{}] acShutdown called".format(config.APP_NAME))
     except Exception:
         pass
+    try:
+        state.stop_recording()
+    except Exception:
+        pass
+    try:
+        logging_utils.shutdown()
+    except Exception:
+        pass
     return
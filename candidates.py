@@ -0,0 +1,91 @@
+"""Natural-cut candidates kept warm between switches.
+
+Interest scores are cached per car and refreshed round-robin on every
+director tick, at least ``CANDIDATE_STEP_CARS`` cars per tick and enough
+to finish a full pass over the field before the scheduler's next natural
+deadline (just the minimum while none is ahead, e.g. when paused). The best ``CANDIDATE_TOP_K`` cars are re-ranked from the cache
+after each refresh, so a natural switch only reads the head of the list
+and the UI can preview the next shot.
+"""
+
+import heapq
+import math
+from array import array
+
+from . import config, interest
+from .scheduler import next_natural_deadline
+
+_scores = array("d")
+_cursor = 0      # next car to refresh
+_pass_left = 0   # cars still to refresh in the current pass
+_top = []        # [(score, car_id)], best first
+_refreshed_last_tick = 0
+
+
+def _resize(n):
+    global _scores, _cursor, _pass_left, _top
+    _scores = array("d", [interest.INACTIVE]) * n
+    _cursor = 0
+    _pass_left = n
+    _top = []
+
+
+def update(st, now):
+    """Refresh the next slice of cached scores and re-rank the top K."""
+    global _cursor, _pass_left, _top, _refreshed_last_tick
+    n = st.car_count()
+    if len(_scores) != n:
+        _resize(n)
+    _refreshed_last_tick = 0
+    if n == 0:
+        return
+
+    if _pass_left <= 0:
+        _pass_left = n
+    step = int(getattr(config, "CANDIDATE_STEP_CARS", 4))
+    deadline = next_natural_deadline()
+    if deadline > now:
+        # Spread what is left of the pass over the ticks before the deadline
+        hz = max(1.0, getattr(config, "DIRECTOR_TICK_HZ", 30.0))
+        ticks_left = max(1, int(math.floor((deadline - now) * hz)))
+        step = max(step, int(math.ceil(_pass_left / float(ticks_left))))
+    step = max(1, min(step, _pass_left))
+
+    start = _cursor
+    if start + step <= n:
+        cars = range(start, start + step)
+    else:
+        cars = list(range(start, n)) + list(range(0, start + step - n))
+    interest.score_cars(st, now, cars, _scores)
+    _cursor = (start + step) % n
+    _pass_left -= step
+    _refreshed_last_tick = step
+
+    k = max(1, int(getattr(config, "CANDIDATE_TOP_K", 5)))
+    inactive = interest.INACTIVE
+    best = heapq.nsmallest(k, ((-s, c) for c, s in enumerate(_scores) if s != inactive))
+    _top = [(-neg, c) for neg, c in best]
+
+
+def top():
+    """Best cached candidates as ``(score, car_id)``, best first."""
+    return _top
+
+
+def best(st):
+    """Best candidate other than the car on screen that can still be
+    picked, or -1 if there is none."""
+    current = st.current_focus()
+    for _, c in _top:
+        if c != current and st.active(c):
+            return c
+    return -1
+
+
+def next_up(st):
+    """The shot ``best`` would cut to next (UI preview), or -1."""
+    return best(st)
+
+
+def refreshed_last_tick():
+    return _refreshed_last_tick
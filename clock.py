@@ -0,0 +1,15 @@
+"""Time source for the director; replaceable for headless runs."""
+
+import time
+
+_source = time.time
+
+
+def now():
+    return _source()
+
+
+def set_source(fn):
+    """Use ``fn()`` as the clock (``None`` restores wall time)."""
+    global _source
+    _source = fn if fn is not None else time.time
@@ -37,6 +37,15 @@ OFFTRACK_AVG_YAW_MIN_RAD_S = 0.30
 OFFTRACK_CONFIRM_WINDOW_S = 0.3
 OFFTRACK_COOLDOWN_S = 2.0
 
+# Spin detection: low speed and high yaw rate, confirmed on a second tick.
+# One event per incident: a spin resuming within SPIN_MERGE_GAP_S updates
+# it, and a new one needs SPIN_COOLDOWN_S after the last spinning tick.
+SPIN_MAX_SPEED_KMH = 35.0
+SPIN_MIN_YAW_RAD_S = 1.5
+SPIN_CONFIRM_WINDOW_S = 0.2
+SPIN_MERGE_GAP_S = 1.0
+SPIN_COOLDOWN_S = 4.0
+
 # Scheduling
 DWELL_BASE = 10.0
 JITTER_RANGE = 3.0
@@ -46,11 +55,16 @@ LOW_INTENSITY_BONUS = 0.6  # extra fraction of base at intensity=0
 HIGH_INTENSITY_SHORTEN_MAX = 0.20  # up to -20% at intensity=1
 
 # Race intensity
+# Time gap (s) along the track below which two cars are battling; used by
+# intensity and proximity when GAP_MODEL is on and the track length is known
+GAP_MODEL = True
 BATTLE_GAP_TIME = 1.0
 BATTLE_RADIUS_M = 24.0
 INTENSITY_WINDOW = 30.0
 ALPHA_BATTLE = 0.7
 EMA_TAU = 6.0
+# Detector events (decayed over INTENSITY_WINDOW) for full event activity
+EVENT_ACTIVITY_FULL = 3.0
 
 # Proximity
 PROX_RADIUS_M = 22.0
@@ -77,11 +91,81 @@ W_LEADER = 0.70
 W_RARITY = 0.50
 W_HYST = 0.80
 W_PIT = 0.60
+# Pit cameo: full bonus on a pit transition (entering the lane, leaving the
+# box, rejoining the track), fading to zero over this many seconds
+PIT_CAMEO_S = 8.0
+# Rank the field with NumPy (when importable) from this many cars up; below
+# that its per-call overhead outweighs the pure-Python loop (bench --rank:
+# even at 30-40 cars, NumPy about 2x faster at 120-200)
+INTEREST_NUMPY_MIN_CARS = 40
+# Natural-cut candidates (candidates.py): interest scores refreshed at least
+# this many cars per tick (more when needed to cover the field before the
+# next natural cut), and how many of the best are kept ranked
+CANDIDATE_STEP_CARS = 4
+CANDIDATE_TOP_K = 5
+# Interest terms (terms.py) recompute when their inputs change, at most once
+# per period in seconds (a focus change refreshes at once). Defaults:
+# proximity 0.2 (5 Hz), leader 0.1, rarity 0.5, hysteresis 0.25, pit 0.25.
+# Override per term name, e.g. {"proximity": 0.5}; 0 = every tick.
+TERM_PERIODS = {}
+
+# Director loop
+# Detection, scoring and UI run at this fixed rate whatever the render FPS;
+# frames in between only accumulate deltaT.
+DIRECTOR_TICK_HZ = 30.0
+# Work the director only does when its scheduler timer is due: UI label
+# refresh (also right after a cut) and the race intensity EMA
+UI_REFRESH_HZ = 10.0
+INTENSITY_REFRESH_HZ = 10.0
 
 # Performance budgets
+# Per-car telemetry read by state.update_snapshot each tick; drop groups
+# nothing consumes to skip their AC calls.
+# Available: "pos", "speed", "velocity", "spline", "lap", "pit"
+SNAPSHOT_FIELDS = ("pos", "speed", "velocity", "spline", "lap", "pit")
+# Refresh rate per field group in Hz; 0 reads every tick. Rate-limited
+# groups are read round-robin over the field (a slice of cars per tick).
+# "lap" is always read in the same slice as "spline", at the faster rate.
+SNAPSHOT_POLL_HZ = {
+    "pos": 0.0,
+    "speed": 0.0,
+    "velocity": 0.0,
+    "spline": 20.0,
+    "lap": 20.0,
+    "pit": 4.0,
+}
+# Samples kept per car in the speed/yaw histories; must cover the longest
+# detector window (OFFTRACK_WINDOW_S) at DIRECTOR_TICK_HZ to see it whole.
+HISTORY_SAMPLES = 24
 PROX_STEP_CARS = 6
 CELL_SIZE_M = 22.0
+# Neighbour index: "grid" hashes cars into CELL_SIZE_M cells in XZ; "spline"
+# sorts them along the track and pairs cars within SPLINE_WINDOW_M of lap
+# distance (needs the track length, else the grid is used)
+SPATIAL_BACKEND = "grid"
+SPLINE_WINDOW_M = 30.0
 MAX_DISTANCE_TESTS_PER_SEC = 100
 
+# Stage profiling (profiler.py): time each director stage and count cars
+# scanned / distance tests. Off costs one flag check per tick.
+PROFILE_STAGES = False
+PROFILE_WINDOW = 300  # ticks kept for p50/p95/max
+PROFILE_LOG_INTERVAL_S = 10.0  # summary to the AC log; 0 disables
+
+# Logging (logging_utils): detector, focus and scheduler messages below
+# LOG_LEVEL ("debug", "info", "warn") are skipped unformatted; a message
+# family logs at most once per LOG_RATE_LIMIT_S and lines are written in
+# batches every LOG_FLUSH_INTERVAL_S.
+LOG_LEVEL = "info"
+LOG_RATE_LIMIT_S = 1.0
+LOG_BUFFER_LINES = 256
+LOG_FLUSH_INTERVAL_S = 1.0
+LOG_FILE = ""  # empty: AC's log; else a file (relative to the app folder)
+
+# Telemetry recording (replayable with recorder.ReplayReader)
+RECORD_TELEMETRY = False
+RECORD_DIR = ""  # empty: "recordings" inside the app folder
+RECORD_FLUSH_BYTES = 262144
+
 # App limits
 MIN_CARS_REQUIRED = 1
@@ -1,12 +1,21 @@
-"""Event detectors: collision, spin, offtrack, pit_entry."""
+"""Event detectors: collision, spin, offtrack, pit_entry.
 
-import time
-from . import config, state
+Detection is split in two: per-car features (speed deltas, yaw) are read
+from the live histories by ``scan``; ``DetectorState.evaluate`` turns
+features into events with confirmation windows and cooldowns. Offline
+tools compute the same features in batch and reuse ``evaluate`` so they
+match the live detector exactly. Pit entries come from the pit tracker in
+``state`` and fire once per entry.
+"""
+
+from . import config
 from . import spatial
-from .logging_utils import log
+from .logging_utils import info
 
 
 class Event(object):
+    __slots__ = ("car_id", "type", "severity", "t_expires")
+
     def __init__(self, car_id, etype, severity, t_expires):
         self.car_id = car_id
         self.type = etype
@@ -14,222 +23,449 @@ class Event(object):
         self.t_expires = t_expires
 
 
-# Cooldowns to avoid repeat triggers per car
-_last_event_t = {
-    "collision": {},  # car_id -> t
-    "offtrack": {},
-}
+# priority: collision > spin > offtrack > pit_entry
+PRIORITY = {"collision": 0, "spin": 1, "offtrack": 2, "pit_entry": 3}
 
+# Tunables read by the detectors, with fallbacks for older configs
+THRESHOLD_DEFAULTS = (
+    ("IGNORE_STOPPED_CARS", True),
+    ("STOPPED_SPEED_KMH", 1.0),
+    ("COLLISION_WINDOW_S", 0.25),
+    ("COLLISION_MIN_DT_S", 0.18),
+    ("COLLISION_MIN_DROP_KMH", 28.0),
+    ("COLLISION_MIN_PRE_SPEED_KMH", 70.0),
+    ("COLLISION_MIN_DROP_RATIO", 0.3),
+    ("COLLISION_MIN_DECEL_KMH_S", 160.0),
+    ("COLLISION_MAX_POST_SPEED_KMH", 55.0),
+    ("COLLISION_NEAR_RADIUS_M", 7.0),
+    ("COLLISION_CONFIRM_WINDOW_S", 0.2),
+    ("COLLISION_COOLDOWN_S", 2.0),
+    ("OFFTRACK_WINDOW_S", 0.6),
+    ("OFFTRACK_MIN_DROP_KMH", 35.0),
+    ("OFFTRACK_MIN_PRE_SPEED_KMH", 85.0),
+    ("OFFTRACK_MIN_NOW_SPEED_KMH", 8.0),
+    ("OFFTRACK_MAX_NOW_SPEED_KMH", 100.0),
+    ("OFFTRACK_MIN_DROP_RATIO", 0.25),
+    ("OFFTRACK_MAX_DROP_RATIO", 0.65),
+    ("OFFTRACK_YAW_MIN_RAD_S", 0.25),
+    ("OFFTRACK_YAW_MAX_RAD_S", 1.2),
+    ("OFFTRACK_AVG_YAW_MIN_RAD_S", 0.25),
+    ("OFFTRACK_CONFIRM_WINDOW_S", 0.3),
+    ("OFFTRACK_COOLDOWN_S", 2.0),
+    ("SPIN_MAX_SPEED_KMH", 35.0),
+    ("SPIN_MIN_YAW_RAD_S", 1.5),
+    ("SPIN_CONFIRM_WINDOW_S", 0.2),
+    ("SPIN_MERGE_GAP_S", 1.0),
+    ("SPIN_COOLDOWN_S", 4.0),
+)
 
-def _cooldown_ok(etype, car_id, now):
-    cd = 0.0
-    if etype == "collision":
-        cd = getattr(config, "COLLISION_COOLDOWN_S", 2.0)
-    elif etype == "offtrack":
-        cd = getattr(config, "OFFTRACK_COOLDOWN_S", 2.0)
-    last = _last_event_t.get(etype, {}).get(car_id, 0.0)
-    return (now - last) >= cd
 
+class Thresholds(object):
+    """Detector tunables from ``config``; ``overrides`` (name -> value) win."""
 
-def _mark_event(etype, car_id, now):
-    try:
-        _last_event_t.setdefault(etype, {})[car_id] = now
-    except Exception:
-        pass
+    __slots__ = tuple(name for name, _ in THRESHOLD_DEFAULTS)
 
+    def __init__(self, overrides=None):
+        overrides = overrides or {}
+        for name, default in THRESHOLD_DEFAULTS:
+            if name in overrides:
+                value = overrides[name]
+            else:
+                value = getattr(config, name, default)
+            setattr(self, name, value)
 
-def _recent_delta_speed(i, window):
-    hist = state.speed_hist(i)
-    if len(hist) < 2:
-        return 0.0, 0.0, 0.0, 0.0
-    t_now = hist[-1][0]
-    s_now = hist[-1][1]
-    # find sample older than window
-    s_then = s_now
-    t_then = t_now
-    for k in range(len(hist) - 2, -1, -1):
-        t, s = hist[k]
-        if t_now - t >= window:
-            s_then = s
-            t_then = t
-            break
-        s_then = s
-        t_then = t
-    dt = max(0.0001, t_now - t_then)
-    return (s_then - s_now), dt, s_then, s_now
+    def yaw_avg_window(self):
+        return min(0.5, self.OFFTRACK_WINDOW_S)
 
 
-def _recent_yaw_rate(i):
-    hist = state.yaw_hist(i)
-    if len(hist) == 0:
-        return 0.0
-    return hist[-1][1]
+class CarFeatures(object):
+    """Per-car detector inputs for one tick.
 
+    ``drop``/``dt``/``spre``/``snow`` describe the speed change over
+    ``COLLISION_WINDOW_S``, the ``*2`` set over ``OFFTRACK_WINDOW_S``.
+    """
 
-def _avg_abs_yaw(i, window):
-    hist = state.yaw_hist(i)
-    if not hist:
-        return 0.0
-    t_now = hist[-1][0]
-    t_min = t_now - window
-    s = 0.0
-    k = 0
-    for t, y in reversed(hist):
-        if t < t_min:
-            break
-        s += abs(y)
-        k += 1
-    if k == 0:
-        return abs(hist[-1][1])
-    return s / float(k)
-
-
-def _pit_transition(i):
-    # Approximate pit_entry: in_pitlane or in_pit transitions
-    # Heuristic: if current is True and last 1-2 samples were False
-    # We reuse speed history timestamps as we do not track pit flags history explicitly
-    # Keep simple: trigger when entering pitlane now and speed small
-    try:
-        in_lane = state._in_pitlane[i]
-        in_pit = state._in_pit[i]
-    except Exception:
-        return False
-    if not in_lane and not in_pit:
-        return False
-    sp = state.speed_kmh(i)
-    return sp < 60.0
+    __slots__ = (
+        "sp", "yaw", "yaw_avg", "in_pit", "in_lane",
+        "drop", "dt", "spre", "snow",
+        "drop2", "dt2", "spre2", "snow2",
+    )
 
+    def __init__(self):
+        self.sp = 0.0
+        self.yaw = 0.0
+        self.yaw_avg = 0.0
+        self.in_pit = False
+        self.in_lane = False
+        self.drop = self.dt = self.spre = self.snow = 0.0
+        self.drop2 = self.dt2 = self.spre2 = self.snow2 = 0.0
 
-def scan(st, now):
-    """Scan events and return prioritized list.
 
-    Returns: [Event]
-    """
-    events = []
-    n = st.car_count()
-    grid = spatial.build_grid(st, config.CELL_SIZE_M)
-    # Pending offtrack confirmation per-car
-    if not hasattr(scan, "_pending_offtrack"):
-        scan._pending_offtrack = {}
-    if not hasattr(scan, "_pending_collision"):
-        scan._pending_collision = {}
+class DetectorState(object):
+    """Pending confirmations and per-car cooldowns across ticks."""
 
-    for i in range(n):
+    def __init__(self):
+        self.pending_collision = {}  # car_id -> first tick conditions held
+        self.pending_offtrack = {}
+        self.pending_spin = {}
+        # Ongoing spin incident per car: its event and last spinning tick
+        self.spin_event = {}
+        self.spin_seen = {}
+        self.updated = []  # emitted events whose severity rose since scan()
+        # Cooldowns to avoid repeat triggers per car
+        self.last_event_t = {
+            "collision": {},  # car_id -> t
+            "offtrack": {},
+            "spin": {},
+        }
+
+    def cooldown_ok(self, etype, car_id, now, th):
+        cd = 0.0
+        if etype == "collision":
+            cd = th.COLLISION_COOLDOWN_S
+        elif etype == "offtrack":
+            cd = th.OFFTRACK_COOLDOWN_S
+        elif etype == "spin":
+            cd = th.SPIN_COOLDOWN_S
+        last = self.last_event_t[etype].get(car_id, 0.0)
+        return (now - last) >= cd
+
+    def mark_event(self, etype, car_id, now):
+        self.last_event_t[etype][car_id] = now
+
+    def evaluate(self, i, now, f, nearest, th):
+        """Advance car ``i`` by one tick; returns an ``Event`` or None.
+
+        ``f`` is the car's ``CarFeatures``; ``nearest(i)`` gives the
+        distance to the closest rival and is only called when every other
+        collision condition holds.
+        """
         # Skip near-stationary cars if configured
-        sp = st.speed_kmh(i)
-        if config.IGNORE_STOPPED_CARS and sp <= config.STOPPED_SPEED_KMH:
-            continue
+        sp = f.sp
+        if th.IGNORE_STOPPED_CARS and sp <= th.STOPPED_SPEED_KMH:
+            return None
 
         # Collision: strong decel with minimum real window, nearby rival, and persistence
-        drop, dt, spre, snow = _recent_delta_speed(i, config.COLLISION_WINDOW_S)
-        yaw = _recent_yaw_rate(i)
+        drop = f.drop
+        dt = f.dt
+        spre = f.spre
+        snow = f.snow
+        yaw = f.yaw
         if dt > 0.0:
             decel_rate = drop / dt  # km/h per second
         else:
             decel_rate = 0.0
         ratio = (drop / max(1.0, spre)) if spre > 0.0 else 0.0
 
-        # Nearest distance check
-        pi = st.pos(i)
-        nearest_d = 1e9
-        if pi is not None:
-            for j in spatial.neighbors_of(i, pi, grid):
-                pj = st.pos(j)
-                if pj is None:
-                    continue
-                dx = pi[0] - pj[0]
-                dz = pi[2] - pj[2]
-                d2 = dx * dx + dz * dz
-                if d2 < nearest_d * nearest_d:
-                    import math
-                    nearest_d = math.sqrt(d2)
-
         base_ok = (
-            dt >= getattr(config, "COLLISION_MIN_DT_S", 0.18)
-            and drop >= config.COLLISION_MIN_DROP_KMH
-            and spre >= config.COLLISION_MIN_PRE_SPEED_KMH
-            and ratio >= getattr(config, "COLLISION_MIN_DROP_RATIO", 0.3)
-            and decel_rate >= config.COLLISION_MIN_DECEL_KMH_S
-            and snow <= getattr(config, "COLLISION_MAX_POST_SPEED_KMH", 55.0)
-            and nearest_d <= getattr(config, "COLLISION_NEAR_RADIUS_M", 7.0)
-            and not st._in_pit[i]
+            dt >= th.COLLISION_MIN_DT_S
+            and drop >= th.COLLISION_MIN_DROP_KMH
+            and spre >= th.COLLISION_MIN_PRE_SPEED_KMH
+            and ratio >= th.COLLISION_MIN_DROP_RATIO
+            and decel_rate >= th.COLLISION_MIN_DECEL_KMH_S
+            and snow <= th.COLLISION_MAX_POST_SPEED_KMH
+            and not f.in_pit
+            and nearest(i) <= th.COLLISION_NEAR_RADIUS_M
         )
 
-        if base_ok and _cooldown_ok("collision", i, now):
-            first_c = scan._pending_collision.get(i)
+        pending = self.pending_collision
+        if base_ok and self.cooldown_ok("collision", i, now, th):
+            first_c = pending.get(i)
             if first_c is None:
-                scan._pending_collision[i] = now
+                pending[i] = now
             else:
-                if (now - first_c) <= getattr(config, "COLLISION_CONFIRM_WINDOW_S", 0.2):
+                if (now - first_c) <= th.COLLISION_CONFIRM_WINDOW_S:
                     sev = min(1.0, max(drop / 60.0, decel_rate / 250.0) * (1.0 + 0.2 * max(0.0, yaw - 0.5)))
-                    ev = Event(i, "collision", sev, now + 2.5)
-                    events.append(ev)
-                    _mark_event("collision", i, now)
-                    scan._pending_collision.pop(i, None)
-                    log("event collision car={} dV={:.1f} rate={:.0f} near={:.1f} yaw={:.2f}".format(i, drop, decel_rate, nearest_d, yaw))
-                    continue
+                    self.mark_event("collision", i, now)
+                    pending.pop(i, None)
+                    return Event(i, "collision", sev, now + 2.5)
                 else:
-                    scan._pending_collision.pop(i, None)
+                    pending.pop(i, None)
         else:
-            if i in scan._pending_collision:
-                scan._pending_collision.pop(i, None)
+            if i in pending:
+                pending.pop(i, None)
 
         # Spin: low speed and high yaw rate
-        if sp <= 35.0 and yaw >= 1.5:  # rad/s heuristic
-            ev = Event(i, "spin", min(1.0, yaw / 3.0), now + 3.0)
-            events.append(ev)
-            log("event spin car={} yaw={:.2f}".format(i, yaw))
-            continue
+        if sp <= th.SPIN_MAX_SPEED_KMH and yaw >= th.SPIN_MIN_YAW_RAD_S:
+            return self._spin(i, now, min(1.0, yaw / 3.0), th)
+        if i in self.pending_spin:
+            self.pending_spin.pop(i, None)
 
         # Offtrack: significant speed drop, not in pit, yaw moderate and sustained.
-        drop2, dt2, spre2, snow2 = _recent_delta_speed(i, config.OFFTRACK_WINDOW_S)
+        drop2 = f.drop2
+        spre2 = f.spre2
+        snow2 = f.snow2
         ratio2 = (drop2 / max(1.0, spre2)) if spre2 > 0.0 else 0.0
-        yaw_avg = _avg_abs_yaw(i, min(0.5, config.OFFTRACK_WINDOW_S))
         base_ok = (
-            dt2 > 0.0
-            and not st._in_pit[i]
-            and spre2 >= config.OFFTRACK_MIN_PRE_SPEED_KMH
-            and drop2 >= config.OFFTRACK_MIN_DROP_KMH
-            and config.OFFTRACK_MIN_NOW_SPEED_KMH <= snow2 <= config.OFFTRACK_MAX_NOW_SPEED_KMH
-            and config.OFFTRACK_YAW_MIN_RAD_S <= yaw <= config.OFFTRACK_YAW_MAX_RAD_S
-            and yaw_avg >= getattr(config, "OFFTRACK_AVG_YAW_MIN_RAD_S", 0.25)
-            and config.OFFTRACK_MIN_DROP_RATIO <= ratio2 <= config.OFFTRACK_MAX_DROP_RATIO
+            f.dt2 > 0.0
+            and not f.in_pit
+            and spre2 >= th.OFFTRACK_MIN_PRE_SPEED_KMH
+            and drop2 >= th.OFFTRACK_MIN_DROP_KMH
+            and th.OFFTRACK_MIN_NOW_SPEED_KMH <= snow2 <= th.OFFTRACK_MAX_NOW_SPEED_KMH
+            and th.OFFTRACK_YAW_MIN_RAD_S <= yaw <= th.OFFTRACK_YAW_MAX_RAD_S
+            and f.yaw_avg >= th.OFFTRACK_AVG_YAW_MIN_RAD_S
+            and th.OFFTRACK_MIN_DROP_RATIO <= ratio2 <= th.OFFTRACK_MAX_DROP_RATIO
         )
 
-        if base_ok and _cooldown_ok("offtrack", i, now):
-            first = scan._pending_offtrack.get(i)
+        pending = self.pending_offtrack
+        if base_ok and self.cooldown_ok("offtrack", i, now, th):
+            first = pending.get(i)
             if first is None:
                 # Stage 1: mark and wait confirmation
-                scan._pending_offtrack[i] = now
+                pending[i] = now
             else:
                 # Confirm within window with conditions still true
-                if (now - first) <= getattr(config, "OFFTRACK_CONFIRM_WINDOW_S", 0.3):
-                    ev = Event(i, "offtrack", min(1.0, drop2 / 60.0), now + 2.0)
-                    events.append(ev)
-                    _mark_event("offtrack", i, now)
-                    scan._pending_offtrack.pop(i, None)
-                    log("event offtrack car={} drop={:.1f} yaw={:.2f} yaw_avg={:.2f}".format(i, drop2, yaw, yaw_avg))
-                    continue
+                if (now - first) <= th.OFFTRACK_CONFIRM_WINDOW_S:
+                    self.mark_event("offtrack", i, now)
+                    pending.pop(i, None)
+                    return Event(i, "offtrack", min(1.0, drop2 / 60.0), now + 2.0)
                 else:
                     # Expired pending; reset
-                    scan._pending_offtrack.pop(i, None)
+                    pending.pop(i, None)
         else:
             # Conditions not met; clear any pending flag for this car
-            if i in scan._pending_offtrack:
-                scan._pending_offtrack.pop(i, None)
+            if i in pending:
+                pending.pop(i, None)
+        return None
 
-        # Pit entry heuristic
-        if _pit_transition(i):
-            ev = Event(i, "pit_entry", 0.3, now + 2.0)
-            events.append(ev)
+    def _spin(self, i, now, sev, th):
+        # Returns the spin Event when an incident is confirmed; later ticks
+        # of the same incident update it in place and return None (a raised
+        # severity also lists it in `updated`).
+        ev = self.spin_event.get(i)
+        if ev is not None:
+            last_seen = self.spin_seen[i]
+            if now - last_seen <= th.SPIN_MERGE_GAP_S:
+                if sev > ev.severity:
+                    ev.severity = sev
+                    self.updated.append(ev)
+                ev.t_expires = now + 3.0
+                self.spin_seen[i] = now
+                return None
+            # Incident over: the cooldown runs from its last spinning tick
+            del self.spin_event[i]
+            del self.spin_seen[i]
+            self.mark_event("spin", i, last_seen)
+        if not self.cooldown_ok("spin", i, now, th):
+            return None
+        pending = self.pending_spin
+        first = pending.get(i)
+        if first is None:
+            pending[i] = now
+            return None
+        pending.pop(i, None)
+        if (now - first) > th.SPIN_CONFIRM_WINDOW_S:
+            return None
+        ev = Event(i, "spin", sev, now + 3.0)
+        self.mark_event("spin", i, now)
+        self.spin_event[i] = ev
+        self.spin_seen[i] = now
+        return ev
+
+
+def pit_event(i, now):
+    """The ``pit_entry`` event for car ``i`` entering the pit lane at ``now``."""
+    return Event(i, "pit_entry", 0.3, now + 2.0)
+
+
+def add_pit_events(events, st, now):
+    """Merge this snapshot's pit entries (``state.pit_transitions``) into
+    ``events``, which is in car order; a car's pit event follows its
+    detector event."""
+    for car, kind, duration in st.pit_transitions():
+        if kind == "entry":
+            k = len(events)
+            while k > 0 and events[k - 1].car_id > car:
+                k -= 1
+            events.insert(k, pit_event(car, now))
+            info("event pit_entry car={}", car, key=("pit_entry", car))
+        elif kind == "release":
+            info("pit release car={} stop={:.1f}s", car, duration, key=("pit_release", car))
+        elif kind == "exit":
+            info("pit exit car={} lane={:.1f}s", car, duration, key=("pit_exit", car))
+
+
+_detector = DetectorState()
+_scanned_last_tick = 0
 
-    if not events:
-        return []
+# Bound by reload_config(): thresholds and the scan's reusable buffers
+_th = None
+_features = CarFeatures()
+_events = []
 
-    # priority: collision > spin > offtrack > pit_entry
-    prio = {"collision": 0, "spin": 1, "offtrack": 2, "pit_entry": 3}
-    events.sort(key=lambda e: (prio.get(e.type, 99), -e.severity))
-    # filter by TTL (though all are fresh)
-    now_t = now
-    events = [e for e in events if e.t_expires > now_t]
+
+def reload_config():
+    """Re-read detector thresholds from ``config`` (after changing it)."""
+    global _th
+    _th = Thresholds()
+    return _th
+
+
+def speed_delta(hist, window):
+    """``(drop, dt, s_then, s_now)`` over ``window`` of a speed history."""
+    if len(hist) < 2:
+        return 0.0, 0.0, 0.0, 0.0
+    t_now = hist.latest_t()
+    s_now = hist.latest()
+    # newest sample at least `window` old (or the oldest one kept)
+    k = hist.index_at_age(window)
+    s_then = hist.value_at(k)
+    t_then = hist.time_at(k)
+    dt = max(0.0001, t_now - t_then)
+    return (s_then - s_now), dt, s_then, s_now
+
+
+def _fill_features(f, sh, yh, w1, w2, wy):
+    # Same values as speed_delta(sh, w1), speed_delta(sh, w2), yh.latest()
+    # and yh.mean(wy), read straight from the ring buffers in one backward
+    # pass each and written into f without building tuples.
+    n = sh._len
+    if n < 2:
+        f.drop = f.dt = f.spre = f.snow = 0.0
+        f.drop2 = f.dt2 = f.spre2 = f.snow2 = 0.0
+    else:
+        ts = sh._t
+        vs = sh._v
+        cap = sh.capacity
+        newest = sh._head - 1
+        if newest < 0:
+            newest += cap
+        t_now = ts[newest]
+        s_now = vs[newest]
+        # newest sample at least w1 / w2 old, else the oldest one kept
+        last = n - 1
+        k1 = k2 = last
+        need1 = need2 = True
+        for k in range(1, last):
+            idx = newest - k
+            if idx < 0:
+                idx += cap
+            age = t_now - ts[idx]
+            if need1 and age >= w1:
+                k1 = k
+                need1 = False
+            if need2 and age >= w2:
+                k2 = k
+                need2 = False
+            if not (need1 or need2):
+                break
+        idx = newest - k1
+        if idx < 0:
+            idx += cap
+        s_then = vs[idx]
+        dt = t_now - ts[idx]
+        if dt < 0.0001:
+            dt = 0.0001
+        f.drop = s_then - s_now
+        f.dt = dt
+        f.spre = s_then
+        f.snow = s_now
+        idx = newest - k2
+        if idx < 0:
+            idx += cap
+        s_then = vs[idx]
+        dt = t_now - ts[idx]
+        if dt < 0.0001:
+            dt = 0.0001
+        f.drop2 = s_then - s_now
+        f.dt2 = dt
+        f.spre2 = s_then
+        f.snow2 = s_now
+
+    n = yh._len
+    if n == 0:
+        f.yaw = f.yaw_avg = 0.0
+        return
+    ts = yh._t
+    vs = yh._v
+    cap = yh.capacity
+    newest = yh._head - 1
+    if newest < 0:
+        newest += cap
+    f.yaw = total = 0.0 + vs[newest]
+    # yaw history already stores magnitudes; average newest first
+    t_min = ts[newest] - wy
+    m = 1
+    while m < n:
+        idx = newest - m
+        if idx < 0:
+            idx += cap
+        if ts[idx] < t_min:
+            break
+        total += vs[idx]
+        m += 1
+    f.yaw_avg = total / float(m)
+
+
+def _log_event(ev, f, index):
+    # Formatted only if emitted; one line per car and type per rate-limit window
+    if ev.type == "collision":
+        decel_rate = f.drop / f.dt if f.dt > 0.0 else 0.0
+        info("event collision car={} dV={:.1f} rate={:.0f} near={:.1f} yaw={:.2f}",
+             ev.car_id, f.drop, decel_rate, index.nearest(ev.car_id), f.yaw, key=("collision", ev.car_id))
+    elif ev.type == "spin":
+        info("event spin car={} yaw={:.2f}", ev.car_id, f.yaw, key=("spin", ev.car_id))
+    elif ev.type == "offtrack":
+        info("event offtrack car={} drop={:.1f} yaw={:.2f} yaw_avg={:.2f}",
+             ev.car_id, f.drop2, f.yaw, f.yaw_avg, key=("offtrack", ev.car_id))
+
+
+def updated_last_scan():
+    """Events emitted earlier whose severity the last ``scan`` raised."""
+    return _detector.updated
+
+
+def scanned_last_tick():
+    """Cars whose features were read by the last ``scan``."""
+    return _scanned_last_tick
+
+
+def scan(st, now):
+    """New events this tick, in car order.
+
+    Prioritising and expiry are left to ``event_queue``. The returned list
+    is reused by the next call.
+
+    Returns: [Event]
+    """
+    global _scanned_last_tick
+    th = _th
+    if th is None:
+        th = reload_config()
+    events = _events
+    del events[:]
+    del _detector.updated[:]
+    n = st.car_count()
+    index = spatial.current_index(st)
+    snap = st.snapshot()
+    speeds = snap.speed
+    pit = snap.pit
+    pitlane = snap.pitlane
+    speed_hists, yaw_hists = st.histories()
+    f = _features
+    evaluate = _detector.evaluate
+    nearest = index.nearest
+    skip_stopped = th.IGNORE_STOPPED_CARS
+    stopped = th.STOPPED_SPEED_KMH
+    w1 = th.COLLISION_WINDOW_S
+    w2 = th.OFFTRACK_WINDOW_S
+    wy = th.yaw_avg_window()
+    scanned = 0
+
+    for i in range(n):
+        sp = speeds[i]
+        # Stopped cars are skipped by evaluate; don't read their histories
+        if skip_stopped and sp <= stopped:
+            continue
+        scanned += 1
+        f.sp = sp
+        f.in_pit = pit[i] != 0
+        f.in_lane = pitlane[i] != 0
+        _fill_features(f, speed_hists[i], yaw_hists[i], w1, w2, wy)
+        ev = evaluate(i, now, f, nearest, th)
+        if ev is not None:
+            events.append(ev)
+            _log_event(ev, f, index)
+    add_pit_events(events, st, now)
+    _scanned_last_tick = scanned
     return events
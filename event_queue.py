@@ -0,0 +1,113 @@
+"""Detector events kept until shown or expired.
+
+Events from ``detectors.scan`` wait in a heap ordered by priority
+(collision > spin > offtrack > pit_entry), then severity, then newest
+first, and expire at their ``t_expires``. The queue holds one event per
+car and type: a repeat extends the queued one (or replaces it when more
+severe). ``focus.maybe_focus_event`` takes the best live event once the
+scheduler lock releases, so an incident detected during a lock is still
+shown if it lasts.
+"""
+
+import heapq
+
+from .detectors import PRIORITY
+
+# Heap entries: [priority, -severity, -t, seq, event]; entries replaced or
+# taken are left in the heap and skipped lazily (see _is_current).
+_heap = []
+_by_key = {}  # (car_id, type) -> current heap entry
+_seq = 0
+
+
+def _key(ev):
+    return (ev.car_id, ev.type)
+
+
+def _is_current(entry):
+    ev = entry[4]
+    return _by_key.get(_key(ev)) is entry
+
+
+def _push_entry(ev, t):
+    global _seq
+    _seq += 1
+    entry = [PRIORITY.get(ev.type, 99), -ev.severity, -t, _seq, ev]
+    _by_key[_key(ev)] = entry
+    heapq.heappush(_heap, entry)
+
+
+def push(events, now):
+    """Queue this tick's events, merging repeats per car and type."""
+    for ev in events:
+        entry = _by_key.get(_key(ev))
+        if entry is not None:
+            queued = entry[4]
+            if queued is ev:
+                continue
+            if queued.t_expires > now and ev.severity <= queued.severity:
+                # Same incident still queued: keep its place, extend its life
+                if ev.t_expires > queued.t_expires:
+                    queued.t_expires = ev.t_expires
+                continue
+        _push_entry(ev, now)
+    if len(_heap) > 2 * len(_by_key) + 32:
+        _compact()
+
+
+def update(events):
+    """Re-key queued events whose severity changed in place.
+
+    The event gets a new entry with its original time; the old one is no
+    longer current and is skipped lazily. Events already taken stay out.
+    """
+    for ev in events:
+        entry = _by_key.get(_key(ev))
+        if entry is not None and entry[4] is ev and entry[1] != -ev.severity:
+            _push_entry(ev, -entry[2])
+
+
+def _compact():
+    global _heap
+    _heap = [e for e in _heap if _is_current(e)]
+    heapq.heapify(_heap)
+
+
+def _drop_stale(now):
+    # Pop replaced, taken or expired entries off the top
+    heap = _heap
+    while heap:
+        entry = heap[0]
+        if _is_current(entry) and entry[4].t_expires > now:
+            return entry
+        heapq.heappop(heap)
+        if _is_current(entry):
+            del _by_key[_key(entry[4])]
+    return None
+
+
+def peek(now):
+    """Best unexpired event without removing it, or None."""
+    entry = _drop_stale(now)
+    return entry[4] if entry is not None else None
+
+
+def pop(now):
+    """Remove and return the best unexpired event, or None."""
+    entry = _drop_stale(now)
+    if entry is None:
+        return None
+    heapq.heappop(_heap)
+    del _by_key[_key(entry[4])]
+    return entry[4]
+
+
+def pending(now):
+    """Number of queued events that have not expired."""
+    return sum(1 for e in _by_key.values() if e[4].t_expires > now)
+
+
+def clear():
+    global _heap
+    _heap = []
+    _by_key.clear()
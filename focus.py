@@ -1,8 +1,8 @@
 """Focus orchestration: events + natural switches with guards."""
 
 import ac
-from . import config, state
-from .logging_utils import log
+from . import config, state, event_queue
+from .logging_utils import info, warn
 
 
 def switch_to(car_id, now, reason):
@@ -15,23 +15,25 @@ def switch_to(car_id, now, reason):
         ac.focusCar(car_id)
         state.set_current_focus(car_id, now)
         state.set_current_reason(reason)
-        log("Focus -> car {} (reason={})".format(car_id, reason))
+        info("Focus -> car {} (reason={})", car_id, reason)
         return True
     except Exception as ex:
-        log("focusCar failed: {}".format(ex))
+        warn("focusCar failed: {}", ex, key="focus_failed")
         return False
 
 
-def maybe_focus_event(events, now):
-    if not events:
-        return False
-    # events are pre-sorted by priority
-    target = events[0].car_id
-    # Avoid switching to near-stationary cars on events
-    try:
-        from . import config, state
-        if state.speed_kmh(target) <= getattr(config, "MIN_FOCUS_SPEED_KMH", 0.0):
-            return False
-    except Exception:
-        pass
-    return switch_to(target, now, events[0].type)
+def maybe_focus_event(now):
+    """Focus the best queued event; returns it, or None if none was shown.
+
+    Events on near-stationary cars are dropped rather than shown.
+    """
+    min_speed = getattr(config, "MIN_FOCUS_SPEED_KMH", 0.0)
+    while True:
+        ev = event_queue.pop(now)
+        if ev is None:
+            return None
+        if state.speed_kmh(ev.car_id) <= min_speed:
+            continue
+        if switch_to(ev.car_id, now, ev.type):
+            return ev
+        return None
@@ -0,0 +1,142 @@
+"""On-track time gaps built once per snapshot.
+
+Cars on track (not in the pit lane) are sorted by spline position, so
+every car's neighbours along the racing line are its predecessor and
+successor in one sorted pass. The interval to the car ahead is the
+distance along the lap (``spline`` delta times track length) over the
+chasing car's speed; gaps across a train of cars are summed intervals, as
+on a timing screen. Unlike XZ distance this does not pair cars on
+parallel straights or across a hairpin.
+"""
+
+from . import config
+
+# Interval reported for cars without a car ahead/behind
+NO_GAP_S = 1e9
+
+# Speed floor for intervals (m/s), so stopped cars get a large finite gap
+_MIN_SPEED_MS = 1.0
+
+
+class GapModel(object):
+    """Track order and intervals for one snapshot.
+
+    ``order`` lists on-track car ids by spline (back of the lap first).
+    ``ahead[c]`` / ``behind[c]`` are the neighbouring car ids (-1 if none),
+    ``gap_ahead[c]`` / ``gap_behind[c]`` the intervals in seconds and
+    ``dist_ahead[c]`` the distance to the car ahead in metres.
+    """
+
+    def __init__(self, st, track_length):
+        self.t = st.snapshot_time()
+        n = st.car_count()
+        self.count = n
+        self.track_length = track_length
+        self.ahead = [-1] * n
+        self.behind = [-1] * n
+        self.gap_ahead = [NO_GAP_S] * n
+        self.gap_behind = [NO_GAP_S] * n
+        self.dist_ahead = [NO_GAP_S] * n
+
+        snap = st.snapshot()
+        splines = snap.spline
+        speeds = snap.speed
+        pitlane = snap.pitlane
+        pit = snap.pit
+        cars = [c for c in range(n) if not (pit[c] or pitlane[c])]
+        cars.sort(key=lambda c: (splines[c], c))
+        self.order = cars
+
+        m = len(cars)
+        if m < 2 or track_length <= 0.0:
+            return
+        for k in range(m):
+            c = cars[k]
+            a = cars[k + 1] if k + 1 < m else cars[0]
+            d = splines[a] - splines[c]
+            if d < 0.0:
+                d += 1.0  # the leader on the road is followed by the back of the lap
+            d *= track_length
+            v = speeds[c] / 3.6
+            if v < _MIN_SPEED_MS:
+                v = _MIN_SPEED_MS
+            gap = d / v
+            self.ahead[c] = a
+            self.behind[a] = c
+            self.dist_ahead[c] = d
+            self.gap_ahead[c] = gap
+            self.gap_behind[a] = gap
+
+    def nearest_gaps(self, c, horizon, limit):
+        """Time gaps (s) to the closest cars either way, nearest first.
+
+        Walks ahead and behind along the track, up to ``limit`` cars and
+        gaps below ``horizon``. Returns ``(gaps, cars visited)``.
+        """
+        out = []
+        others = len(self.order) - 1
+        if not (0 <= c < self.count) or self.ahead[c] < 0:
+            return out, 0
+        a = c
+        b = c
+        total_a = self.gap_ahead[c]
+        total_b = self.gap_behind[c]
+        visited = 0
+        while len(out) < limit and visited < others:
+            if total_a <= total_b:
+                gap = total_a
+                a = self.ahead[a]
+                total_a += self.gap_ahead[a]
+            else:
+                gap = total_b
+                b = self.behind[b]
+                total_b += self.gap_behind[b]
+            visited += 1
+            if gap >= horizon:
+                break
+            out.append(gap)
+        return out, visited
+
+    def pairs_within(self, horizon):
+        """Pairs of on-track cars less than ``horizon`` seconds apart."""
+        pairs = 0
+        others = len(self.order) - 1
+        if others < 1:
+            return 0
+        ahead = self.ahead
+        gap_ahead = self.gap_ahead
+        for c in self.order:
+            total = gap_ahead[c]
+            j = c
+            steps = 0
+            while total < horizon and steps < others:
+                pairs += 1
+                steps += 1
+                j = ahead[j]
+                total += gap_ahead[j]
+        return pairs
+
+
+_gaps = None
+
+
+def refresh_gaps(st):
+    """Build the gap model for the current snapshot unless already cached.
+
+    Returns None when ``GAP_MODEL`` is off or the track length is unknown;
+    callers then fall back to XZ distances.
+    """
+    global _gaps
+    if not getattr(config, "GAP_MODEL", True):
+        return None
+    length = st.track_length()
+    if length <= 0.0:
+        return None
+    if _gaps is None or _gaps.t != st.snapshot_time() or _gaps.count != st.car_count():
+        _gaps = GapModel(st, length)
+    return _gaps
+
+
+def current_gaps(st):
+    """Gap model for the current snapshot (same cache as ``refresh_gaps``)."""
+    return refresh_gaps(st)
@@ -0,0 +1,7 @@
+"""Headless harness: run the app outside Assetto Corsa.
+
+``fake_ac`` stands in for AC's ``ac``/``acsys`` modules and serves car
+states from a source (``synthetic.SyntheticField``); ``runner`` drives
+``acMain``/``acUpdate`` on a deterministic clock and benchmarks the
+director stages. Command line: ``python -m headless --help``.
+"""
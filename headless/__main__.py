@@ -0,0 +1,136 @@
+"""Command line: ``python -m headless {run,bench,detect,sweep}``."""
+
+import argparse
+import time
+
+from . import runner
+
+
+def _cars_list(text):
+    return tuple(int(x) for x in text.split(",") if x.strip())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="headless", description=__doc__)
+    sub = parser.add_subparsers(dest="command")
+
+    p_run = sub.add_parser("run", help="run a synthetic session and print the focus timeline")
+    p_run.add_argument("--cars", type=int, default=30)
+    p_run.add_argument("--seconds", type=float, default=120.0)
+    p_run.add_argument("--fps", type=float, default=60.0)
+    p_run.add_argument("--seed", type=int, default=1)
+    p_run.add_argument("--log", action="store_true", help="echo app log lines")
+    p_run.add_argument("--replay", help="play a telemetry recording instead of synthetic traffic")
+    p_run.add_argument("--record", help="record the session's snapshots to this file")
+    p_run.add_argument("--labels", help="with --record: write the synthetic incidents to this labels file")
+
+    p_bench = sub.add_parser("bench", help="per-stage director tick latency")
+    p_bench.add_argument("--cars", type=_cars_list, default=(10, 30, 60, 120),
+                         help="comma separated field sizes (default 10,30,60,120)")
+    p_bench.add_argument("--ticks", type=int, default=600)
+    p_bench.add_argument("--seed", type=int, default=1)
+    p_bench.add_argument("--replay", help="benchmark a telemetry recording (ignores --cars)")
+    p_bench.add_argument("--scan", action="store_true",
+                         help="per-car detector scan cost against the previous scan loop")
+    p_bench.add_argument("--rank", action="store_true",
+                         help="natural-pick ranking cost (pure Python, NumPy, previous loop)")
+    p_bench.add_argument("--index", action="store_true",
+                         help="neighbour index build cost, grid vs spline backend")
+
+    p_detect = sub.add_parser("detect", help="re-run the event detectors over a recording")
+    p_detect.add_argument("recording")
+    p_detect.add_argument("--set", action="append", metavar="NAME=VALUE", default=[],
+                          help="override a detector threshold (repeatable)")
+    p_detect.add_argument("--pure", action="store_true", help="pure-Python features even if NumPy is installed")
+    p_detect.add_argument("--check", action="store_true", help="compare against the live detector on the same frames")
+
+    p_sweep = sub.add_parser("sweep", help="score a grid of detector thresholds against labels")
+    p_sweep.add_argument("recording")
+    p_sweep.add_argument("--labels", required=True, help="ground truth: 'seconds car type' per line")
+    p_sweep.add_argument("--grid", action="append", metavar="NAME=V1,V2|START:STOP:STEP", default=[],
+                         help="threshold values to combine (repeatable)")
+    p_sweep.add_argument("--set", action="append", metavar="NAME=VALUE", default=[],
+                         help="fixed threshold override (repeatable)")
+    p_sweep.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    p_sweep.add_argument("--tolerance", type=float, default=3.0, help="seconds between event and label")
+    p_sweep.add_argument("--top", type=int, default=20, help="best configurations to print")
+    p_sweep.add_argument("--csv", help="write every configuration's scores to this file")
+    p_sweep.add_argument("--pure", action="store_true", help="pure-Python features even if NumPy is installed")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        fake = runner.run(args.cars, args.seconds, args.fps, args.seed, echo_log=args.log,
+                          replay=args.replay, record=args.record, labels=args.labels)
+        for t, car in fake.focus_history:
+            print("{:8.2f}s  focus car {}".format(t, car))
+        print("{} focus changes, {} log lines".format(len(fake.focus_history), len(fake.logs)))
+    elif args.command == "bench" and args.scan:
+        cars = (None,) if args.replay else args.cars
+        for n in cars:
+            result = runner.scan_bench(n, args.ticks, seed=args.seed, replay=args.replay)
+            print(runner.format_scan_bench(args.replay or "{} cars".format(n), result))
+    elif args.command == "bench" and args.index:
+        print(runner.format_index_bench(runner.index_bench(args.cars, seed=args.seed)))
+    elif args.command == "bench" and args.rank:
+        cars = (None,) if args.replay else args.cars
+        for n in cars:
+            result = runner.rank_bench(n, args.ticks, seed=args.seed, replay=args.replay)
+            print(runner.format_rank_bench(args.replay or "{} cars".format(n), result))
+    elif args.command == "bench":
+        print(runner.format_bench(runner.bench(args.cars, args.ticks, seed=args.seed, replay=args.replay)))
+    elif args.command == "detect":
+        return _detect(args)
+    elif args.command == "sweep":
+        return _sweep(args)
+    else:
+        parser.print_help()
+    return 0
+
+
+def _detect(args):
+    from . import offline
+    overrides = offline.parse_overrides(args.set)
+    t0 = time.perf_counter()
+    events, rec = offline.run(args.recording, overrides, use_numpy=False if args.pure else None)
+    elapsed = time.perf_counter() - t0
+    start = float(rec.times[0]) if len(rec.times) else 0.0
+    if events:
+        print(offline.format_events(events, start))
+    speedup = rec.duration / elapsed if elapsed > 0.0 else 0.0
+    print("{} events, {} cars over {:.1f} s in {:.2f} s ({:.0f}x real time, {})".format(
+        len(events), rec.cars, rec.duration, elapsed, speedup, "numpy" if rec.numpy else "pure Python"))
+    if not args.check:
+        return 0
+    t0 = time.perf_counter()
+    reference = offline.live_events(args.recording, overrides)
+    elapsed = time.perf_counter() - t0
+    pos = offline.compare(events, reference)
+    if pos is None:
+        print("matches the live detector ({} events, live replay took {:.2f} s)".format(len(reference), elapsed))
+        return 0
+    print("MISMATCH at event {}:".format(pos))
+    print("  offline: {}".format(offline.format_events(events[pos:pos + 1], start) or "-"))
+    print("  live:    {}".format(offline.format_events(reference[pos:pos + 1], start) or "-"))
+    return 1
+
+
+def _sweep(args):
+    from . import labels, offline, sweep
+    grid = sweep.parse_grid(args.grid)
+    configs = sweep.expand(grid, offline.parse_overrides(args.set))
+    truth = labels.load(args.labels)
+    t0 = time.perf_counter()
+    rows = sweep.sweep(args.recording, truth, configs, jobs=args.jobs,
+                       use_numpy=False if args.pure else None, tolerance=args.tolerance)
+    elapsed = time.perf_counter() - t0
+    names = [name for name, _ in grid]
+    ranked = sweep.rank(rows)
+    print(sweep.format_rows(ranked[:args.top], names))
+    print("{} configurations in {:.1f} s".format(len(configs), elapsed))
+    if args.csv:
+        sweep.write_csv(args.csv, rows, names)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
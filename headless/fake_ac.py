@@ -0,0 +1,107 @@
+"""Stand-in ``ac`` / ``acsys`` modules backed by a car-state source."""
+
+import sys
+import types
+
+
+class CS(object):
+    """Subset of ``acsys.CS`` used by the app."""
+
+    WorldPosition = 0
+    SpeedKMH = 1
+    Velocity = 2
+    NormalizedSplinePosition = 3
+    LapCount = 4
+
+
+class FakeAC(object):
+    """Serves ``source`` to the app and records what the app asked of AC.
+
+    ``source`` provides ``count``, ``t``, ``track_length`` and per-car
+    ``world_position``, ``speed_kmh``, ``velocity``, ``spline``, ``lap``,
+    ``in_pit`` and ``in_pitlane``.
+    """
+
+    def __init__(self, source, echo_log=False):
+        self.source = source
+        self.echo_log = echo_log
+        self.logs = []
+        self.focus_history = []  # (source time, car id)
+        self.focused = -1
+        self.texts = {}
+        self._next_control = 1
+        self._readers = {
+            CS.WorldPosition: source.world_position,
+            CS.SpeedKMH: source.speed_kmh,
+            CS.Velocity: source.velocity,
+            CS.NormalizedSplinePosition: source.spline,
+            CS.LapCount: source.lap,
+        }
+
+    # --- car state ---
+    def getCarsCount(self):
+        return self.source.count
+
+    def getCarState(self, car_id, field):
+        if not (0 <= car_id < self.source.count):
+            raise ValueError("no car {}".format(car_id))
+        return self._readers[field](car_id)
+
+    def isCarInPit(self, car_id):
+        return 1 if self.source.in_pit(car_id) else 0
+
+    def isCarInPitlane(self, car_id):
+        return 1 if self.source.in_pitlane(car_id) else 0
+
+    def getTrackLength(self, *args):
+        return self.source.track_length
+
+    def focusCar(self, car_id):
+        self.focused = car_id
+        self.focus_history.append((self.source.t, car_id))
+
+    # --- logging ---
+    def log(self, msg):
+        self.logs.append(msg)
+        if self.echo_log:
+            print(msg)
+
+    def console(self, msg):
+        self.log(msg)
+
+    # --- UI ---
+    def _control(self, *args):
+        cid = self._next_control
+        self._next_control += 1
+        return cid
+
+    def setText(self, control, text):
+        self.texts[control] = text
+
+    def _noop(self, *args):
+        return None
+
+    def modules(self):
+        """Build the ``(ac, acsys)`` module pair bound to this instance."""
+        ac = types.ModuleType("ac")
+        for name in (
+            "getCarsCount", "getCarState", "isCarInPit", "isCarInPitlane",
+            "getTrackLength", "focusCar", "log", "console", "setText",
+        ):
+            setattr(ac, name, getattr(self, name))
+        for name in ("newApp", "addLabel", "addButton"):
+            setattr(ac, name, self._control)
+        for name in ("setTitle", "setSize", "setPosition", "addOnClickedListener",
+                     "setVisible", "setFontSize"):
+            setattr(ac, name, self._noop)
+        acsys = types.ModuleType("acsys")
+        acsys.CS = CS
+        return ac, acsys
+
+
+def install(fake):
+    """Register ``fake`` as the ``ac``/``acsys`` modules."""
+    ac, acsys = fake.modules()
+    sys.modules["ac"] = ac
+    sys.modules["acsys"] = acsys
+    return ac, acsys
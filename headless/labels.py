@@ -0,0 +1,68 @@
+"""Ground-truth incident labels for recordings.
+
+A labels file is plain text, one incident per line::
+
+    # seconds since the first recorded frame, car id, type
+    154.9 9 collision
+    196.1 16 offtrack
+
+Blank lines and ``#`` comments are ignored.
+"""
+
+TYPES = ("collision", "spin", "offtrack", "pit_entry")
+
+
+def load(path):
+    """``[(t, car, type)]`` from a labels file, sorted by time."""
+    out = []
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split()
+            if len(parts) != 3 or parts[2] not in TYPES:
+                raise ValueError("{}:{}: expected 'seconds car type', got {!r}".format(path, lineno, line))
+            out.append((float(parts[0]), int(parts[1]), parts[2]))
+    out.sort()
+    return out
+
+
+def save(path, labels):
+    with open(path, "w") as f:
+        f.write("# seconds since the first recorded frame, car id, type\n")
+        for t, car, etype in sorted(labels):
+            f.write("{:.3f} {} {}\n".format(t, car, etype))
+
+
+def match(events, labels, etype, tolerance):
+    """Precision and recall of ``events`` against ``labels`` for one type.
+
+    ``events`` and ``labels`` are ``(t, car, type)`` with times on the same
+    base. An event is a hit when a label of its car and type lies within
+    ``tolerance`` seconds; a label is found when any event hits it.
+    Returns ``(precision, recall, events, labels)``; precision/recall are
+    None when there is nothing to divide by.
+    """
+    truth = {}
+    for t, car, kind in labels:
+        if kind == etype:
+            truth.setdefault(car, []).append(t)
+    found = set()
+    hits = 0
+    count = 0
+    for t, car, kind in events:
+        if kind != etype:
+            continue
+        count += 1
+        hit = False
+        for k, tl in enumerate(truth.get(car, ())):
+            if abs(t - tl) <= tolerance:
+                found.add((car, k))
+                hit = True
+        if hit:
+            hits += 1
+    total = sum(len(v) for v in truth.values())
+    precision = hits / float(count) if count else None
+    recall = len(found) / float(total) if total else None
+    return precision, recall, count, total
@@ -0,0 +1,673 @@
+"""Offline re-detection: the live detectors over a whole recording.
+
+Detector inputs (speed deltas, yaw rate, yaw average) are computed per car
+for every recorded tick in one pass -- vectorised with NumPy when it is
+installed, through the app's own ring buffers otherwise -- and
+``detectors.DetectorState.evaluate`` makes every decision. With NumPy it
+only runs on ticks where one of its conditions can hold (plus the tick
+after a pending confirmation, which may clear it). Histories, rounding
+and decision code are the live ones, so the result equals
+``detectors.scan`` on the same recording; ``live_events`` replays through
+the app itself to check that.
+
+The speed-up comes from NumPy. Without it each run is streamed through the
+live feature reader and ``evaluate`` frame by frame, which costs about as
+much as the live replay: a correctness path, not a fast one.
+"""
+
+import math
+import operator
+from array import array
+
+try:
+    import numpy
+except ImportError:  # pure-Python fallback
+    numpy = None
+
+from . import fake_ac
+from .replay import ReplaySource
+from .runner import load_app, module
+
+COLUMNS = ("speed", "x", "z", "vx", "vz", "spline")
+FLAG_COLUMNS = ("has_pos", "has_vel", "pit", "pitlane", "fresh")
+
+
+def load_detectors(path):
+    """Load a fresh app copy on a replay of ``path``; returns ``detectors``."""
+    load_app(fake_ac.FakeAC(ReplaySource(path)))
+    return module("detectors")
+
+
+class Recording(object):
+    """A recording unpacked into per-car columns, one entry per frame.
+
+    ``counts[k]`` cars are present in frame ``k``; columns of absent cars
+    hold zeros. Columns are ``array`` objects per car, or ``(cars,
+    frames)`` arrays when loaded with NumPy.
+    """
+
+    def __init__(self, path, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        recorder = module("recorder")
+        reader = recorder.ReplayReader(path)
+        try:
+            self.track_length = reader.track_length
+            loaded = _load_uniform(reader, recorder) if use_numpy else None
+            if loaded is None:
+                loaded = _load_frames(reader)
+                if use_numpy:
+                    loaded = _to_numpy(loaded)
+        finally:
+            reader.close()
+        self.times, self.counts, cols = loaded
+        self.numpy = use_numpy
+        self.cars = max(self.counts) if len(self.counts) else 0
+        for name, col in cols.items():
+            setattr(self, name, col)
+
+    @property
+    def duration(self):
+        if len(self.times) < 2:
+            return 0.0
+        return float(self.times[-1] - self.times[0])
+
+    def runs(self, c):
+        """``(k0, k1)`` frame ranges in which car ``c`` is present."""
+        out = []
+        k0 = None
+        counts = self.counts
+        for k in range(len(counts)):
+            if counts[k] > c:
+                if k0 is None:
+                    k0 = k
+            elif k0 is not None:
+                out.append((k0, k))
+                k0 = None
+        if k0 is not None:
+            out.append((k0, len(counts)))
+        return out
+
+
+def _load_frames(reader):
+    # Rows of each column per frame, transposed into per-car columns at the
+    # end so the copying happens in C rather than one value at a time
+    times = array("d")
+    counts = array("l")
+    rows = dict((name, []) for name in COLUMNS + FLAG_COLUMNS)
+    for t, snap, fresh in reader.frames():
+        n = snap.count
+        times.append(t)
+        counts.append(n)
+        src = {
+            "speed": snap.speed, "x": snap.x, "z": snap.z, "vx": snap.vx, "vz": snap.vz,
+            "spline": snap.spline, "has_pos": snap.has_pos, "has_vel": snap.has_vel,
+            "pit": snap.pit, "pitlane": snap.pitlane, "fresh": fresh,
+        }
+        for name, frames in rows.items():
+            frames.append(src[name][:n])
+    cars = max(counts) if len(counts) else 0
+    cols = {}
+    for name, frames in rows.items():
+        code = "d" if name in COLUMNS else "B"
+        for k in range(len(frames)):
+            row = frames[k]
+            if len(row) < cars:
+                # Absent cars hold zeros
+                frames[k] = list(row) + [0] * (cars - len(row))
+        cols[name] = [array(code, col) for col in zip(*frames)] if frames else []
+    return times, counts, cols
+
+
+def _to_numpy(loaded):
+    times, counts, cols = loaded
+    out = {}
+    for name, per_car in cols.items():
+        dtype = numpy.float64 if name in COLUMNS else numpy.uint8
+        if per_car:
+            out[name] = numpy.vstack([numpy.frombuffer(a, dtype=dtype) for a in per_car])
+        else:
+            out[name] = numpy.zeros((0, len(times)), dtype=dtype)
+    return numpy.frombuffer(times, dtype=numpy.float64), list(counts), out
+
+
+def _load_uniform(reader, recorder):
+    # Fixed car count: frames are equal-sized records NumPy reads in one go
+    mm = reader.buffer()
+    start = recorder.HEADER.size
+    if len(mm) < start + recorder.FRAME.size:
+        return None
+    n = recorder.FRAME.unpack_from(mm, start)[1]
+    car = numpy.dtype([
+        ("x", "<f4"), ("y", "<f4"), ("z", "<f4"), ("speed", "<f4"),
+        ("vx", "<f4"), ("vy", "<f4"), ("vz", "<f4"), ("spline", "<f4"),
+        ("lap", "<i4"), ("flags", "u1"),
+    ])
+    frame = numpy.dtype([("t", "<f8"), ("n", "<u4"), ("cars", car, (n,))])
+    if car.itemsize != recorder.CAR.size or frame.itemsize != recorder.FRAME.size + n * recorder.CAR.size:
+        return None
+    count = (len(mm) - start) // frame.itemsize
+    rec = numpy.frombuffer(mm, dtype=frame, count=count, offset=start).copy()
+    if count == 0 or n == 0 or (rec["n"] != n).any():
+        return None
+    cars = rec["cars"]
+    flags = cars["flags"].T
+    cols = {}
+    for name in COLUMNS:
+        cols[name] = cars[name].T.astype(numpy.float64)
+    cols["has_pos"] = (flags & recorder.F_HAS_POS != 0).astype(numpy.uint8)
+    cols["has_vel"] = (flags & recorder.F_HAS_VEL != 0).astype(numpy.uint8)
+    cols["pit"] = (flags & recorder.F_PIT != 0).astype(numpy.uint8)
+    cols["pitlane"] = (flags & recorder.F_PITLANE != 0).astype(numpy.uint8)
+    cols["fresh"] = flags & (recorder.F_SPEED_FRESH | recorder.F_VEL_FRESH)
+    return rec["t"].astype(numpy.float64), [n] * count, cols
+
+
+# --- nearest rival, as the live neighbour index measures it ---
+
+def spline_window(rec):
+    """Lap fraction of the spline index's window when ``SPATIAL_BACKEND``
+    is "spline" and the recording has a track length, else None (grid)."""
+    config = module("config")
+    if getattr(config, "SPATIAL_BACKEND", "grid") != "spline" or not rec.track_length > 0.0:
+        return None
+    return module("spatial").lap_window(
+        float(getattr(config, "SPLINE_WINDOW_M", 30.0)), rec.track_length)
+
+
+def nearest_rival(rec, k, c, cell, window=None):
+    """Distance from car ``c`` to its closest rival in frame ``k``.
+
+    Only rivals the live index pairs with ``c`` count: those in the
+    surrounding grid cells or, with a spline ``window`` (see
+    ``spline_window``), those within it ahead or behind along the lap.
+    """
+    no_neighbor = module("spatial").NO_NEIGHBOR_M
+    if rec.numpy:
+        xs = rec.x[:, k].tolist()
+        zs = rec.z[:, k].tolist()
+        has = rec.has_pos[:, k].tolist()
+        splines = rec.spline[:, k].tolist() if window is not None else None
+    else:
+        xs = [col[k] for col in rec.x]
+        zs = [col[k] for col in rec.z]
+        has = [col[k] for col in rec.has_pos]
+        splines = [col[k] for col in rec.spline] if window is not None else None
+    if not has[c]:
+        return no_neighbor
+    x = xs[c]
+    z = zs[c]
+    ix = int(x // cell)
+    iz = int(z // cell)
+    best = no_neighbor
+    for j in range(rec.counts[k]):
+        if j == c or not has[j]:
+            continue
+        xj = xs[j]
+        zj = zs[j]
+        if window is not None:
+            ahead = splines[j] - splines[c]
+            if ahead < 0.0:
+                ahead += 1.0
+            behind = splines[c] - splines[j]
+            if behind < 0.0:
+                behind += 1.0
+            if ahead > window and behind > window:
+                continue
+        elif abs(int(xj // cell) - ix) > 1 or abs(int(zj // cell) - iz) > 1:
+            continue
+        dx = x - xj
+        dz = z - zj
+        d = math.sqrt(dx * dx + dz * dz)
+        if d < best:
+            best = d
+    return best
+
+
+# --- pure Python: the app's ring buffers, one frame at a time ---
+# ``detect`` streams each run through evaluate; columns are only built for
+# ``sweep``, which shares them between configurations.
+
+def _python_samples(rec, c, k0, k1, speed_hist, yaw_hist):
+    # Feed car c's fresh samples of frames [k0, k1) to the histories like
+    # state._update_ring_buffers; yields (frame, whether a sample arrived)
+    heading_rate = module("state").heading_rate
+    recorder = module("recorder")
+    speed_fresh = recorder.F_SPEED_FRESH
+    vel_fresh = recorder.F_VEL_FRESH
+    last_heading = 0.0
+    last_heading_t = 0.0
+    times = rec.times
+    speed = rec.speed[c]
+    vx = rec.vx[c]
+    vz = rec.vz[c]
+    has_vel = rec.has_vel[c]
+    fresh = rec.fresh[c]
+    for k in range(k0, k1):
+        t = times[k]
+        fl = fresh[k]
+        if fl & speed_fresh:
+            speed_hist.append(t, speed[k])
+        if fl & vel_fresh:
+            yaw = 0.0
+            if has_vel[k] and (vx[k] != 0.0 or vz[k] != 0.0):
+                heading = math.atan2(vz[k], vx[k])
+                if last_heading_t > 0.0:
+                    yaw = heading_rate(heading, last_heading, t - last_heading_t)
+                last_heading = heading
+                last_heading_t = t
+            yaw_hist.append(t, yaw)
+        yield k, (fl & (speed_fresh | vel_fresh)) != 0
+
+
+def _python_columns(rec, c, k0, k1, th, cap):
+    detectors = module("detectors")
+    RingBuffer = module("ringbuf").RingBuffer
+    fill = detectors._fill_features  # the live scan's single-pass reader
+    f = detectors.CarFeatures()
+    speed_hist = RingBuffer(cap)
+    yaw_hist = RingBuffer(cap)
+    w1 = th.COLLISION_WINDOW_S
+    w2 = th.OFFTRACK_WINDOW_S
+    wy = th.yaw_avg_window()
+    out = dict((name, []) for name in detectors.CarFeatures.__slots__)
+    out["sp"] = rec.speed[c][k0:k1].tolist()
+    out["in_pit"] = [v != 0 for v in rec.pit[c][k0:k1]]
+    out["in_lane"] = [v != 0 for v in rec.pitlane[c][k0:k1]]
+    add_drop = out["drop"].append
+    add_dt = out["dt"].append
+    add_spre = out["spre"].append
+    add_snow = out["snow"].append
+    add_drop2 = out["drop2"].append
+    add_dt2 = out["dt2"].append
+    add_spre2 = out["spre2"].append
+    add_snow2 = out["snow2"].append
+    add_yaw = out["yaw"].append
+    add_yaw_avg = out["yaw_avg"].append
+    for k, changed in _python_samples(rec, c, k0, k1, speed_hist, yaw_hist):
+        if changed or k == k0:
+            fill(f, speed_hist, yaw_hist, w1, w2, wy)
+        add_drop(f.drop)
+        add_dt(f.dt)
+        add_spre(f.spre)
+        add_snow(f.snow)
+        add_drop2(f.drop2)
+        add_dt2(f.dt2)
+        add_spre2(f.spre2)
+        add_snow2(f.snow2)
+        add_yaw(f.yaw)
+        add_yaw_avg(f.yaw_avg)
+    return out
+
+
+def _python_evaluate(rec, c, k0, k1, th, cap, det, out, nearest):
+    # evaluate_columns without columns: features are read from the
+    # histories only on frames evaluate looks at, as the live scan does
+    detectors = module("detectors")
+    RingBuffer = module("ringbuf").RingBuffer
+    fill = detectors._fill_features
+    evaluate = det.evaluate
+    f = detectors.CarFeatures()
+    speed_hist = RingBuffer(cap)
+    yaw_hist = RingBuffer(cap)
+    w1 = th.COLLISION_WINDOW_S
+    w2 = th.OFFTRACK_WINDOW_S
+    wy = th.yaw_avg_window()
+    skip_stopped = th.IGNORE_STOPPED_CARS
+    stopped = th.STOPPED_SPEED_KMH
+    times = rec.times
+    speed = rec.speed[c]
+    pit = rec.pit[c]
+    pitlane = rec.pitlane[c]
+    stale = True
+    for k, changed in _python_samples(rec, c, k0, k1, speed_hist, yaw_hist):
+        if changed:
+            stale = True
+        sp = speed[k]
+        if skip_stopped and sp <= stopped:
+            continue
+        if stale:
+            fill(f, speed_hist, yaw_hist, w1, w2, wy)
+            stale = False
+        f.sp = sp
+        f.in_pit = pit[k] != 0
+        f.in_lane = pitlane[k] != 0
+        ev = evaluate(c, times[k], f, lambda i, k=k: nearest(k, i), th)
+        if ev is not None:
+            out.append((k, c, ev))
+
+
+# --- NumPy: whole-run feature columns, evaluate on candidate ticks ---
+
+def _speed_columns(ts, vs, cap, window):
+    # speed_delta for every sample index of a history filled with (ts, vs)
+    np = numpy
+    size = len(ts)
+    jj = np.arange(size)
+    length = np.minimum(jj + 1, cap)
+    chosen = np.full(size, -1)
+    for m in range(1, cap - 1):
+        open_ = (chosen < 0) & (length - 2 >= m)
+        if not open_.any():
+            break
+        prev = np.maximum(jj - m, 0)
+        hit = open_ & (ts - ts[prev] >= window)
+        chosen[hit] = m
+    chosen = np.where(chosen < 0, length - 1, chosen)
+    then = jj - chosen
+    s_then = vs[then]
+    dt = np.maximum(0.0001, ts - ts[then])
+    drop = s_then - vs
+    ok = length >= 2
+    zero = np.zeros(size)
+    return (np.where(ok, drop, zero), np.where(ok, dt, zero),
+            np.where(ok, s_then, zero), np.where(ok, vs, zero))
+
+
+def _yaw_columns(ts, vx, vz, has_vel):
+    # Yaw-rate samples as state._update_ring_buffers appends them
+    np = numpy
+    yaw = np.zeros(len(ts))
+    valid = np.nonzero((has_vel != 0) & ((vx != 0.0) | (vz != 0.0)))[0]
+    if len(valid) < 2:
+        return yaw
+    heading = np.array([math.atan2(z, x) for z, x in zip(vz[valid].tolist(), vx[valid].tolist())])
+    diff = heading[1:] - heading[:-1]
+    diff = np.where(diff > math.pi, diff - 2.0 * math.pi, diff)
+    diff = np.where(diff < -math.pi, diff + 2.0 * math.pi, diff)
+    dt = ts[valid[1:]] - ts[valid[:-1]]
+    dt = np.where(dt <= 0.0, 0.016, dt)
+    yaw[valid[1:]] = np.abs(diff) / dt
+    return yaw
+
+
+def _mean_columns(ts, vs, cap, window):
+    # RingBuffer.mean(window) for every sample index, summed newest first
+    np = numpy
+    size = len(ts)
+    jj = np.arange(size)
+    length = np.minimum(jj + 1, cap)
+    t_min = ts - window
+    total = 0.0 + vs
+    count = np.ones(size)
+    alive = np.ones(size, dtype=bool)
+    for m in range(1, cap):
+        prev = np.maximum(jj - m, 0)
+        alive &= (length > m) & (ts[prev] >= t_min)
+        if not alive.any():
+            break
+        total = np.where(alive, total + vs[prev], total)
+        count += alive
+    return total / count
+
+
+def _at_frames(sample_frames, values, k0, k1, empty=0.0):
+    # Latest sample value at each frame of [k0, k1)
+    np = numpy
+    j = np.searchsorted(sample_frames, np.arange(k0, k1), side="right") - 1
+    if not len(values):
+        return np.full(k1 - k0, empty)
+    return np.where(j >= 0, values[np.maximum(j, 0)], empty)
+
+
+def feature_columns(rec, c, k0, k1, th, cap):
+    """Detector inputs of car ``c`` for frames ``[k0, k1)`` (one run).
+
+    Returns a dict of ``CarFeatures`` slot name -> column (lists, or
+    arrays with NumPy), histories starting empty at ``k0`` as they do when
+    a car joins the session. Only the windows of ``th`` matter.
+    """
+    if not rec.numpy:
+        return _python_columns(rec, c, k0, k1, th, cap)
+    np = numpy
+    recorder = module("recorder")
+    times = rec.times[k0:k1]
+    fresh = rec.fresh[c, k0:k1]
+    out = {}
+    sp = rec.speed[c, k0:k1]
+    out["sp"] = sp
+    out["in_pit"] = rec.pit[c, k0:k1] != 0
+    out["in_lane"] = rec.pitlane[c, k0:k1] != 0
+
+    si = np.nonzero(fresh & recorder.F_SPEED_FRESH)[0]
+    ts = times[si]
+    vs = sp[si]
+    for suffix, window in (("", th.COLLISION_WINDOW_S), ("2", th.OFFTRACK_WINDOW_S)):
+        cols = _speed_columns(ts, vs, cap, window) if len(si) else ((), (), (), ())
+        for name, values in zip(("drop", "dt", "spre", "snow"), cols):
+            out[name + suffix] = _at_frames(si, np.asarray(values), 0, k1 - k0)
+
+    vi = np.nonzero(fresh & recorder.F_VEL_FRESH)[0]
+    tv = times[vi]
+    yaw = _yaw_columns(tv, rec.vx[c, k0:k1][vi], rec.vz[c, k0:k1][vi], rec.has_vel[c, k0:k1][vi])
+    out["yaw"] = _at_frames(vi, yaw, 0, k1 - k0)
+    avg = _mean_columns(tv, yaw, cap, th.yaw_avg_window()) if len(vi) else yaw
+    out["yaw_avg"] = _at_frames(vi, avg, 0, k1 - k0)
+    return out
+
+
+def candidate_mask(cols, th):
+    """Ticks where ``evaluate`` could start, confirm or emit anything."""
+    sp = cols["sp"]
+    in_pit = cols["in_pit"]
+    drop = cols["drop"]
+    dt = cols["dt"]
+    spre = cols["spre"]
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        decel = numpy.where(dt > 0.0, drop / numpy.where(dt > 0.0, dt, 1.0), 0.0)
+        ratio = numpy.where(spre > 0.0, drop / numpy.maximum(1.0, spre), 0.0)
+        drop2 = cols["drop2"]
+        spre2 = cols["spre2"]
+        ratio2 = numpy.where(spre2 > 0.0, drop2 / numpy.maximum(1.0, spre2), 0.0)
+    collision = (
+        (dt >= th.COLLISION_MIN_DT_S) & (drop >= th.COLLISION_MIN_DROP_KMH)
+        & (spre >= th.COLLISION_MIN_PRE_SPEED_KMH) & (ratio >= th.COLLISION_MIN_DROP_RATIO)
+        & (decel >= th.COLLISION_MIN_DECEL_KMH_S) & (cols["snow"] <= th.COLLISION_MAX_POST_SPEED_KMH)
+        & ~in_pit
+    )
+    yaw = cols["yaw"]
+    spin = (sp <= th.SPIN_MAX_SPEED_KMH) & (yaw >= th.SPIN_MIN_YAW_RAD_S)
+    snow2 = cols["snow2"]
+    offtrack = (
+        (cols["dt2"] > 0.0) & ~in_pit
+        & (spre2 >= th.OFFTRACK_MIN_PRE_SPEED_KMH) & (drop2 >= th.OFFTRACK_MIN_DROP_KMH)
+        & (snow2 >= th.OFFTRACK_MIN_NOW_SPEED_KMH) & (snow2 <= th.OFFTRACK_MAX_NOW_SPEED_KMH)
+        & (yaw >= th.OFFTRACK_YAW_MIN_RAD_S) & (yaw <= th.OFFTRACK_YAW_MAX_RAD_S)
+        & (cols["yaw_avg"] >= th.OFFTRACK_AVG_YAW_MIN_RAD_S)
+        & (ratio2 >= th.OFFTRACK_MIN_DROP_RATIO) & (ratio2 <= th.OFFTRACK_MAX_DROP_RATIO)
+    )
+    return collision | spin | offtrack
+
+
+def eligible_mask(cols, th):
+    """Ticks ``evaluate`` looks at (it returns early for stopped cars)."""
+    if th.IGNORE_STOPPED_CARS:
+        return cols["sp"] > th.STOPPED_SPEED_KMH
+    return numpy.ones(len(cols["sp"]), dtype=bool)
+
+
+def evaluate_columns(rec, c, k0, cols, th, det, out, nearest):
+    """Run ``det.evaluate`` for car ``c`` over one run's feature columns.
+
+    Appends ``(frame, car, Event)`` to ``out``;
+    ``nearest(k, i)`` is the nearest-rival distance of car ``i`` in frame
+    ``k``.
+    """
+    names = module("detectors").CarFeatures.__slots__
+    if rec.numpy:
+        eligible = numpy.nonzero(eligible_mask(cols, th))[0]
+        hits = numpy.nonzero(candidate_mask(cols, th)[eligible])[0].tolist()
+
+        def value(col, q):
+            return col[q].item()
+    else:
+        # No cheap prefilter without NumPy: every moving tick is evaluated
+        sp = cols["sp"]
+        if th.IGNORE_STOPPED_CARS:
+            stopped = th.STOPPED_SPEED_KMH
+            eligible = [q for q in range(len(sp)) if sp[q] > stopped]
+        else:
+            eligible = list(range(len(sp)))
+        hits = range(len(eligible))
+        value = operator.getitem
+    times = rec.times
+    f = module("detectors").CarFeatures()
+    last = len(eligible)
+    h = 0
+    p = -1
+    while True:
+        if c in det.pending_collision or c in det.pending_offtrack or c in det.pending_spin:
+            # The next eligible tick confirms or clears the pending entry
+            p += 1
+        else:
+            while h < len(hits) and hits[h] <= p:
+                h += 1
+            if h == len(hits):
+                break
+            p = hits[h]
+        if p >= last:
+            break
+        q = int(eligible[p])
+        for name in names:
+            setattr(f, name, value(cols[name], q))
+        k = k0 + q
+        ev = det.evaluate(c, float(times[k]), f, lambda i, k=k: nearest(k, i), th)
+        if ev is not None:
+            out.append((k, c, ev))
+
+
+def pit_entry_frames(rec, c, k0, k1):
+    """Frames of one run where car ``c`` enters the pit lane (or box) from
+    the track, like ``state``'s pit tracker; the run's first frame only
+    primes it."""
+    if rec.numpy:
+        inside = (rec.pit[c, k0:k1] != 0) | (rec.pitlane[c, k0:k1] != 0)
+        return (numpy.nonzero(inside[1:] & ~inside[:-1])[0] + (k0 + 1)).tolist()
+    pit = rec.pit[c]
+    pitlane = rec.pitlane[c]
+    out = []
+    was = pit[k0] or pitlane[k0]
+    for k in range(k0 + 1, k1):
+        inside = pit[k] or pitlane[k]
+        if inside and not was:
+            out.append(k)
+        was = inside
+    return out
+
+
+# --- driver ---
+
+def detect(rec, detectors, th=None, cell=None):
+    """Events of the whole recording: ``[(t, Event)]`` in live scan order."""
+    if th is None:
+        th = detectors.Thresholds()
+    config = module("config")
+    if cell is None:
+        cell = float(config.CELL_SIZE_M)
+    cap = getattr(config, "HISTORY_SAMPLES", 10)
+    window = spline_window(rec)
+    found = []
+
+    def nearest(k, i):
+        return nearest_rival(rec, k, i, cell, window)
+
+    for c in range(rec.cars):
+        det = detectors.DetectorState()
+        for k0, k1 in rec.runs(c):
+            if rec.numpy:
+                cols = feature_columns(rec, c, k0, k1, th, cap)
+                evaluate_columns(rec, c, k0, cols, th, det, found, nearest)
+            else:
+                _python_evaluate(rec, c, k0, k1, th, cap, det, found, nearest)
+            for k in pit_entry_frames(rec, c, k0, k1):
+                found.append((k, c, detectors.pit_event(c, float(rec.times[k]))))
+    return order_events(rec, found)
+
+
+def order_events(rec, found):
+    """``[(k, car, Event)]`` -> ``[(t, Event)]`` as ``scan`` returns them."""
+    found.sort(key=lambda item: (item[0], item[1]))
+    return [(float(rec.times[k]), ev) for k, _, ev in found]
+
+
+def live_events(path, overrides=None):
+    """Reference: every recorded frame through ``state`` and ``detectors.scan``."""
+    detectors = load_detectors(path)
+    config = module("config")
+    state = module("state")
+    spatial = module("spatial")
+    for name, value in (overrides or {}).items():
+        setattr(config, name, value)
+    detectors.reload_config()
+    reader = module("recorder").ReplayReader(path)
+    out = []
+    try:
+        for t, snap, fresh in reader.frames():
+            state.apply_snapshot(t, snap, fresh)
+            spatial.refresh_index(state, config.CELL_SIZE_M)
+            out.extend((t, ev) for ev in detectors.scan(state, t))
+    finally:
+        reader.close()
+    return out
+
+
+def run(path, overrides=None, use_numpy=None):
+    """Load ``path`` and detect with ``overrides``; returns ``(events, rec)``."""
+    detectors = load_detectors(path)
+    config = module("config")
+    for name, value in (overrides or {}).items():
+        setattr(config, name, value)
+    rec = Recording(path, use_numpy)
+    return detect(rec, detectors, detectors.Thresholds(overrides)), rec
+
+
+def event_key(item):
+    t, ev = item
+    return (t, ev.car_id, ev.type, ev.severity)
+
+
+def compare(events, reference):
+    """First differing position of two event lists, or None if equal."""
+    for pos, (a, b) in enumerate(zip(events, reference)):
+        if event_key(a) != event_key(b):
+            return pos
+    if len(events) != len(reference):
+        return min(len(events), len(reference))
+    return None
+
+
+def parse_value(text):
+    """Setting from the command line: a number, true/false, or else the
+    text itself (e.g. ``SPATIAL_BACKEND=spline``)."""
+    low = text.strip().lower()
+    if low in ("true", "false"):
+        return low == "true"
+    try:
+        return float(text)
+    except ValueError:
+        return text.strip()
+
+
+def split_assignment(pair):
+    """``"NAME=VALUE"`` -> ``("NAME", "VALUE")``."""
+    name, sep, value = pair.partition("=")
+    name = name.strip().upper()
+    if not sep or not name:
+        raise ValueError("expected NAME=VALUE, got {!r}".format(pair))
+    return name, value
+
+
+def parse_overrides(pairs):
+    """``["NAME=VALUE", ...]`` -> dict of config overrides."""
+    out = {}
+    for pair in pairs or ():
+        name, value = split_assignment(pair)
+        out[name] = parse_value(value)
+    return out
+
+
+def format_events(events, t0=0.0):
+    lines = []
+    for t, ev in events:
+        lines.append("{:9.2f}s  {:<9} car {:>3}  severity {:.2f}".format(t - t0, ev.type, ev.car_id, ev.severity))
+    return "\n".join(lines)
@@ -0,0 +1,65 @@
+"""Car-state source that plays back a telemetry recording."""
+
+from .runner import import_module_only
+
+
+class ReplaySource(object):
+    """Serves a ``recorder`` file to ``fake_ac.FakeAC`` by elapsed time.
+
+    ``advance(t)`` moves to the last frame recorded at most ``t`` seconds
+    after the first one; readers return that frame's values.
+    """
+
+    def __init__(self, path):
+        recorder = import_module_only("recorder")
+        self.reader = recorder.ReplayReader(path)
+        self.frames = self.reader.index()
+        if not self.frames:
+            raise ValueError("{}: recording has no frames".format(path))
+        self.snap = import_module_only("snapshot").CarSnapshot()
+        self.track_length = self.reader.track_length
+        self.t = 0.0
+        self._t0 = self.frames[0][0]
+        self._k = 0
+        self.reader.read_frame(self.frames[0][1], self.snap)
+        self.count = self.snap.count
+
+    @property
+    def duration(self):
+        return self.frames[-1][0] - self._t0
+
+    def advance(self, t):
+        self.t = t
+        k = self._k
+        last = len(self.frames) - 1
+        while k < last and self.frames[k + 1][0] - self._t0 <= t:
+            k += 1
+        if k != self._k:
+            self._k = k
+            self.reader.read_frame(self.frames[k][1], self.snap)
+            self.count = self.snap.count
+
+    def close(self):
+        self.reader.close()
+
+    # --- per-car readers (fake_ac.FakeAC) ---
+    def world_position(self, i):
+        return self.snap.pos(i)
+
+    def speed_kmh(self, i):
+        return self.snap.speed[i]
+
+    def velocity(self, i):
+        return self.snap.velocity(i)
+
+    def spline(self, i):
+        return self.snap.spline[i]
+
+    def lap(self, i):
+        return self.snap.lap[i]
+
+    def in_pit(self, i):
+        return self.snap.pit[i] != 0
+
+    def in_pitlane(self, i):
+        return self.snap.pitlane[i] != 0
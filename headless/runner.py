@@ -0,0 +1,528 @@
+"""Drive the app headless on a deterministic clock."""
+
+import math
+import os
+import random
+import sys
+import time
+from importlib import import_module
+
+from . import fake_ac
+from .synthetic import SyntheticField
+
+# Arbitrary non-zero epoch: the app treats 0.0 as "never"
+EPOCH = 1000.0
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PACKAGE = os.path.basename(_APP_DIR)
+
+
+class SimClock(object):
+    def __init__(self, t=EPOCH):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+def _purge_package():
+    # Drop previously imported app modules so every run starts from scratch
+    headless = PACKAGE + ".headless"
+    for name in list(sys.modules):
+        if name == headless or name.startswith(headless + "."):
+            continue
+        if name == PACKAGE or name.startswith(PACKAGE + "."):
+            del sys.modules[name]
+
+
+def load_app(fake):
+    """Install ``fake`` as AC and import a fresh copy of the app package.
+
+    Returns the package's ``app`` module; the other modules are reachable
+    as ``sys.modules[PACKAGE + ".<name>"]``.
+    """
+    fake_ac.install(fake)
+    parent = os.path.dirname(_APP_DIR)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    _purge_package()
+    return import_module(PACKAGE + ".app")
+
+
+def import_module_only(name):
+    """Import an app module that does not need AC (e.g. ``"recorder"``)."""
+    parent = os.path.dirname(_APP_DIR)
+    if parent not in sys.path:
+        sys.path.insert(0, parent)
+    return import_module(PACKAGE + "." + name)
+
+
+def module(name):
+    """An app module of the currently loaded copy (e.g. ``"state"``)."""
+    return sys.modules[PACKAGE + "." + name]
+
+
+class Session(object):
+    """One headless session: a source, the fake AC and the loaded app."""
+
+    def __init__(self, source, seed=1, echo_log=False):
+        self.source = source
+        self.fake = fake_ac.FakeAC(source, echo_log=echo_log)
+        self.app = load_app(self.fake)
+        self.clock = SimClock()
+        module("clock").set_source(self.clock)
+        random.seed(seed)
+
+    def start(self):
+        self.source.advance(0.0)
+        return self.app.acMain("headless")
+
+    def frame(self, dt):
+        """Advance source and clock by ``dt`` and run one ``acUpdate``."""
+        self.clock.t += dt
+        self.source.advance(self.clock.t - EPOCH)
+        self.app.acUpdate(dt)
+
+    def run(self, seconds, fps=60.0):
+        dt = 1.0 / fps
+        for _ in range(int(seconds * fps)):
+            self.frame(dt)
+
+    def close(self):
+        module("logging_utils").flush(force=True)
+        module("clock").set_source(None)
+
+
+def make_source(cars=30, seed=1, replay=None):
+    """A ``ReplaySource`` for ``replay`` if given, else a synthetic field."""
+    if replay:
+        from .replay import ReplaySource
+        return ReplaySource(replay)
+    return SyntheticField(cars, seed=seed)
+
+
+def run(cars=30, seconds=120.0, fps=60.0, seed=1, echo_log=False, replay=None, record=None,
+        labels=None):
+    """Run a session; returns the ``FakeAC`` with logs and focus history.
+
+    ``replay`` plays a recording instead of synthetic traffic; ``record``
+    streams the app's snapshots to a new recording and ``labels`` writes
+    the synthetic incidents next to it as ground truth.
+    """
+    source = make_source(cars, seed, replay)
+    session = Session(source, seed=seed, echo_log=echo_log)
+    try:
+        session.start()
+        if record:
+            module("state").start_recording(record)
+        session.run(seconds, fps)
+    finally:
+        if record:
+            module("state").stop_recording()
+        session.close()
+    if record and labels and hasattr(source, "started"):
+        _save_labels(labels, record, source.started)
+    return session.fake
+
+
+def _save_labels(path, recording, started):
+    from . import labels as labels_mod
+    reader = module("recorder").ReplayReader(recording)
+    try:
+        frames = reader.index()
+    finally:
+        reader.close()
+    if not frames:
+        return
+    # Source time -> seconds since the first recorded frame
+    offset = EPOCH - frames[0][0]
+    labels_mod.save(path, [(t + offset, car, kind) for t, car, kind in started])
+
+
+# --- benchmark ---
+
+COUNTERS = ("cars_scanned", "distance_tests", "timers_fired")
+
+
+def bench(car_counts=(10, 30, 60, 120), ticks=600, warmup_s=10.0, seed=1, replay=None):
+    """Per-stage director tick latency for each field size.
+
+    Runs ``app.director_tick`` with the app's stage profiler (``profiler``)
+    switched on. With ``replay`` the recording's field is measured instead
+    of synthetic traffic (``car_counts`` is ignored). Returns
+    ``{cars: ({stage: (p50_ms, p95_ms, max_ms)}, {counter: mean per tick})}``.
+    """
+    results = {}
+    if replay:
+        car_counts = (None,)
+    for cars in car_counts:
+        source = make_source(cars, seed, replay)
+        cars = source.count
+        session = Session(source, seed=seed)
+        try:
+            config = module("config")
+            config.PROFILE_STAGES = True
+            config.PROFILE_LOG_INTERVAL_S = 0.0
+            session.start()
+            session.run(warmup_s)
+            dt = 1.0 / config.DIRECTOR_TICK_HZ
+            prof = module("profiler").reset(window=ticks)
+            for _ in range(ticks):
+                session.clock.t += dt
+                session.source.advance(session.clock.t - EPOCH)
+                session.app.director_tick(session.clock.t)
+        finally:
+            session.close()
+        counters = dict((name, prof.counter_mean(name)) for name in COUNTERS)
+        results[cars] = (prof.summary(), counters)
+    return results
+
+
+def format_bench(results):
+    stages = module("profiler").STAGES + ("total",)
+    lines = ["{:>5}  {:<14} {:>9} {:>9} {:>9}".format("cars", "stage", "p50 ms", "p95 ms", "max ms")]
+    for cars in sorted(results):
+        row, counters = results[cars]
+        for stage in stages:
+            p50, p95, mx = row[stage]
+            lines.append("{:>5}  {:<14} {:>9.3f} {:>9.3f} {:>9.3f}".format(cars, stage, p50, p95, mx))
+        lines.append("{:>5}  {:<14} {:>9.0f} {:>9.0f} {:>9.2f}   scanned/tests/timers per tick".format(
+            cars, "counters", counters["cars_scanned"], counters["distance_tests"],
+            counters["timers_fired"]))
+    return "\n".join(lines)
+
+
+def _reference_scan(detectors, st, now, det):
+    # detectors.scan as it was before the flattened loop: thresholds built
+    # per call and features read through the per-car history accessors.
+    # Kept to measure the live scan against.
+    index = module("spatial").current_index(st)
+    th = detectors.Thresholds()
+    f = detectors.CarFeatures()
+    events = []
+    for i in range(st.car_count()):
+        if th.IGNORE_STOPPED_CARS and st.speed_kmh(i) <= th.STOPPED_SPEED_KMH:
+            continue
+        f.sp = st.speed_kmh(i)
+        f.in_pit = st.in_pit(i)
+        f.in_lane = st.in_pitlane(i)
+        f.drop, f.dt, f.spre, f.snow = detectors.speed_delta(st.speed_hist(i), th.COLLISION_WINDOW_S)
+        f.yaw = st.yaw_hist(i).latest()
+        f.drop2, f.dt2, f.spre2, f.snow2 = detectors.speed_delta(st.speed_hist(i), th.OFFTRACK_WINDOW_S)
+        f.yaw_avg = st.yaw_hist(i).mean(th.yaw_avg_window())
+        ev = det.evaluate(i, now, f, index.nearest, th)
+        if ev is not None:
+            events.append(ev)
+            detectors._log_event(ev, f, index)
+    detectors.add_pit_events(events, st, now)
+    return events
+
+
+def _event_tuple(ev):
+    return (ev.car_id, ev.type, ev.severity, ev.t_expires)
+
+
+def scan_bench(cars=60, ticks=600, warmup_s=10.0, seed=1, replay=None):
+    """Detector scan cost per car: live ``detectors.scan`` vs the old loop.
+
+    After every director tick both loops scan the same state with their
+    own ``DetectorState``. Returns ``(new_us, old_us, scanned, same)``:
+    microseconds per scanned car, cars scanned per tick and whether both
+    produced identical events.
+    """
+    clock = time.perf_counter
+    source = make_source(cars, seed, replay)
+    session = Session(source, seed=seed)
+    try:
+        config = module("config")
+        session.start()
+        session.run(warmup_s)
+        detectors = module("detectors")
+        st = module("state")
+        live_det = detectors._detector
+        det_new = detectors.DetectorState()
+        det_old = detectors.DetectorState()
+        dt = 1.0 / config.DIRECTOR_TICK_HZ
+        t_new = t_old = 0.0
+        scanned = 0
+        same = True
+        for _ in range(ticks):
+            session.clock.t += dt
+            now = session.clock.t
+            session.source.advance(now - EPOCH)
+            session.app.director_tick(now)
+            detectors._detector = det_new
+            try:
+                t0 = clock()
+                new = detectors.scan(st, now)
+                t1 = clock()
+            finally:
+                detectors._detector = live_det
+            scanned += detectors.scanned_last_tick()
+            new = [_event_tuple(ev) for ev in new]
+            t2 = clock()
+            old = _reference_scan(detectors, st, now, det_old)
+            t3 = clock()
+            t_new += t1 - t0
+            t_old += t3 - t2
+            if new != [_event_tuple(ev) for ev in old]:
+                same = False
+    finally:
+        session.close()
+    per = max(1, scanned)
+    return t_new * 1e6 / per, t_old * 1e6 / per, scanned / float(ticks), same
+
+
+def format_scan_bench(label, result):
+    new_us, old_us, scanned, same = result
+    return ("{}, {:.0f} scanned per tick: scan {:.2f} us/car, previous loop {:.2f} us/car "
+            "({:.2f}x), events {}".format(label, scanned, new_us, old_us,
+                                          old_us / new_us if new_us > 0.0 else 0.0,
+                                          "identical" if same else "DIFFER"))
+
+
+def _reference_pick(st, now):
+    # interest.pick_best_by_interest as it was before whole-field ranking:
+    # five term functions per car, each reading state accessors
+    config = module("config")
+    proximity = module("proximity")
+    n = st.car_count()
+    if n < config.MIN_CARS_REQUIRED:
+        return -1
+    order = module("race_order").current_order(st)
+
+    def clamp(x, a, b):
+        return a if x < a else (b if x > b else x)
+
+    def leader_moment(i):
+        leader_base = float(n - order.position_of(i) + 1) / float(n) if n > 0 else 0.0
+        progress = st.spline(i)
+        start_w = config.LEADER_START_WINDOW
+        end_w = config.LEADER_END_WINDOW
+        envelope = 1.0
+        if progress <= start_w:
+            envelope = progress / start_w if start_w > 0.0 else 1.0
+        elif progress >= (1.0 - end_w):
+            envelope = (1.0 - progress) / end_w if end_w > 0.0 else 1.0
+        return leader_base * envelope
+
+    def rarity(i):
+        last = st.last_focused_at(i)
+        dt = now - last if last > 0.0 else 1e9
+        return clamp(dt / max(15.0, 0.5 * config.DWELL_BASE * max(1, n)), 0.0, 1.0)
+
+    def hysteresis(i):
+        last = st.last_focused_at(i)
+        if last <= 0.0:
+            return 0.0
+        return 1.0 if (now - last) < config.HYSTERESIS_WINDOW else 0.0
+
+    def pit_cameo(i):
+        return 0.0
+
+    best = -1
+    best_score = -9999.0
+    unseen = st.unseen_set()
+    for c in range(n):
+        if not st.active(c):
+            continue
+        score = (
+            config.W_PROX * proximity.score(c)
+            + config.W_LEADER * leader_moment(c)
+            + config.W_RARITY * rarity(c)
+            - config.W_HYST * hysteresis(c)
+            + config.W_PIT * pit_cameo(c)
+        )
+        if c in unseen:
+            score += config.UNSEEN_BONUS
+        if score > best_score:
+            best_score = score
+            best = c
+    return best
+
+
+def rank_bench(cars=60, ticks=600, warmup_s=10.0, seed=1, replay=None):
+    """Natural-pick cost: whole-field ranking vs the previous per-car loop.
+
+    After every director tick the field is ranked with the pure-Python
+    path, with NumPy (when importable) and picked with the old loop.
+    Returns ``({path: us per ranking}, same)``; ``same`` is False if any
+    ranking path disagreed (the previous loop is timed only: it scores
+    every term on every call, the ranking reads the term columns).
+    """
+    clock = time.perf_counter
+    source = make_source(cars, seed, replay)
+    session = Session(source, seed=seed)
+    try:
+        config = module("config")
+        interest = module("interest")
+        st = module("state")
+        session.start()
+        session.run(warmup_s)
+        dt = 1.0 / config.DIRECTOR_TICK_HZ
+        paths = ["python", "previous loop"]
+        if interest.numpy is not None:
+            paths.insert(1, "numpy")
+        totals = dict((p, 0.0) for p in paths)
+        same = True
+        for tick in range(ticks):
+            session.clock.t += dt
+            now = session.clock.t
+            session.source.advance(now - EPOCH)
+            session.app.director_tick(now)
+            # Vary focus history so rarity and hysteresis change
+            if tick % 7 == 0 and st.car_count():
+                st.set_current_focus(tick % st.car_count(), now)
+            picks = []
+            rankings = []
+            for p in paths:
+                t0 = clock()
+                if p == "previous loop":
+                    picks.append(_reference_pick(st, now))
+                else:
+                    config.INTEREST_NUMPY_MIN_CARS = 0 if p == "numpy" else 1 << 30
+                    rankings.append(interest.rank_by_interest(st, now))
+                totals[p] += clock() - t0
+            for ranking in rankings:
+                if ranking != rankings[0]:
+                    same = False
+    finally:
+        session.close()
+    return dict((p, totals[p] * 1e6 / ticks) for p in paths), same
+
+
+def format_rank_bench(label, result):
+    times, same = result
+    parts = ", ".join("{} {:.1f} us".format(p, times[p]) for p in sorted(times))
+    return "{}: ranking {}; rankings {}".format(label, parts, "identical" if same else "DIFFER")
+
+
+INDEX_SCENARIOS = ("start", "race", "spread")
+
+
+def _index_session(cars, scenario, seed):
+    # A session whose state holds the scenario's field
+    source = SyntheticField(cars, seed=seed)
+    session = Session(source, seed=seed)
+    session.start()
+    if scenario == "start":
+        session.run(1.0)  # stopped on the grid, single file
+    elif scenario == "race":
+        session.run(60.0)  # bunched up by the corners
+    else:
+        # Endurance-like: the field spread evenly around the lap
+        session.run(10.0)
+        for i in range(source.count):
+            source.progress[i] = 3.0 + float(i) / source.count
+        session.run(0.5)
+    return session
+
+
+def _reference_grid(st, cell):
+    # The neighbour grid before in-place rebuilds: a dict of tuple-keyed
+    # cell lists and per-car neighbour/distance lists; returns nearest_d
+    n = st.car_count()
+    grid = {}
+    for i in range(n):
+        p = st.pos(i)
+        if p is None:
+            continue
+        key = (int(p[0] // cell), int(p[2] // cell))
+        bucket = grid.get(key)
+        if bucket is None:
+            bucket = []
+            grid[key] = bucket
+        bucket.append(i)
+    snap = st.snapshot()
+    xs = snap.x
+    zs = snap.z
+    neighbors = [[] for _ in range(n)]
+    distances = [[] for _ in range(n)]
+    nearest_d = [1e9] * n
+
+    def add(i, j):
+        dx = xs[i] - xs[j]
+        dz = zs[i] - zs[j]
+        d = math.sqrt(dx * dx + dz * dz)
+        neighbors[i].append(j)
+        distances[i].append(d)
+        neighbors[j].append(i)
+        distances[j].append(d)
+        if d < nearest_d[i]:
+            nearest_d[i] = d
+        if d < nearest_d[j]:
+            nearest_d[j] = d
+
+    for (ix, iz), bucket in grid.items():
+        m = len(bucket)
+        for a in range(m):
+            for b in range(a + 1, m):
+                add(bucket[a], bucket[b])
+        for dx, dz in ((1, -1), (1, 0), (1, 1), (0, 1)):
+            other = grid.get((ix + dx, iz + dz))
+            if other:
+                for i in bucket:
+                    for j in other:
+                        add(i, j)
+    return nearest_d
+
+
+def index_bench(car_counts=(20, 60, 120), repeats=200, seed=1):
+    """Neighbour index rebuild and pair measurement cost per backend on three kinds of field.
+
+    Returns ``{(cars, scenario): {backend: (us per build, pairs)}}``, with
+    ``"previous"`` timing the earlier dict-of-lists grid, plus under
+    ``"grid_same"`` whether the grid's nearest rivals match it and under
+    ``"close_mismatch"`` the number of cars whose nearest rival within
+    ``COLLISION_NEAR_RADIUS_M`` differs between grid and spline.
+    """
+    clock = time.perf_counter
+    results = {}
+    for cars in car_counts:
+        for scenario in INDEX_SCENARIOS:
+            session = _index_session(cars, scenario, seed)
+            try:
+                config = module("config")
+                spatial = module("spatial")
+                st = module("state")
+                cell = config.CELL_SIZE_M
+                row = {}
+                built = {}
+                for backend in ("grid", "spline"):
+                    index = spatial.build_index(st, cell, backend)
+                    t0 = clock()
+                    for _ in range(repeats):
+                        index.rebuild(st)
+                        index.measure_pairs()
+                    row[backend] = ((clock() - t0) * 1e6 / repeats, index.pairs)
+                    built[backend] = index
+                t0 = clock()
+                for _ in range(repeats):
+                    reference = _reference_grid(st, cell)
+                row["previous"] = ((clock() - t0) * 1e6 / repeats, built["grid"].pairs)
+                n = st.car_count()
+                row["grid_same"] = list(built["grid"].nearest_d[:n]) == reference
+                radius = config.COLLISION_NEAR_RADIUS_M
+                mismatch = 0
+                for i in range(n):
+                    near = [built[b].nearest(i) <= radius for b in ("grid", "spline")]
+                    if near[0] != near[1]:
+                        mismatch += 1
+                row["close_mismatch"] = mismatch
+                results[(cars, scenario)] = row
+            finally:
+                session.close()
+    return results
+
+
+def format_index_bench(results):
+    lines = ["{:>5}  {:<7} {:>11} {:>8} {:>10} {:>7} {:>10} {:>7} {:>9}".format(
+        "cars", "field", "previous us", "grid us", "nearest", "pairs", "spline us", "pairs",
+        "mismatch")]
+    for key in sorted(results, key=lambda k: (k[0], INDEX_SCENARIOS.index(k[1]))):
+        row = results[key]
+        lines.append("{:>5}  {:<7} {:>11.1f} {:>8.1f} {:>10} {:>7} {:>10.1f} {:>7} {:>9}".format(
+            key[0], key[1], row["previous"][0], row["grid"][0],
+            "same" if row["grid_same"] else "DIFFER", row["grid"][1],
+            row["spline"][0], row["spline"][1], row["close_mismatch"]))
+    return "\n".join(lines)
@@ -0,0 +1,195 @@
+"""Detector threshold sweeps against a labelled recording.
+
+Every configuration of a grid is scored on the same recording. Feature
+columns (speed deltas, yaw averages) are computed once per car and window
+setting, nearest-rival distances once per frame and car, and only the
+decision pass (``DetectorState.evaluate``) runs per configuration. Cars
+are spread over a process pool.
+"""
+
+import itertools
+import multiprocessing
+
+from . import labels as labels_mod
+from . import offline
+from .runner import import_module_only, module
+
+SCORED = ("collision", "offtrack")
+
+
+def parse_grid(specs):
+    """``["NAME=v1,v2,...", "NAME=start:stop:step"]`` -> ``[(name, values)]``.
+
+    Ranges include ``stop`` (within rounding of ``step``).
+    """
+    grid = []
+    for spec in specs:
+        name, text = offline.split_assignment(spec)
+        if ":" in text:
+            parts = [float(x) for x in text.split(":")]
+            if len(parts) != 3 or parts[2] <= 0.0:
+                raise ValueError("expected NAME=start:stop:step, got {!r}".format(spec))
+            start, stop, step = parts
+            count = int((stop - start) / step + 1e-9) + 1
+            values = [round(start + k * step, 10) for k in range(max(0, count))]
+        else:
+            values = [offline.parse_value(x) for x in text.split(",") if x.strip()]
+        if not values:
+            raise ValueError("no values for {}".format(name))
+        grid.append((name, values))
+    return grid
+
+
+def expand(grid, base=None):
+    """Every combination of ``grid`` as override dicts on top of ``base``."""
+    names = [name for name, _ in grid]
+    configs = []
+    for combo in itertools.product(*[values for _, values in grid]):
+        cfg = dict(base or {})
+        cfg.update(zip(names, combo))
+        configs.append(cfg)
+    return configs
+
+
+# --- per process ---
+
+_worker = None
+
+
+def _init_worker(path, configs, use_numpy):
+    global _worker
+    detectors = offline.load_detectors(path)
+    config = module("config")
+    rec = offline.Recording(path, use_numpy)
+    _worker = {
+        "rec": rec,
+        "detectors": detectors,
+        "thresholds": [detectors.Thresholds(cfg) for cfg in configs],
+        "cell": float(config.CELL_SIZE_M),
+        "window": offline.spline_window(rec),
+        "cap": getattr(config, "HISTORY_SAMPLES", 10),
+        "t0": float(rec.times[0]) if len(rec.times) else 0.0,
+    }
+
+
+def _sweep_car(c):
+    # Events of car ``c`` for every configuration: [[(t, car, type)]]
+    w = _worker
+    rec = w["rec"]
+    cell = w["cell"]
+    window = w["window"]
+    t0 = w["t0"]
+    columns = {}
+    distances = {}
+
+    def nearest(k, i):
+        key = (k, i)
+        d = distances.get(key)
+        if d is None:
+            d = distances[key] = offline.nearest_rival(rec, k, i, cell, window)
+        return d
+
+    runs = rec.runs(c)
+    out = []
+    for th in w["thresholds"]:
+        det = w["detectors"].DetectorState()
+        found = []
+        for k0, k1 in runs:
+            key = (k0, th.COLLISION_WINDOW_S, th.OFFTRACK_WINDOW_S, th.yaw_avg_window())
+            cols = columns.get(key)
+            if cols is None:
+                cols = columns[key] = offline.feature_columns(rec, c, k0, k1, th, w["cap"])
+            offline.evaluate_columns(rec, c, k0, cols, th, det, found, nearest)
+        out.append([(float(rec.times[k]) - t0, car, ev.type) for k, car, ev in found if ev.type in SCORED])
+    return out
+
+
+def _car_count(path):
+    recorder = import_module_only("recorder")
+    reader = recorder.ReplayReader(path)
+    try:
+        mm = reader.buffer()
+        return max([recorder.FRAME.unpack_from(mm, off)[1] for _, off in reader.index()] or [0])
+    finally:
+        reader.close()
+
+
+def sweep(path, labels, configs, jobs=None, use_numpy=None, tolerance=3.0):
+    """Score every override dict in ``configs`` on the recording at ``path``.
+
+    ``labels`` are ``(t, car, type)`` with ``t`` in seconds since the first
+    frame. Returns ``[(config, {type: (precision, recall, events,
+    labelled)})]`` in the order of ``configs``.
+    """
+    if jobs is None:
+        jobs = multiprocessing.cpu_count()
+    cars = _car_count(path)
+    jobs = max(1, min(int(jobs), cars))
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs, _init_worker, (path, configs, use_numpy))
+        try:
+            per_car = pool.map(_sweep_car, range(cars), chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        _init_worker(path, configs, use_numpy)
+        per_car = [_sweep_car(c) for c in range(cars)]
+
+    rows = []
+    for idx, cfg in enumerate(configs):
+        events = []
+        for car_results in per_car:
+            events.extend(car_results[idx])
+        scores = dict((etype, labels_mod.match(events, labels, etype, tolerance)) for etype in SCORED)
+        rows.append((cfg, scores))
+    return rows
+
+
+def f1(precision, recall):
+    if not precision or not recall:
+        return 0.0
+    return 2.0 * precision * recall / (precision + recall)
+
+
+def rank(rows):
+    """Rows sorted by mean F1 over the labelled types, best first."""
+    def key(row):
+        scored = [f1(p, r) for p, r, _, total in row[1].values() if total]
+        return -(sum(scored) / len(scored)) if scored else 0.0
+    return sorted(rows, key=key)
+
+
+def _fmt(value):
+    return "  -  " if value is None else "{:5.2f}".format(value)
+
+
+def format_rows(rows, names):
+    widths = [max(8, len(name)) for name in names]
+    header = ["{:>{}}".format(name, w) for name, w in zip(names, widths)]
+    for etype in SCORED:
+        header.append("{:>17}".format(etype + " P/R (n)"))
+    lines = [" ".join(header)]
+    for cfg, scores in rows:
+        cells = ["{:>{}}".format(cfg.get(name), w) for name, w in zip(names, widths)]
+        for etype in SCORED:
+            p, r, count, _ = scores[etype]
+            cells.append("{} {} {:>5}".format(_fmt(p), _fmt(r), count))
+        lines.append(" ".join(cells))
+    return "\n".join(lines)
+
+
+def write_csv(path, rows, names):
+    import csv
+    with open(path, "w", newline="") as f:
+        out = csv.writer(f)
+        head = list(names)
+        for etype in SCORED:
+            head += [etype + "_precision", etype + "_recall", etype + "_events", etype + "_labels"]
+        out.writerow(head)
+        for cfg, scores in rows:
+            line = [cfg.get(name) for name in names]
+            for etype in SCORED:
+                p, r, count, total = scores[etype]
+                line += ["" if p is None else p, "" if r is None else r, count, total]
+            out.writerow(line)
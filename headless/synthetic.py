@@ -0,0 +1,168 @@
+"""Deterministic synthetic traffic for headless runs and benchmarks."""
+
+import math
+import random
+
+# Incident scripts: (duration s, speed floor km/h, decel km/h/s, yaw rad/s)
+INCIDENTS = {
+    "spin": (2.0, 15.0, 120.0, 3.5),
+    "offtrack": (1.2, 70.0, 80.0, 0.7),
+    "collision": (1.0, 30.0, 320.0, 0.8),
+}
+
+ACCEL_KMH_S = 40.0
+BRAKE_KMH_S = 60.0
+PIT_LIMIT_KMH = 60.0
+PIT_LANE_LAPS = 0.03  # pitlane length either side of the line, in laps
+
+
+class SyntheticField(object):
+    """Cars lapping a circular track with corners, incidents and pit stops.
+
+    The field starts stopped on a grid behind the line, launches after
+    ``start_delay_s`` and bunches up through three slow corners per lap.
+    Incidents are drawn from ``seed`` at ``incidents_per_min`` across the
+    field; collisions wait until a rival is within a few metres. Call
+    ``advance(t)`` once per frame before the app reads the state.
+    """
+
+    def __init__(self, cars, seed=1, track_length_m=4000.0, incidents_per_min=2.0,
+                 start_delay_s=3.0, pit_stops=True, grid_gap_m=8.0):
+        rnd = random.Random(seed)
+        self.count = int(cars)
+        self.track_length = float(track_length_m)
+        self.radius = self.track_length / (2.0 * math.pi)
+        self.start_delay = float(start_delay_s)
+        self.t = 0.0
+
+        n = self.count
+        self.progress = [-(i + 1) * grid_gap_m / self.track_length for i in range(n)]
+        self.speed = [0.0] * n
+        self.heading_offset = [0.0] * n
+        self.lane = [rnd.uniform(-4.0, 4.0) for _ in range(n)]
+        self.pace = [160.0 * (1.0 + rnd.uniform(-0.03, 0.03)) for _ in range(n)]
+
+        # Incidents: per car list of [t_start, kind], consumed in order
+        self.incidents = [[] for _ in range(n)]
+        rate = incidents_per_min / 60.0
+        horizon = 3600.0
+        t = self.start_delay + 5.0
+        kinds = sorted(INCIDENTS)
+        while n > 0 and rate > 0.0:
+            t += rnd.expovariate(rate)
+            if t > horizon:
+                break
+            self.incidents[rnd.randrange(n)].append([t, rnd.choice(kinds)])
+        self.active = [None] * n  # (kind, t_start) while an incident runs
+        self.started = []  # (t, car, kind) of every incident begun: ground truth
+
+        # Pit stops: a few cars stop once, at the line of a given lap
+        self.pit_lap = [None] * n
+        self.pit_time = [0.0] * n
+        self.pit_stop_until = [0.0] * n
+        if pit_stops:
+            for i in range(n):
+                if rnd.random() < 0.3:
+                    self.pit_lap[i] = rnd.randint(2, 6)
+                    self.pit_time[i] = rnd.uniform(8.0, 20.0)
+
+    # --- simulation ---
+    def advance(self, t):
+        dt = t - self.t
+        if dt <= 0.0:
+            return
+        self.t = t
+        for i in range(self.count):
+            self._advance_car(i, t, dt)
+
+    def _advance_car(self, i, t, dt):
+        if t < self.start_delay:
+            return
+        prog = self.progress[i]
+        spline = prog - math.floor(prog)
+        target = self.pace[i] * (0.7 + 0.3 * math.cos(2.0 * math.pi * 3.0 * spline))
+        brake = BRAKE_KMH_S
+
+        pit_lap = self.pit_lap[i]
+        if pit_lap is not None and abs(prog - pit_lap) <= PIT_LANE_LAPS:
+            target = min(target, PIT_LIMIT_KMH)
+            brake = 200.0
+            if prog >= pit_lap and self.pit_stop_until[i] == 0.0:
+                self.pit_stop_until[i] = t + self.pit_time[i]
+            if t < self.pit_stop_until[i]:
+                self.speed[i] = 0.0
+                return
+
+        self._maybe_start_incident(i, t)
+        act = self.active[i]
+        if act is not None:
+            kind, t0 = act
+            duration, floor_kmh, decel, yaw = INCIDENTS[kind]
+            if t - t0 >= duration:
+                self.active[i] = None
+            else:
+                target = floor_kmh
+                brake = decel
+                self.heading_offset[i] += yaw * dt
+
+        sp = self.speed[i]
+        if sp < target:
+            sp = min(target, sp + ACCEL_KMH_S * dt)
+        else:
+            sp = max(target, sp - brake * dt)
+        self.speed[i] = sp
+        self.progress[i] = prog + (sp / 3.6) * dt / self.track_length
+
+    def _maybe_start_incident(self, i, t):
+        queue = self.incidents[i]
+        if self.active[i] is not None or not queue or queue[0][0] > t:
+            return
+        kind = queue[0][1]
+        if kind == "collision" and self._nearest_rival_m(i) > 6.0:
+            # Wait for contact range, then give up after 30 s
+            if t - queue[0][0] > 30.0:
+                queue.pop(0)
+            return
+        queue.pop(0)
+        self.active[i] = (kind, t)
+        self.started.append((t, i, kind))
+
+    def _nearest_rival_m(self, i):
+        x, _, z = self.world_position(i)
+        best = 1e9
+        for j in range(self.count):
+            if j == i:
+                continue
+            xj, _, zj = self.world_position(j)
+            d = math.hypot(x - xj, z - zj)
+            if d < best:
+                best = d
+        return best
+
+    # --- per-car readers (fake_ac.FakeAC) ---
+    def spline(self, i):
+        prog = self.progress[i]
+        return prog - math.floor(prog)
+
+    def lap(self, i):
+        return max(0, int(math.floor(self.progress[i])))
+
+    def world_position(self, i):
+        a = 2.0 * math.pi * self.spline(i)
+        r = self.radius + self.lane[i]
+        return (r * math.cos(a), 0.0, r * math.sin(a))
+
+    def speed_kmh(self, i):
+        return self.speed[i]
+
+    def velocity(self, i):
+        a = 2.0 * math.pi * self.spline(i) + 0.5 * math.pi + self.heading_offset[i]
+        v = self.speed[i] / 3.6
+        return (v * math.cos(a), 0.0, v * math.sin(a))
+
+    def in_pit(self, i):
+        return self.t < self.pit_stop_until[i]
+
+    def in_pitlane(self, i):
+        pit_lap = self.pit_lap[i]
+        return pit_lap is not None and abs(self.progress[i] - pit_lap) <= PIT_LANE_LAPS
@@ -0,0 +1,53 @@
+"""Natural-cut candidate refresh and pick."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+
+class CandidatesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(60, seed=4))
+        self.session.start()
+        self.session.run(20.0)
+        self.st = runner.module("state")
+        self.cand = runner.module("candidates")
+
+    def tearDown(self):
+        self.session.close()
+
+    def _refreshed(self, seconds):
+        cand = self.cand
+        update = cand.update
+        counts = []
+
+        def counted(st, now):
+            update(st, now)
+            counts.append(cand.refreshed_last_tick())
+
+        cand.update = counted
+        try:
+            self.session.run(seconds)
+        finally:
+            cand.update = update
+        return counts
+
+    def test_paused_refresh_uses_minimum_step(self):
+        self.st.enabled = False
+        self.session.run(10.0)  # past any natural deadline armed before
+        counts = self._refreshed(5.0)
+        step = runner.module("config").CANDIDATE_STEP_CARS
+        self.assertTrue(counts)
+        self.assertLessEqual(max(counts), step)
+
+    def test_best_skips_car_on_screen(self):
+        top = self.cand.top()
+        self.assertTrue(top)
+        self.st.set_current_focus(top[0][1], self.session.clock.t)
+        self.assertNotEqual(self.cand.best(self.st), top[0][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
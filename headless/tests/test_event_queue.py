@@ -0,0 +1,106 @@
+"""Event queue ordering, expiry and merging of repeats."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+
+class EventQueueUpdateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(4))
+        self.queue = runner.module("event_queue")
+        self.Event = runner.module("detectors").Event
+        self.queue.clear()
+
+    def tearDown(self):
+        self.queue.clear()
+        self.session.close()
+
+    def test_raised_severity_reorders_queue(self):
+        now = 10.0
+        spin = self.Event(0, "spin", 0.2, now + 3.0)
+        other = self.Event(1, "spin", 0.5, now + 3.0)
+        self.queue.push([spin, other], now)
+        self.assertIs(self.queue.peek(now), other)
+
+        spin.severity = 0.9
+        self.queue.update([spin])
+        self.assertIs(self.queue.pop(now), spin)
+        self.assertIs(self.queue.pop(now), other)
+        self.assertIsNone(self.queue.pop(now))
+
+    def test_taken_event_is_not_requeued(self):
+        now = 10.0
+        spin = self.Event(0, "spin", 0.2, now + 3.0)
+        self.queue.push([spin], now)
+        self.assertIs(self.queue.pop(now), spin)
+        spin.severity = 0.9
+        self.queue.update([spin])
+        self.assertIsNone(self.queue.pop(now))
+
+
+class EventQueuePushTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(4))
+        self.queue = runner.module("event_queue")
+        self.Event = runner.module("detectors").Event
+        self.queue.clear()
+
+    def tearDown(self):
+        self.queue.clear()
+        self.session.close()
+
+    def test_expired_events_are_dropped(self):
+        now = 10.0
+        short = self.Event(0, "collision", 0.9, now + 1.0)
+        long = self.Event(1, "offtrack", 0.3, now + 5.0)
+        self.queue.push([short, long], now)
+        self.assertEqual(self.queue.pending(now), 2)
+        self.assertIs(self.queue.peek(now + 0.5), short)
+        self.assertEqual(self.queue.pending(now + 2.0), 1)
+        self.assertIs(self.queue.pop(now + 2.0), long)
+        self.assertIsNone(self.queue.pop(now + 6.0))
+
+    def test_repeat_extends_the_queued_event(self):
+        now = 10.0
+        first = self.Event(0, "spin", 0.6, now + 3.0)
+        self.queue.push([first], now)
+        repeat = self.Event(0, "spin", 0.4, now + 5.0)
+        self.queue.push([repeat], now + 1.0)
+        self.assertEqual(self.queue.pending(now + 1.0), 1)
+        self.assertEqual(first.t_expires, now + 5.0)
+        self.assertIs(self.queue.pop(now + 4.0), first)
+        self.assertIsNone(self.queue.pop(now + 4.0))
+
+    def test_more_severe_repeat_replaces_the_queued_event(self):
+        now = 10.0
+        first = self.Event(0, "spin", 0.4, now + 3.0)
+        self.queue.push([first], now)
+        worse = self.Event(0, "spin", 0.8, now + 3.5)
+        self.queue.push([worse], now + 1.0)
+        self.assertEqual(self.queue.pending(now + 1.0), 1)
+        self.assertIs(self.queue.pop(now + 1.0), worse)
+        self.assertIsNone(self.queue.pop(now + 1.0))
+
+    def test_repeat_after_expiry_is_queued_again(self):
+        now = 10.0
+        self.queue.push([self.Event(0, "spin", 0.6, now + 1.0)], now)
+        again = self.Event(0, "spin", 0.3, now + 4.0)
+        self.queue.push([again], now + 2.0)
+        self.assertIs(self.queue.pop(now + 2.0), again)
+
+    def test_other_cars_and_types_are_kept_apart(self):
+        now = 10.0
+        events = [self.Event(0, "spin", 0.5, now + 3.0),
+                  self.Event(0, "offtrack", 0.5, now + 3.0),
+                  self.Event(1, "spin", 0.5, now + 3.0)]
+        self.queue.push(events, now)
+        self.assertEqual(self.queue.pending(now), 3)
+        self.assertEqual(self.queue.pop(now).type, "spin")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+"""Proximity's distance-test budget without the gap model."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+
+class ProximityBudgetTest(unittest.TestCase):
+
+    def tearDown(self):
+        self.session.close()
+
+    def _run_xz(self, cars, seconds):
+        # Per-tick distance tests of a GAP_MODEL=False session
+        self.session = runner.Session(SyntheticField(cars, seed=2))
+        runner.module("config").GAP_MODEL = False
+        prox = runner.module("proximity")
+        update = prox.update
+        ticks = []
+
+        def counted(st, index, now):
+            update(st, index, now)
+            ticks.append(prox.tests_last_tick())
+
+        prox.update = counted
+        self.session.start()
+        self.session.run(seconds)
+        return ticks
+
+    def test_tests_per_tick_follow_the_bucket(self):
+        cars = 60
+        seconds = 40.0
+        ticks = self._run_xz(cars, seconds)
+        config = runner.module("config")
+        rate = float(config.MAX_DISTANCE_TESTS_PER_SEC)
+        # A tick spends at most the banked second plus one car's rivals
+        self.assertLessEqual(max(ticks), rate + cars - 1)
+        # On average within the rate
+        self.assertLessEqual(sum(ticks), rate * (seconds + 1.0) + cars - 1)
+        # Spread over the ticks, not bursts with seconds of debt in between
+        idle = longest = 0
+        for t in ticks[len(ticks) // 2:]:
+            idle = idle + 1 if t == 0 else 0
+            longest = max(longest, idle)
+        self.assertLess(longest, config.DIRECTOR_TICK_HZ / 2.0)
+
+    def test_close_pairs_counted(self):
+        self._run_xz(20, 8.0)  # still on the grid, single file
+        self.assertGreater(runner.module("proximity").close_pairs(), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+"""Replaying a recording is deterministic: the same cuts every time."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .. import runner
+
+
+class ReplayDeterminismTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "session.actr")
+        runner.run(cars=12, seconds=90.0, seed=5, record=self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_replay_twice_gives_identical_cuts(self):
+        first = runner.run(seconds=90.0, seed=5, replay=self.path)
+        second = runner.run(seconds=90.0, seed=5, replay=self.path)
+        self.assertGreater(len(first.focus_history), 3)
+        self.assertEqual(first.focus_history, second.focus_history)
+
+
+if __name__ == "__main__":
+    unittest.main()
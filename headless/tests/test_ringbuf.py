@@ -0,0 +1,74 @@
+"""RingBuffer: wrapping and queries over a time window."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+# One sample per 0.25 s (exact in binary), values 0..9; newest at t = 2.25
+SAMPLES = [(0.25 * k, float(k)) for k in range(10)]
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(4))
+        self.RingBuffer = runner.module("ringbuf").RingBuffer
+
+    def tearDown(self):
+        self.session.close()
+
+    def _filled(self, capacity, samples):
+        buf = self.RingBuffer(capacity)
+        for t, v in samples:
+            buf.append(t, v)
+        return buf
+
+    def test_empty(self):
+        buf = self.RingBuffer(4)
+        self.assertEqual(len(buf), 0)
+        self.assertEqual(buf.latest(), 0.0)
+        self.assertEqual(buf.min(1.0), 0.0)
+        self.assertEqual(buf.max(1.0), 0.0)
+        self.assertEqual(buf.mean(1.0), 0.0)
+        self.assertEqual(buf.value_at_age(1.0), 0.0)
+
+    def test_full_ring_overwrites_the_oldest(self):
+        buf = self._filled(3, SAMPLES[:5])
+        self.assertEqual(len(buf), 3)
+        self.assertEqual([buf.value_at(k) for k in range(3)], [4.0, 3.0, 2.0])
+        self.assertEqual(buf.latest_t(), 1.0)
+        buf.clear()
+        self.assertEqual(len(buf), 0)
+
+    def test_window_queries(self):
+        buf = self._filled(16, SAMPLES)
+        self.assertEqual(buf.min(0.6), 7.0)
+        self.assertEqual(buf.max(0.6), 9.0)
+        self.assertAlmostEqual(buf.mean(0.6), 8.0)
+        # Samples exactly ``window`` old are inside it
+        self.assertEqual(buf.min(0.5), 7.0)
+        # The newest sample counts even in an empty window
+        self.assertEqual(buf.min(0.0), 9.0)
+        self.assertEqual(buf.mean(0.0), 9.0)
+        # A window longer than the history covers all of it
+        self.assertEqual(buf.min(5.0), 0.0)
+        self.assertAlmostEqual(buf.mean(5.0), 4.5)
+
+    def test_window_after_wrapping(self):
+        buf = self._filled(4, SAMPLES)
+        self.assertEqual(buf.min(5.0), 6.0)
+        self.assertEqual(buf.max(5.0), 9.0)
+        self.assertAlmostEqual(buf.mean(5.0), 7.5)
+
+    def test_age_lookup(self):
+        buf = self._filled(16, SAMPLES)
+        self.assertEqual(buf.index_at_age(0.75), 3)
+        self.assertEqual(buf.index_at_age(0.6), 3)
+        self.assertEqual(buf.value_at_age(0.75), 6.0)
+        # Older than the history: the oldest sample
+        self.assertEqual(buf.value_at_age(5.0), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Scheduler timer heap: due order, replacing, cancelling and resuming."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+
+class TimerHeapTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(4))
+        self.sched = runner.module("scheduler")
+        self.sched.clear()
+
+    def tearDown(self):
+        self.sched.clear()
+        self.session.close()
+
+    def test_due_in_deadline_order(self):
+        sched = self.sched
+        sched.schedule("b", 5.0)
+        sched.schedule("a", 3.0)
+        sched.schedule("c", 5.0)
+        self.assertEqual(sched.next_due(), 3.0)
+        self.assertEqual(list(sched.due(2.0)), [])
+        self.assertEqual(list(sched.due(4.0)), ["a"])
+        # Ties fire in the order they were set
+        self.assertEqual(list(sched.due(10.0)), ["b", "c"])
+        self.assertIsNone(sched.next_due())
+
+    def test_schedule_replaces_the_previous_deadline(self):
+        sched = self.sched
+        sched.schedule("ui", 3.0)
+        sched.schedule("ui", 8.0)
+        self.assertEqual(list(sched.due(5.0)), [])
+        self.assertEqual(sched.deadline("ui"), 8.0)
+        self.assertEqual(list(sched.due(8.0)), ["ui"])
+        self.assertIsNone(sched.deadline("ui"))
+
+    def test_cancel(self):
+        sched = self.sched
+        sched.schedule("natural", 3.0)
+        sched.schedule("ui", 4.0)
+        sched.cancel("natural")
+        sched.cancel("unknown")
+        self.assertIsNone(sched.deadline("natural"))
+        self.assertEqual(sched.next_due(), 4.0)
+        self.assertEqual(list(sched.due(10.0)), ["ui"])
+
+    def test_every_rearms_one_period_ahead(self):
+        sched = self.sched
+        sched.every("intensity", 10.0, 4.0)
+        self.assertEqual(sched.deadline("intensity"), 10.25)
+
+    def test_resume_keeps_a_running_lock(self):
+        sched = self.sched
+        sched.schedule("unlock", 20.0)
+        sched.resume(10.0)
+        self.assertEqual(sched.lock_until(), 20.0)
+        self.assertGreater(sched.next_natural_deadline(), 10.0)
+
+    def test_resume_rechecks_events_at_once(self):
+        sched = self.sched
+        sched.resume(30.0)
+        self.assertEqual(sched.lock_until(), 30.0)
+        self.assertIn("unlock", sched.due(30.0))
+        self.assertGreater(sched.next_natural_deadline(), 30.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Spline neighbour index: degenerate tracks, window changes, offline parity."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from .. import offline, runner
+from ..synthetic import SyntheticField
+
+SPLINE = {"SPATIAL_BACKEND": "spline", "SPLINE_WINDOW_M": 5.0}
+
+
+class SplineIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(20, seed=3))
+        self.session.start()
+        self.session.run(5.0)
+        self.st = runner.module("state")
+        self.spatial = runner.module("spatial")
+        self.config = runner.module("config")
+        self.saved = dict((name, getattr(self.config, name, None)) for name in SPLINE)
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(self.config, name, value)
+        self.session.close()
+
+    def test_zero_track_length_spans_the_lap(self):
+        track_length = self.st.track_length
+        self.st.track_length = lambda: 0.0
+        try:
+            index = self.spatial.SplineIndex(self.config.CELL_SIZE_M, 30.0).rebuild(self.st)
+        finally:
+            self.st.track_length = track_length
+        self.assertEqual(index.window, 0.49)
+        index.measure_pairs()
+        self.assertGreater(index.pairs, 0)
+
+    def test_window_change_rebuilds_the_index(self):
+        self.config.SPATIAL_BACKEND = "spline"
+        self.config.SPLINE_WINDOW_M = 30.0
+        first = self.spatial.refresh_index(self.st, self.config.CELL_SIZE_M)
+        self.config.SPLINE_WINDOW_M = 80.0
+        second = self.spatial.refresh_index(self.st, self.config.CELL_SIZE_M)
+        self.assertEqual(first.backend, "spline")
+        self.assertEqual(second.window_m, 80.0)
+        self.assertGreater(second.window, first.window)
+
+
+class OfflineSplineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "session.actr")
+        runner.run(cars=12, seconds=60.0, seed=5, record=self.path)
+        self.config = runner.module("config")
+        self.saved = dict((name, getattr(self.config, name, None)) for name in SPLINE)
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(self.config, name, value)
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_offline_follows_the_spline_backend(self):
+        events, _ = offline.run(self.path, SPLINE, use_numpy=False)
+        reference = offline.live_events(self.path, SPLINE)
+        self.assertIsNone(offline.compare(events, reference))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+"""Snapshot polling (staggered slices, lap/spline consistency) and the pit
+phase tracker."""
+
+import unittest
+
+from .. import runner
+from ..synthetic import SyntheticField
+
+
+class StaggeredPollingTest(unittest.TestCase):
+
+    def tearDown(self):
+        self.session.close()
+
+    def _session(self, cars, seed=3):
+        self.session = runner.Session(SyntheticField(cars, seed=seed))
+        self.session.start()
+        return runner.module("state")
+
+    def test_zero_cars(self):
+        st = self._session(0)
+        self.assertEqual(st._staggered_slice("spline", 0, 0.1, 20.0), (0, 0))
+        self.session.run(2.0)
+        self.assertEqual(st.car_count(), 0)
+
+    def test_lap_and_spline_cross_the_line_together(self):
+        # Cars complete lap 1 ~130 s in; lap and spline are rate-limited, so
+        # a lap read in another slice than its spline would jump a lap.
+        st = self._session(8)
+        self.session.run(20.0)  # past the grid start's first (lap 0) crossing
+        n = st.car_count()
+        prev = [st.lap(i) + st.spline(i) for i in range(n)]
+        crossed = set()
+        for _ in range(int(140.0 * 60)):
+            self.session.frame(1.0 / 60)
+            for i in range(n):
+                p = st.lap(i) + st.spline(i)
+                self.assertLess(abs(p - prev[i]), 0.5, "car {} jumped a lap".format(i))
+                if int(p) != int(prev[i]):
+                    crossed.add(i)
+                prev[i] = p
+        self.assertEqual(len(crossed), n)
+
+
+class PitTrackerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.session = runner.Session(SyntheticField(3, seed=3))
+        self.session.start()
+        self.session.run(1.0)
+        self.st = runner.module("state")
+        self.n = self.st.car_count()
+        self._flags(100.0)  # everyone on track
+
+    def tearDown(self):
+        self.session.close()
+
+    def _flags(self, now, pit=(), lane=()):
+        # Set every car's pit flags and run the tracker as a snapshot would
+        snap = self.st.snapshot()
+        for i in range(self.n):
+            snap.pit[i] = 1 if i in pit else 0
+            snap.pitlane[i] = 1 if i in lane or i in pit else 0
+        self.st._update_pit(self.n, now)
+        return list(self.st.pit_transitions())
+
+    def test_full_stop(self):
+        st = self.st
+        version = st.pit_version()
+        self.assertEqual(self._flags(110.0, lane=[1]), [(1, "entry", 0.0)])
+        self.assertEqual(st.pit_phase(1), st.PIT_LANE)
+        self.assertEqual(self._flags(111.0, lane=[1]), [])
+        self.assertEqual(self._flags(120.0, pit=[1]), [(1, "stop", 0.0)])
+        self.assertEqual(st.pit_phase(1), st.PIT_BOX)
+        self.assertEqual(self._flags(145.0, lane=[1]), [(1, "release", 25.0)])
+        self.assertEqual(st.last_pit_stop(1), 25.0)
+        self.assertEqual(self._flags(160.0), [(1, "exit", 50.0)])
+        self.assertEqual(st.pit_phase(1), st.PIT_OUT)
+        self.assertEqual(st.pit_changed_at()[1], 160.0)
+        self.assertEqual(st.pit_version(), version + 4)
+
+    def test_box_flag_straight_from_the_track(self):
+        self.assertEqual(self._flags(110.0, pit=[2]), [(2, "entry", 0.0), (2, "stop", 0.0)])
+        self.assertEqual(self._flags(118.0), [(2, "release", 8.0), (2, "exit", 8.0)])
+
+    def test_first_sight_primes_without_transitions(self):
+        st = self.st
+        st._pit_known = 0  # as if no car had been seen yet
+        version = st.pit_version()
+        self.assertEqual(self._flags(110.0, pit=[0], lane=[2]), [])
+        self.assertEqual(st.pit_phase(0), st.PIT_BOX)
+        self.assertEqual(st.pit_phase(2), st.PIT_LANE)
+        self.assertEqual(st.pit_version(), version)
+        # A stop already under way when first seen has no known length
+        self.assertEqual(self._flags(115.0, lane=[0, 2]), [(0, "release", 0.0)])
+        self.assertEqual(self._flags(120.0), [(0, "exit", 0.0), (2, "exit", 0.0)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,22 @@
 """Interest scoring and race intensity computation."""
 
 import math
-from . import config, state
-from . import spatial
+from array import array
+
+try:
+    import numpy
+except ImportError:  # AC's embedded Python: pure-Python ranking
+    numpy = None
+
+from . import config, proximity, terms
+from .gaps import current_gaps
 from .scheduler import set_race_intensity
 
 
 _ema_intensity = 0.0
 _last_intensity_t = 0.0
+_event_level = 0.0
+_event_level_t = 0.0
 
 
 def _clamp(x, a, b):
@@ -18,121 +27,48 @@ def _clamp(x, a, b):
     return x
 
 
-def _distance_xz(p1, p2):
-    dx = p1[0] - p2[0]
-    dz = p1[2] - p2[2]
-    return math.sqrt(dx * dx + dz * dz)
+def note_events(count, now):
+    """Feed newly emitted detector events into the activity term."""
+    global _event_level
+    if count <= 0:
+        return
+    terms.note_events(count)
+    _decay_event_level(now)
+    _event_level += count
 
 
-def _proximity_score(i, grid):
-    pi = state.pos(i)
-    if pi is None:
-        return 0.0
-    R = config.PROX_RADIUS_M
-    R2 = R * R
-    beta = config.BETA_NEAREST
+def _decay_event_level(now):
+    # Exponential decay over INTENSITY_WINDOW: level ~ events in the window
+    global _event_level, _event_level_t
+    if _event_level_t > 0.0 and now > _event_level_t:
+        window = max(0.001, config.INTENSITY_WINDOW)
+        _event_level *= math.exp(-(now - _event_level_t) / window)
+    _event_level_t = now
 
-    nearest_term = 0.0
-    sum_extras = 0.0
-    k = 0
-    for j in spatial.neighbors_of(i, pi, grid):
-        pj = state.pos(j)
-        if pj is None:
-            continue
-        dx = pi[0] - pj[0]
-        dz = pi[2] - pj[2]
-        d2 = dx * dx + dz * dz
-        if d2 > R2:
-            continue
-        d = math.sqrt(d2)
-        if nearest_term < 1.0:
-            nearest_term = max(nearest_term, 1.0 - (d / R))
-        w = 1.0 / (1.0 + (d / R) * (d / R))
-        sum_extras += w
-        k += 1
-        if k >= config.PROX_K:
-            break
-
-    if k == 0 and nearest_term == 0.0:
-        return 0.0
-    return beta * nearest_term + (1.0 - beta) * sum_extras
-
-
-def _leader_moment(i, n):
-    # Approximate field position from spline (front is higher spline)
-    # Build order by descending spline
-    ranks = sorted([(state.spline(c), c) for c in range(n)], reverse=True)
-    pos_index = 0
-    for idx in range(n):
-        if ranks[idx][1] == i:
-            pos_index = idx + 1
-            break
-    leader_base = float(n - pos_index + 1) / float(n) if n > 0 else 0.0
-
-    progress = state.spline(i)
-    start_w = config.LEADER_START_WINDOW
-    end_w = config.LEADER_END_WINDOW
-    # Envelope: boost at start/finish of race lap
-    envelope = 1.0
-    if progress <= start_w:
-        envelope = progress / start_w if start_w > 0.0 else 1.0
-    elif progress >= (1.0 - end_w):
-        tail = 1.0 - progress
-        envelope = tail / end_w if end_w > 0.0 else 1.0
-    return leader_base * envelope
-
-
-def _rarity(i, now, n):
-    last = state.last_focused_at(i)
-    dt = now - last if last > 0.0 else 1e9
-    rarity_full_after = max(15.0, 0.5 * config.DWELL_BASE * max(1, n))
-    return _clamp(dt / rarity_full_after, 0.0, 1.0)
-
-
-def _hysteresis(i, now):
-    last = state.last_focused_at(i)
-    if last <= 0.0:
-        return 0.0
-    return 1.0 if (now - last) < config.HYSTERESIS_WINDOW else 0.0
-
-
-def _pit_cameo(i):
-    # External detector should set a transient flag if desired; default 0
-    return 0.0
-
-
-def _compute_race_intensity(n, grid, now):
-    # battle_density from gaps in space (R) ignoring time gaps
-    R = config.BATTLE_RADIUS_M
-    pairs = 0
-    tested = set()
-    for i in range(n):
-        pi = state.pos(i)
-        if pi is None:
-            continue
-        for j in spatial.neighbors_of(i, pi, grid):
-            if j <= i:
-                continue
-            key = (i, j)
-            if key in tested:
-                continue
-            pj = state.pos(j)
-            if pj is None:
-                continue
-            d = _distance_xz(pi, pj)
-            if d < R:
-                pairs += 1
-            tested.add(key)
+
+def update_race_intensity(st, now):
+    """Advance the race intensity EMA; called by the director when its
+    ``"intensity"`` timer is due (``INTENSITY_REFRESH_HZ``)."""
+    global _ema_intensity, _last_intensity_t
+    n = st.car_count()
+
+    # battle_density: pairs of cars within BATTLE_GAP_TIME on track, or
+    # within BATTLE_RADIUS_M in space when there is no gap model
+    gm = current_gaps(st)
+    if gm is not None:
+        pairs = gm.pairs_within(config.BATTLE_GAP_TIME)
+    else:
+        pairs = proximity.close_pairs()
     max_pairs_norm = max(1.0, float(n) / 2.0)
     battle_density = _clamp(float(pairs) / max_pairs_norm, 0.0, 1.0)
 
-    # event_activity not tracked precisely; approximate with recent speed drops density
-    # Keep 0 for simplicity in MVP; battle dominates with ALPHA_BATTLE
-    event_activity = 0.0
+    # event_activity: decayed count of detector events against a full scale
+    _decay_event_level(now)
+    full = max(0.001, config.EVENT_ACTIVITY_FULL)
+    event_activity = _clamp(_event_level / full, 0.0, 1.0)
 
     raw = config.ALPHA_BATTLE * battle_density + (1.0 - config.ALPHA_BATTLE) * event_activity
 
-    global _ema_intensity, _last_intensity_t
     if _last_intensity_t == 0.0:
         _ema_intensity = raw
         _last_intensity_t = now
@@ -146,40 +82,91 @@ def _compute_race_intensity(n, grid, now):
     set_race_intensity(_clamp(_ema_intensity, 0.0, 1.0))
 
 
-def pick_best_by_interest(st, now):
-    n = st.car_count()
-    if n < config.MIN_CARS_REQUIRED:
-        return -1
-    grid = spatial.build_grid(st, config.CELL_SIZE_M)
-    _compute_race_intensity(n, grid, now)
+# Score of cars that cannot be picked (in the pits or not moving)
+INACTIVE = float("-inf")
 
-    best = -1
-    best_score = -9999.0
-    unseen = st.unseen_set()
 
-    for c in range(n):
-        if not st.active(c):
+def _score_cars(st, n, cars, out):
+    # out[c] = weighted sum of the term columns, INACTIVE if not pickable
+    snap = st.snapshot()
+    speeds = snap.speed
+    pit = snap.pit
+    columns = terms.weighted()
+    for c in cars:
+        # state.active: on track and moving
+        if pit[c] or speeds[c] < 1.0:
+            out[c] = INACTIVE
             continue
-        prox = _proximity_score(c, grid)
-        leader = _leader_moment(c, n)
-        rarity = _rarity(c, now, n)
-        hyst = _hysteresis(c, now)
-        pit = _pit_cameo(c)
+        score = 0.0
+        for weight, column in columns:
+            score += weight * column[c]
+        out[c] = score
+
+
+def _rank_python(st, n):
+    scores = array("d", [0.0]) * n
+    _score_cars(st, n, range(n), scores)
+    ranked = [(-scores[c], c) for c in range(n) if scores[c] != INACTIVE]
+    ranked.sort()
+    return [(-neg, c) for neg, c in ranked]
+
+
+def _rank_numpy(st, n):
+    np = numpy
+    snap = st.snapshot()
+    speeds = np.frombuffer(snap.speed, dtype=np.float64, count=n)
+    pit = np.frombuffer(snap.pit, dtype=np.uint8, count=n)
+    score = np.zeros(n)
+    for weight, column in terms.weighted():
+        score += weight * np.frombuffer(column, dtype=np.float64, count=n)
+    cars = np.flatnonzero((pit == 0) & (speeds >= 1.0))
+    score = score[cars]
+    # Best first; ties go to the lower car id
+    rank = np.lexsort((cars, -score))
+    return list(zip(score.take(rank).tolist(), cars.take(rank).tolist()))
+
+
+def score_cars(st, now, cars, out):
+    """Write the interest score of each car id in ``cars`` to ``out[c]``.
+
+    ``out`` is indexed by car id; cars that cannot be picked get
+    ``INACTIVE``. Same scores as ``rank_by_interest`` for those cars.
+    """
+    n = st.car_count()
+    if n == 0:
+        return
+    terms.refresh(st, now)
+    _score_cars(st, n, cars, out)
+
+
+_ranked = []
 
-        score = (
-            config.W_PROX * prox
-            + config.W_LEADER * leader
-            + config.W_RARITY * rarity
-            - config.W_HYST * hyst
-            + config.W_PIT * pit
-        )
 
-        if c in unseen:
-            score += config.UNSEEN_BONUS
+def rank_by_interest(st, now):
+    """Every active car as ``(score, car_id)``, best first.
+
+    Computed for the whole field at once, with NumPy when importable and
+    the field has at least ``INTEREST_NUMPY_MIN_CARS`` cars. The list is
+    kept for ``ranked()``.
+    """
+    global _ranked
+    n = st.car_count()
+    if n < config.MIN_CARS_REQUIRED or n == 0:
+        _ranked = []
+        return _ranked
+    terms.refresh(st, now)
+    if numpy is not None and n >= getattr(config, "INTEREST_NUMPY_MIN_CARS", 40):
+        _ranked = _rank_numpy(st, n)
+    else:
+        _ranked = _rank_python(st, n)
+    return _ranked
 
-        if score > best_score:
-            best_score = score
-            best = c
 
-    return best
+def ranked():
+    """Ranking from the last ``rank_by_interest`` call (runner-ups included)."""
+    return _ranked
 
+
+def pick_best_by_interest(st, now):
+    ranking = rank_by_interest(st, now)
+    return ranking[0][1] if ranking else -1
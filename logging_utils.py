@@ -1,9 +1,44 @@
-"""Small helpers to keep logs consistent in AC."""
+"""Small helpers to keep logs consistent in AC.
+
+``log`` writes straight to ``ac.log``. ``debug``/``info``/``warn`` go
+through a buffered backend instead: calls below ``LOG_LEVEL`` return
+before formatting anything, a ``key`` limits a message family to one line
+per ``LOG_RATE_LIMIT_S`` (skipped repeats are counted on the next line),
+and formatted lines wait in a fixed ring until ``flush`` writes them in
+one batch, to ``LOG_FILE`` if set.
+"""
+
+import os
 
 import ac
 
+from . import clock, config
+
 PREFIX = "[ACTTV] "
 
+DEBUG = 10
+INFO = 20
+WARN = 30
+LEVELS = {"debug": DEBUG, "info": INFO, "warn": WARN, "warning": WARN}
+
+_level = INFO
+_rate_limit = 1.0
+_flush_interval = 1.0
+
+# Ring of formatted lines awaiting flush
+_ring = [None] * 256
+_head = 0
+_len = 0
+_dropped = 0
+_last_flush = 0.0
+
+# Rate limiting: key -> last emit time / repeats skipped since
+_last_emit = {}
+_suppressed = {}
+
+_file = None
+_file_failed = False
+
 
 def log(msg):
     try:
@@ -11,3 +46,162 @@ def log(msg):
     except Exception:
         pass
 
+
+def reload_config():
+    """Re-read level, rate limit, flush interval and ring size from
+    ``config`` (at import and after changing it)."""
+    global _level, _rate_limit, _flush_interval, _ring, _head, _len
+    _level = LEVELS.get(str(getattr(config, "LOG_LEVEL", "info")).lower(), INFO)
+    _rate_limit = float(getattr(config, "LOG_RATE_LIMIT_S", 1.0))
+    _flush_interval = float(getattr(config, "LOG_FLUSH_INTERVAL_S", 1.0))
+    capacity = max(16, int(getattr(config, "LOG_BUFFER_LINES", 256)))
+    if capacity != len(_ring):
+        pending = _drain()
+        _ring = [None] * capacity
+        _head = 0
+        _len = 0
+        for line in pending[-capacity:]:
+            _push(line)
+
+
+def enabled_for(level):
+    return level >= _level
+
+
+def debug(fmt, *args, **kw):
+    if DEBUG >= _level:
+        _emit(DEBUG, fmt, args, kw.get("key"))
+
+
+def info(fmt, *args, **kw):
+    if INFO >= _level:
+        _emit(INFO, fmt, args, kw.get("key"))
+
+
+def warn(fmt, *args, **kw):
+    if WARN >= _level:
+        _emit(WARN, fmt, args, kw.get("key"))
+
+
+def _emit(level, fmt, args, key):
+    skipped = 0
+    if key is not None:
+        now = clock.now()
+        last = _last_emit.get(key)
+        if last is not None and now - last < _rate_limit:
+            _suppressed[key] = _suppressed.get(key, 0) + 1
+            return
+        _last_emit[key] = now
+        skipped = _suppressed.pop(key, 0)
+    try:
+        msg = fmt.format(*args) if args else str(fmt)
+    except Exception as ex:
+        msg = "{!r} (format failed: {})".format(fmt, ex)
+    if skipped:
+        msg += " (+{} similar)".format(skipped)
+    if level >= WARN:
+        msg = "WARN " + msg
+    elif level <= DEBUG:
+        msg = "debug " + msg
+    _push(PREFIX + msg)
+    if level >= WARN:
+        flush(force=True)
+
+
+def _push(line):
+    global _head, _len, _dropped
+    cap = len(_ring)
+    _ring[_head] = line
+    _head = (_head + 1) % cap
+    if _len < cap:
+        _len += 1
+    else:
+        _dropped += 1  # overwrote the oldest line
+
+
+def _drain():
+    global _len
+    cap = len(_ring)
+    start = (_head - _len) % cap
+    lines = [_ring[(start + k) % cap] for k in range(_len)]
+    for k in range(cap):
+        _ring[k] = None
+    _len = 0
+    return lines
+
+
+def pending():
+    """Lines buffered and not yet written."""
+    return _len
+
+
+def flush(now=None, force=False):
+    """Write buffered lines in one batch.
+
+    Without ``force`` this waits for ``LOG_FLUSH_INTERVAL_S`` since the last
+    write unless the ring is half full; call it once per director tick.
+    """
+    global _last_flush, _dropped
+    if _len == 0 and not _dropped:
+        return
+    if now is None:
+        now = clock.now()
+    if not force:
+        if now - _last_flush < _flush_interval and _len < len(_ring) // 2:
+            return
+    _last_flush = now
+    lines = _drain()
+    if _dropped:
+        lines.insert(0, PREFIX + "WARN {} log lines dropped (ring full)".format(_dropped))
+        _dropped = 0
+    _write("\n".join(lines))
+
+
+def _open_file():
+    global _file, _file_failed
+    path = getattr(config, "LOG_FILE", "")
+    if not path or _file_failed:
+        return None
+    if _file is None:
+        try:
+            if not os.path.isabs(path):
+                path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+            _file = open(path, "a")
+        except Exception as ex:
+            _file_failed = True
+            log("Cannot open LOG_FILE, using the AC log: {}".format(ex))
+            return None
+    return _file
+
+
+def _write(text):
+    global _file, _file_failed
+    f = _open_file()
+    if f is not None:
+        try:
+            f.write(text + "\n")
+            f.flush()
+            return
+        except Exception as ex:
+            _file_failed = True
+            _file = None
+            log("Writing LOG_FILE failed, using the AC log: {}".format(ex))
+    try:
+        ac.log(text)
+    except Exception:
+        pass
+
+
+def shutdown():
+    """Flush everything and close ``LOG_FILE``."""
+    global _file
+    flush(force=True)
+    if _file is not None:
+        try:
+            _file.close()
+        except Exception:
+            pass
+        _file = None
+
+
+reload_config()
@@ -0,0 +1,127 @@
+"""Per-stage timing of the director tick, toggled by ``PROFILE_STAGES``.
+
+``director_tick`` calls ``active()`` once per tick; with profiling off
+that is the whole cost. When on, ``mark(stage)`` closes the stage that
+began at the previous mark, the last ``PROFILE_WINDOW`` timings are kept
+per stage and ``count(name, n)`` adds to per-tick counters (cars scanned,
+distance tests, scheduler timers fired). A p50/p95/max summary is logged every
+``PROFILE_LOG_INTERVAL_S`` and shown in the app window.
+"""
+
+import time
+
+from . import config
+from .logging_utils import log
+from .ringbuf import RingBuffer
+
+# In director_tick order
+STAGES = ("snapshot", "start_lights", "detect", "event", "natural", "ui")
+COUNTERS = ("cars_scanned", "distance_tests", "timers_fired")
+
+
+def percentile(sorted_vals, q):
+    """Nearest-rank percentile of an already sorted list (0.0 if empty)."""
+    if not sorted_vals:
+        return 0.0
+    k = int(round(q * (len(sorted_vals) - 1)))
+    return sorted_vals[k]
+
+
+def _values(buf):
+    return [buf.value_at(k) for k in range(len(buf))]
+
+
+class StageProfiler(object):
+    """Rolling per-stage timings (seconds) and per-tick counters."""
+
+    def __init__(self, window):
+        self.window = max(2, int(window))
+        self.times = dict((s, RingBuffer(self.window)) for s in STAGES + ("total",))
+        self.counters = dict((c, RingBuffer(self.window)) for c in COUNTERS)
+        self._tick_counts = dict((c, 0) for c in COUNTERS)
+        self._t_start = 0.0
+        self._t_mark = 0.0
+        self.ticks = 0
+        self._last_log = 0.0
+        self._text = ""
+        self._text_t = 0.0
+
+    def begin_tick(self):
+        for name in COUNTERS:
+            self._tick_counts[name] = 0
+        self._t_start = self._t_mark = time.perf_counter()
+
+    def mark(self, stage):
+        t = time.perf_counter()
+        self.times[stage].append(self.ticks, t - self._t_mark)
+        self._t_mark = t
+
+    def count(self, name, n):
+        self._tick_counts[name] += n
+
+    def end_tick(self, now):
+        tick = self.ticks
+        self.times["total"].append(tick, self._t_mark - self._t_start)
+        for name in COUNTERS:
+            self.counters[name].append(tick, self._tick_counts[name])
+        self.ticks = tick + 1
+        interval = getattr(config, "PROFILE_LOG_INTERVAL_S", 10.0)
+        if interval > 0.0 and now - self._last_log >= interval:
+            if self._last_log > 0.0:
+                log(self.format_line())
+            self._last_log = now
+
+    def stats(self, stage):
+        """``(p50, p95, max)`` of a stage (or ``"total"``) in milliseconds."""
+        vals = sorted(_values(self.times[stage]))
+        if not vals:
+            return 0.0, 0.0, 0.0
+        return percentile(vals, 0.5) * 1e3, percentile(vals, 0.95) * 1e3, vals[-1] * 1e3
+
+    def counter_mean(self, name):
+        vals = _values(self.counters[name])
+        return sum(vals) / float(len(vals)) if vals else 0.0
+
+    def summary(self):
+        """``{stage: (p50, p95, max)}`` in ms, including ``"total"``."""
+        return dict((s, self.stats(s)) for s in STAGES + ("total",))
+
+    def format_line(self):
+        parts = []
+        for stage in STAGES + ("total",):
+            parts.append("{} {:.2f}/{:.2f}/{:.2f}".format(stage, *self.stats(stage)))
+        return "profile ms p50/p95/max: {} | per tick: cars {:.0f}, distance tests {:.0f}, timers {:.2f}".format(
+            ", ".join(parts), self.counter_mean("cars_scanned"), self.counter_mean("distance_tests"),
+            self.counter_mean("timers_fired"))
+
+    def ui_text(self, now):
+        """Short summary for the app window, refreshed at most once a second."""
+        if now - self._text_t >= 1.0 or not self._text:
+            self._text_t = now
+            worst = max(STAGES, key=lambda s: self.stats(s)[1])
+            _, p95, mx = self.stats("total")
+            self._text = "Tick p95 {:.2f} ms (max {:.2f}) | {} {:.2f}".format(
+                p95, mx, worst, self.stats(worst)[1])
+        return self._text
+
+
+_profiler = None
+
+
+def active():
+    """The profiler when ``PROFILE_STAGES`` is on, else None."""
+    global _profiler
+    if not getattr(config, "PROFILE_STAGES", False):
+        return None
+    if _profiler is None:
+        _profiler = StageProfiler(getattr(config, "PROFILE_WINDOW", 300))
+    return _profiler
+
+
+def reset(window=None):
+    """Start over with empty statistics (``window`` samples per stage)."""
+    global _profiler
+    if window is None:
+        window = getattr(config, "PROFILE_WINDOW", 300)
+    _profiler = StageProfiler(window)
+    return _profiler
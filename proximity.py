@@ -0,0 +1,147 @@
+"""Budgeted proximity scoring, refreshed incrementally across ticks.
+
+Scores are cached per car and refreshed round-robin, ``PROX_STEP_CARS``
+cars per tick, while a token bucket caps the neighbour tests at
+``MAX_DISTANCE_TESTS_PER_SEC``. Readers always get the last computed
+value, so the cost per tick stays bounded on full grids.
+
+With the gap model (``gaps.py``) a car is scored on time gaps along the
+track to the cars around it (within ``BATTLE_GAP_TIME``); without it, on
+XZ distances to grid neighbours (within ``PROX_RADIUS_M``), measured by
+the neighbour index for the cars of the slice only and charged as they are
+measured. The index's on-demand nearest-rival tests (detectors) come out
+of the same bucket on the next tick. The XZ pass also keeps each car's
+count of rivals within ``BATTLE_RADIUS_M`` for race intensity.
+"""
+
+from array import array
+
+from . import config
+from .gaps import current_gaps
+
+_scores = array("d")
+_budget = 0.0
+_last_t = 0.0
+_tests_last_tick = 0
+_close = array("l")  # rivals within BATTLE_RADIUS_M per car (XZ pass)
+_close_total = 0
+
+
+def _score_car(i, index):
+    # Returns (score, distance tests used, rivals within BATTLE_RADIUS_M)
+    found = index.measure_car(i)
+    ds = index.near_ds
+    R = config.PROX_RADIUS_M
+    battle = config.BATTLE_RADIUS_M
+    beta = config.BETA_NEAREST
+    K = config.PROX_K
+
+    nearest_term = 0.0
+    sum_extras = 0.0
+    k = 0
+    close = 0
+    for m in range(found):
+        d = ds[m]
+        if d < battle:
+            close += 1
+        if d > R or k >= K:
+            continue
+        if nearest_term < 1.0:
+            nearest_term = max(nearest_term, 1.0 - (d / R))
+        w = 1.0 / (1.0 + (d / R) * (d / R))
+        sum_extras += w
+        k += 1
+
+    if k == 0 and nearest_term == 0.0:
+        return 0.0, found, close
+    return beta * nearest_term + (1.0 - beta) * sum_extras, found, close
+
+
+def _set_close(i, close):
+    global _close_total
+    _close_total += close - _close[i]
+    _close[i] = close
+
+
+def _score_car_gaps(i, gm):
+    # Same shape as _score_car with time gaps in place of metres
+    horizon = config.BATTLE_GAP_TIME
+    beta = config.BETA_NEAREST
+    gaps, tests = gm.nearest_gaps(i, horizon, config.PROX_K)
+    if not gaps or horizon <= 0.0:
+        return 0.0, tests
+    nearest_term = 1.0 - gaps[0] / horizon
+    sum_extras = 0.0
+    for g in gaps:
+        r = g / horizon
+        sum_extras += 1.0 / (1.0 + r * r)
+    return beta * nearest_term + (1.0 - beta) * sum_extras, tests
+
+
+def update(st, index, now):
+    """Refresh the next slice of cached scores within the test budget."""
+    global _scores, _budget, _last_t, _tests_last_tick, _close, _close_total
+    n = st.car_count()
+    if len(_scores) != n:
+        _scores = array("d", [0.0]) * n
+        _close = array("l", [0]) * n
+        _close_total = 0
+    _tests_last_tick = 0
+    if n == 0:
+        _last_t = now
+        return
+
+    rate = float(config.MAX_DISTANCE_TESTS_PER_SEC)
+    dt = now - _last_t if _last_t > 0.0 else 0.0
+    _last_t = now
+    # Bank at most one second of tests so idle time cannot burst later
+    _budget = min(rate, _budget + rate * dt)
+
+    # Nearest-rival lookups the detectors made since the last tick
+    tests = index.take_tests()
+    _budget -= tests
+    _tests_last_tick = tests
+
+    gm = current_gaps(st)
+    step = min(n, max(1, int(config.PROX_STEP_CARS)))
+    start = st.prox_scan_index()
+    done = 0
+    while done < step and _budget > 0.0:
+        i = (start + done) % n
+        if gm is not None:
+            score, tests = _score_car_gaps(i, gm)
+        elif st.pos(i) is None:
+            score, tests = 0.0, 0
+            _set_close(i, 0)
+        else:
+            score, tests, close = _score_car(i, index)
+            index.take_tests()  # charged here, as measured
+            _set_close(i, close)
+        _scores[i] = score
+        # May go into debt for a crowded car; repaid on later ticks
+        _budget -= tests
+        _tests_last_tick += tests
+        done += 1
+    st.bump_prox_scan_index(done)
+
+
+def score(i):
+    """Last computed proximity score for car ``i``."""
+    if 0 <= i < len(_scores):
+        return _scores[i]
+    return 0.0
+
+
+def scores():
+    """Cached scores for the whole field (``array('d')`` by car id)."""
+    return _scores
+
+
+def close_pairs():
+    """Pairs of cars within ``BATTLE_RADIUS_M`` as of each car's last XZ
+    scoring (intensity's fallback without the gap model)."""
+    return _close_total / 2.0
+
+
+def tests_last_tick():
+    return _tests_last_tick
@@ -0,0 +1,44 @@
+"""Lap-aware race order built once per snapshot."""
+
+
+class RaceOrder(object):
+    """Running order of the field for one snapshot.
+
+    Cars are ranked by total progress (``lap + spline``) so the order stays
+    correct when the leader has crossed the line and the chasers have not.
+    ``order`` lists car ids front to back, ``position[c]`` is 1-based.
+    """
+
+    def __init__(self, st):
+        self.t = st.snapshot_time()
+        n = st.car_count()
+        self.count = n
+        ranks = [(st.lap(c) + st.spline(c), c) for c in range(n)]
+        ranks.sort(reverse=True)
+        self.order = [c for _, c in ranks]
+        self.position = [0] * n
+        for idx in range(n):
+            self.position[self.order[idx]] = idx + 1
+        self.leader = self.order[0] if n > 0 else -1
+
+    def position_of(self, car_id):
+        """1-based race position, or 0 for unknown cars."""
+        if 0 <= car_id < self.count:
+            return self.position[car_id]
+        return 0
+
+
+_order = None
+
+
+def refresh_order(st):
+    """Build the order for the current snapshot unless already cached."""
+    global _order
+    if _order is None or _order.t != st.snapshot_time() or _order.count != st.car_count():
+        _order = RaceOrder(st)
+    return _order
+
+
+def current_order(st):
+    """Order for the current snapshot (same cache as ``refresh_order``)."""
+    return refresh_order(st)
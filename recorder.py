@@ -0,0 +1,209 @@
+"""Compact append-only telemetry recording and memory-mapped replay.
+
+File layout (little endian):
+
+- header: magic ``b"ACTR"``, version, car record size, creation time,
+  track length (0 if unknown)
+- per tick: frame header (time, car count) followed by one fixed-size
+  record per car: position, speed, velocity, spline, lap, flags
+
+Records hold the snapshot exactly as the director saw it, so offline
+tools replay the same inputs the live detectors had.
+"""
+
+import mmap
+import os
+import struct
+import time
+
+from .snapshot import CarSnapshot
+
+MAGIC = b"ACTR"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHdd")
+FRAME = struct.Struct("<dI")
+CAR = struct.Struct("<3ff3ffiB")
+
+# CAR flags
+F_HAS_POS = 1
+F_HAS_VEL = 2
+F_PIT = 4
+F_PITLANE = 8
+F_SPEED_FRESH = 16  # speed read on this tick (entered the history)
+F_VEL_FRESH = 32    # velocity read on this tick (entered the history)
+
+
+class Recorder(object):
+    """Buffers snapshots in memory and writes them out in bulk.
+
+    A frame costs one ``struct.pack`` per car; the file is only touched
+    when the buffer passes ``flush_bytes``.
+    """
+
+    def __init__(self, path, track_length=0.0, flush_bytes=262144):
+        self.path = path
+        self.flush_bytes = int(flush_bytes)
+        self._buf = bytearray()
+        self._f = open(path, "wb")
+        self._f.write(HEADER.pack(MAGIC, VERSION, CAR.size, time.time(), float(track_length)))
+        self.frames = 0
+
+    def record(self, t, snap, n):
+        buf = self._buf
+        buf += FRAME.pack(t, n)
+        pack = CAR.pack
+        stamps = snap.t
+        t_speed = stamps["speed"]
+        t_vel = stamps["velocity"]
+        for i in range(n):
+            flags = 0
+            if snap.has_pos[i]:
+                flags |= F_HAS_POS
+            if snap.has_vel[i]:
+                flags |= F_HAS_VEL
+            if snap.pit[i]:
+                flags |= F_PIT
+            if snap.pitlane[i]:
+                flags |= F_PITLANE
+            if t_speed[i] == t:
+                flags |= F_SPEED_FRESH
+            if t_vel[i] == t:
+                flags |= F_VEL_FRESH
+            buf += pack(
+                snap.x[i], snap.y[i], snap.z[i], snap.speed[i],
+                snap.vx[i], snap.vy[i], snap.vz[i], snap.spline[i],
+                snap.lap[i], flags,
+            )
+        self.frames += 1
+        if len(buf) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._buf and self._f is not None:
+            self._f.write(self._buf)
+            del self._buf[:]
+
+    def close(self):
+        if self._f is None:
+            return
+        self.flush()
+        self._f.close()
+        self._f = None
+
+
+class ReplayReader(object):
+    """Memory-mapped reader yielding recorded snapshots lazily."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError("{}: not an ACTTV recording".format(path))
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, car_size, created, track_length = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION or car_size != CAR.size:
+            self.close()
+            raise ValueError("{}: unsupported recording (version {})".format(path, version))
+        self.created = created
+        self.track_length = track_length
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def buffer(self):
+        """The mapped file, for bulk readers (valid until ``close``)."""
+        return self._mm
+
+    def index(self):
+        """``[(t, offset)]`` for every complete frame, reading headers only.
+
+        A truncated trailing frame (recording cut short) is left out.
+        """
+        mm = self._mm
+        end = len(mm)
+        off = HEADER.size
+        out = []
+        while off + FRAME.size <= end:
+            t, n = FRAME.unpack_from(mm, off)
+            nxt = off + FRAME.size + n * CAR.size
+            if nxt > end:
+                break
+            out.append((t, off))
+            off = nxt
+        return out
+
+    def read_frame(self, offset, snap, fresh=None):
+        """Fill ``snap`` from the frame at ``offset``; returns ``(t, fresh)``.
+
+        ``fresh`` (a ``bytearray``, reallocated when the car count changes)
+        receives the per-car ``F_SPEED_FRESH``/``F_VEL_FRESH`` flags.
+        """
+        mm = self._mm
+        t, n = FRAME.unpack_from(mm, offset)
+        off = offset + FRAME.size
+        if snap.count != n:
+            snap.resize(n)
+        if fresh is None or len(fresh) != n:
+            fresh = bytearray(n)
+        unpack_car = CAR.unpack_from
+        car_size = CAR.size
+        for i in range(n):
+            (x, y, z, sp, vx, vy, vz, s, lap, flags) = unpack_car(mm, off)
+            off += car_size
+            snap.x[i] = x
+            snap.y[i] = y
+            snap.z[i] = z
+            snap.has_pos[i] = 1 if flags & F_HAS_POS else 0
+            snap.speed[i] = sp
+            snap.vx[i] = vx
+            snap.vy[i] = vy
+            snap.vz[i] = vz
+            snap.has_vel[i] = 1 if flags & F_HAS_VEL else 0
+            snap.spline[i] = s
+            snap.lap[i] = lap
+            snap.pit[i] = 1 if flags & F_PIT else 0
+            snap.pitlane[i] = 1 if flags & F_PITLANE else 0
+            fresh[i] = flags & (F_SPEED_FRESH | F_VEL_FRESH)
+        return t, fresh
+
+    def frames(self, snap=None):
+        """Yield ``(t, snapshot, fresh)`` for every recorded tick.
+
+        ``snapshot`` is one ``CarSnapshot`` refilled in place on every
+        step (pass ``snap`` to reuse your own); copy what must outlive the
+        iteration. ``fresh`` holds the per-car freshness flags (see
+        ``read_frame``).
+        """
+        mm = self._mm
+        end = len(mm)
+        off = HEADER.size
+        if snap is None:
+            snap = CarSnapshot()
+        fresh = None
+        while off + FRAME.size <= end:
+            n = FRAME.unpack_from(mm, off)[1]
+            nxt = off + FRAME.size + n * CAR.size
+            if nxt > end:
+                break
+            t, fresh = self.read_frame(off, snap, fresh)
+            off = nxt
+            yield t, snap, fresh
+
+    def __iter__(self):
+        return self.frames()
+
+
+def default_path(directory):
+    """New recording path in ``directory`` (created if needed)."""
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    name = time.strftime("acttv-%Y%m%d-%H%M%S.actr")
+    return os.path.join(directory, name)
@@ -0,0 +1,120 @@
+"""Fixed-capacity sample history backed by preallocated arrays."""
+
+from array import array
+
+
+class RingBuffer(object):
+    """Ring of ``(t, value)`` samples stored in two ``array('d')``.
+
+    Appending never allocates: once full, the oldest sample is overwritten.
+    Queries index samples backwards from the newest (``k = 0``).
+    """
+
+    __slots__ = ("capacity", "_t", "_v", "_head", "_len")
+
+    def __init__(self, capacity):
+        capacity = max(2, int(capacity))
+        self.capacity = capacity
+        self._t = array("d", [0.0]) * capacity
+        self._v = array("d", [0.0]) * capacity
+        self._head = 0  # slot of the next write
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def clear(self):
+        self._head = 0
+        self._len = 0
+
+    def append(self, t, value):
+        h = self._head
+        self._t[h] = t
+        self._v[h] = value
+        h += 1
+        if h == self.capacity:
+            h = 0
+        self._head = h
+        if self._len < self.capacity:
+            self._len += 1
+
+    def _slot(self, k):
+        idx = self._head - 1 - k
+        if idx < 0:
+            idx += self.capacity
+        return idx
+
+    def time_at(self, k):
+        """Timestamp of the sample ``k`` steps before the newest."""
+        return self._t[self._slot(k)]
+
+    def value_at(self, k):
+        """Value of the sample ``k`` steps before the newest."""
+        return self._v[self._slot(k)]
+
+    def latest(self):
+        if self._len == 0:
+            return 0.0
+        return self._v[self._slot(0)]
+
+    def latest_t(self):
+        if self._len == 0:
+            return 0.0
+        return self._t[self._slot(0)]
+
+    def index_at_age(self, age):
+        """Steps back to the newest sample at least ``age`` seconds old.
+
+        Falls back to the oldest stored sample when the history is shorter
+        than ``age``. Requires at least one sample.
+        """
+        t_now = self._t[self._slot(0)]
+        last = self._len - 1
+        for k in range(1, last):
+            if t_now - self._t[self._slot(k)] >= age:
+                return k
+        return last
+
+    def value_at_age(self, age):
+        if self._len == 0:
+            return 0.0
+        return self._v[self._slot(self.index_at_age(age))]
+
+    def _window_len(self, window):
+        # Samples no older than ``window`` seconds, newest always included
+        t_min = self._t[self._slot(0)] - window
+        k = 1
+        while k < self._len and self._t[self._slot(k)] >= t_min:
+            k += 1
+        return k
+
+    def min(self, window):
+        if self._len == 0:
+            return 0.0
+        m = self._window_len(window)
+        out = self._v[self._slot(0)]
+        for k in range(1, m):
+            v = self._v[self._slot(k)]
+            if v < out:
+                out = v
+        return out
+
+    def max(self, window):
+        if self._len == 0:
+            return 0.0
+        m = self._window_len(window)
+        out = self._v[self._slot(0)]
+        for k in range(1, m):
+            v = self._v[self._slot(k)]
+            if v > out:
+                out = v
+        return out
+
+    def mean(self, window):
+        if self._len == 0:
+            return 0.0
+        m = self._window_len(window)
+        s = 0.0
+        for k in range(m):
+            s += self._v[self._slot(k)]
+        return s / float(m)
@@ -1,15 +1,93 @@
-"""Scheduling utilities for natural dwell and event dwell."""
-
+"""Scheduling utilities for natural dwell and event dwell.
+
+Deadlines live in one timer heap keyed by name: ``"natural"`` (next
+natural cut), ``"unlock"`` (event dwell lock release), ``"ui"`` and
+``"intensity"`` (periodic refreshes). ``due(now)`` pops the timers whose
+deadline has passed, in deadline order (ties in the order they were set),
+and the director tick only runs the stages they name. Deadlines are only
+compared with the ``now`` passed in, so a headless run on the injected
+clock fires the same timers every time.
+"""
+
+import heapq
 import random
-import time
-import ac
 
-from . import config, state
+from . import clock, config, state
+from .logging_utils import debug, info
 
 
 _race_intensity = 0.0
-_lock_until = 0.0
-_next_natural_deadline = 0.0
+
+# Heap entries: [deadline, seq, name]; entries replaced by a later
+# schedule() or cancelled are left in the heap and skipped lazily.
+_timers = []
+_by_name = {}  # name -> current heap entry
+_seq = 0
+_fired = []
+
+
+def schedule(name, deadline):
+    """Set timer ``name`` to fire at ``deadline`` (replaces its previous one)."""
+    global _seq
+    _seq += 1
+    entry = [deadline, _seq, name]
+    _by_name[name] = entry
+    heapq.heappush(_timers, entry)
+    if len(_timers) > 2 * len(_by_name) + 16:
+        _compact()
+
+
+def cancel(name):
+    _by_name.pop(name, None)
+
+
+def deadline(name):
+    """Deadline of timer ``name``, or None if it is not set."""
+    entry = _by_name.get(name)
+    return entry[0] if entry is not None else None
+
+
+def _compact():
+    global _timers
+    _timers = [e for e in _timers if _by_name.get(e[2]) is e]
+    heapq.heapify(_timers)
+
+
+def next_due():
+    """Earliest pending deadline, or None."""
+    heap = _timers
+    while heap and _by_name.get(heap[0][2]) is not heap[0]:
+        heapq.heappop(heap)
+    return heap[0][0] if heap else None
+
+
+def due(now):
+    """Names of the timers due at ``now``, removed from the heap.
+
+    The returned list is reused by the next call.
+    """
+    fired = _fired
+    del fired[:]
+    heap = _timers
+    while heap and heap[0][0] <= now:
+        entry = heapq.heappop(heap)
+        name = entry[2]
+        if _by_name.get(name) is entry:
+            del _by_name[name]
+            fired.append(name)
+    return fired
+
+
+def every(name, now, hz):
+    """Re-arm periodic timer ``name`` for its next slot after ``now``."""
+    period = 1.0 / max(0.001, hz)
+    schedule(name, now + period)
+
+
+def clear():
+    global _timers
+    _timers = []
+    _by_name.clear()
 
 
 def _natural_interval():
@@ -50,8 +128,6 @@ def on_switch(now, reason):
 
     reason: "natural" or event type (collision/spin/offtrack/pit_entry)
     """
-    global _lock_until, _next_natural_deadline
-
     # Program event dwell lock
     dwell = 0.0
     if reason == "collision":
@@ -66,50 +142,49 @@ def on_switch(now, reason):
         dwell = 0.0
 
     if dwell > 0.0:
-        _lock_until = now + dwell
-    else:
-        # No event lock
-        if _lock_until < now:
-            _lock_until = 0.0
+        schedule("unlock", now + dwell)
 
     # Always schedule a natural deadline after a switch
     interval = _natural_interval()
-    _next_natural_deadline = now + interval
-    try:
-        ac.log("[{}] on_switch: reason={} lock_until={:.1f} next_natural+{:.1f}s".format(
-            config.APP_NAME, reason, _lock_until, interval
-        ))
-    except Exception:
-        pass
+    schedule("natural", now + interval)
+    info("on_switch: reason={} lock_until={:.1f}", reason, lock_until())
+    debug("on_switch: next_natural+{:.1f}s", interval)
 
-    state.next_switch_time = _next_natural_deadline
+    state.next_switch_time = now + interval
 
 
 def should_natural_switch(now):
-    return now >= _next_natural_deadline
+    return now >= next_natural_deadline()
 
 
 def next_natural_deadline():
-    return _next_natural_deadline
+    d = deadline("natural")
+    return d if d is not None else 0.0
 
 
 def lock_until():
-    return _lock_until
+    d = deadline("unlock")
+    return d if d is not None else 0.0
 
 
 def is_locked(now):
-    return now < _lock_until
+    return now < lock_until()
 
 
 def schedule_next_switch(now=None):
     """Compatibility helper for existing UI button logic."""
     if now is None:
-        now = time.time()
+        now = clock.now()
     interval = _natural_interval()
-    global _next_natural_deadline
-    _next_natural_deadline = now + interval
-    state.next_switch_time = _next_natural_deadline
-    try:
-        ac.log("[{}] Next natural switch in {:.1f}s".format(config.APP_NAME, interval))
-    except Exception:
-        pass
+    schedule("natural", now + interval)
+    state.next_switch_time = now + interval
+    debug("Next natural switch in {:.1f}s", interval)
+
+
+def resume(now=None):
+    """Restart natural cuts and re-check queued events after a pause."""
+    if now is None:
+        now = clock.now()
+    schedule_next_switch(now)
+    # Queued events are shown on the first tick the lock allows
+    schedule("unlock", max(now, lock_until()))
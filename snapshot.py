@@ -0,0 +1,83 @@
+"""Struct-of-arrays storage for the per-car live snapshot."""
+
+from array import array
+
+# Field groups a snapshot can read; see config.SNAPSHOT_FIELDS
+ALL_FIELDS = ("pos", "speed", "velocity", "spline", "lap", "pit")
+
+
+def _zeros(typecode, n):
+    return array(typecode, [0]) * n
+
+
+class CarSnapshot(object):
+    """Contiguous per-car telemetry for one tick.
+
+    Floats live in ``array('d')`` columns indexed by car id, pit flags and
+    validity markers in ``bytearray``s. ``t[field][i]`` is the time the
+    field group was last read for car ``i``. Consumers that work on the whole
+    field can read the columns directly instead of going through
+    ``state.pos`` / ``state.speed_kmh``.
+    """
+
+    __slots__ = (
+        "count",
+        "x", "y", "z", "has_pos",
+        "speed",
+        "vx", "vy", "vz", "has_vel",
+        "spline",
+        "lap",
+        "pit", "pitlane",
+        "t",
+    )
+
+    def __init__(self, n=0):
+        self.count = 0
+        self.resize(n)
+
+    def resize(self, n):
+        """Reallocate every column for ``n`` cars (contents reset)."""
+        self.count = n
+        self.x = _zeros("d", n)
+        self.y = _zeros("d", n)
+        self.z = _zeros("d", n)
+        self.has_pos = bytearray(n)
+        self.speed = _zeros("d", n)
+        self.vx = _zeros("d", n)
+        self.vy = _zeros("d", n)
+        self.vz = _zeros("d", n)
+        self.has_vel = bytearray(n)
+        self.spline = _zeros("d", n)
+        self.lap = _zeros("l", n)
+        self.pit = bytearray(n)
+        self.pitlane = bytearray(n)
+        # Sample time per field group and car (0 = never read)
+        self.t = dict((f, _zeros("d", n)) for f in ALL_FIELDS)
+
+    def pos(self, i):
+        if self.has_pos[i]:
+            return (self.x[i], self.y[i], self.z[i])
+        return None
+
+    def velocity(self, i):
+        if self.has_vel[i]:
+            return (self.vx[i], self.vy[i], self.vz[i])
+        return None
+
+    def set_pos(self, i, p):
+        if p is None:
+            self.has_pos[i] = 0
+            return
+        self.x[i] = p[0]
+        self.y[i] = p[1]
+        self.z[i] = p[2]
+        self.has_pos[i] = 1
+
+    def set_velocity(self, i, v):
+        if v is None:
+            self.has_vel[i] = 0
+            return
+        self.vx[i] = v[0]
+        self.vy[i] = v[1]
+        self.vz[i] = v[2]
+        self.has_vel[i] = 1
@@ -1,43 +1,486 @@
-"""Spatial grid for efficient neighbor queries in XZ-plane."""
-
-def _cell_index(x, z, cell):
-    try:
-        ix = int(x // cell)
-        iz = int(z // cell)
-        return ix, iz
-    except Exception:
-        return 0, 0
-
-
-def build_grid(state, cell_size_m):
-    grid = {"_cell": float(cell_size_m)}
-    n = state.car_count()
-    for i in range(n):
-        p = state.pos(i)
-        if p is None:
-            continue
-        ix, iz = _cell_index(p[0], p[2], cell_size_m)
-        key = (ix, iz)
-        bucket = grid.get(key)
-        if bucket is None:
-            bucket = []
-            grid[key] = bucket
-        bucket.append(i)
-    return grid
-
-
-def neighbors_of(car_id, pos, grid):
-    if pos is None:
-        return []
-    # own cell + 8 adjacent
-    cell = grid.get("_cell", 1.0)
-    ix, iz = _cell_index(pos[0], pos[2], cell)
-    out = []
-    for dx in (-1, 0, 1):
-        for dz in (-1, 0, 1):
-            bucket = grid.get((ix + dx, iz + dz))
-            if bucket:
-                for j in bucket:
-                    if j != car_id:
-                        out.append(j)
-    return out
+"""Neighbour index shared by detectors, proximity and intensity.
+
+Two backends fill the same per-snapshot structure (measured pairs, nearest
+rival, neighbour candidates): an XZ grid (``SPATIAL_BACKEND = "grid"``)
+and a spline-sorted array of the cars along the track (``"spline"``).
+Each backend keeps one index whose flat lists are rebuilt in place every
+snapshot (sized for the largest field seen), and neighbour visits fill a
+caller-owned buffer instead of returning new lists.
+
+A rebuild only sorts the cars; distances are measured on demand, one car
+at a time (``measure_car``: proximity's slice, ``nearest`` for detectors),
+or all pairs at once with ``measure_pairs`` (benchmarks). Every distance
+test is counted in ``tests`` for proximity's budget to charge.
+"""
+
+import math
+from bisect import bisect_left
+
+from . import config
+
+# Distance reported for cars without any rival in the surrounding cells
+NO_NEIGHBOR_M = 1e9
+
+# Cell (ix, iz) has id ix * _STRIDE + iz, so sorting cars by id orders the
+# cells by row and the three cells of a neighbouring row are consecutive ids
+_STRIDE = 1 << 32
+
+
+def lap_window(window_m, track_length):
+    """``window_m`` as a lap fraction, below half a lap so no pair is seen
+    twice; without a track length the window spans the whole lap."""
+    if track_length > 0.0:
+        return min(0.49, window_m / track_length)
+    return 0.49
+
+
+def _grow(arr, n, fill):
+    # Make a list at least n long, keeping its contents
+    if len(arr) < n:
+        arr.extend([fill] * (n - len(arr)))
+
+
+class _PairIndex(object):
+    # Shared storage of the neighbour backends: pairs measured by
+    # measure_pairs are kept in flat lists (pair_i, pair_j, pair_d), `pairs`
+    # of them; measure_car leaves one car's rivals in near_ids/near_ds
+
+    def __init__(self):
+        self.t = None
+        self.count = 0
+        self.nearest_d = []
+        self.nearest_id = []
+        self.pair_i = []
+        self.pair_j = []
+        self.pair_d = []
+        self.pairs = 0
+        self.measured = False  # all pairs of this snapshot measured
+        self.near_ids = []
+        self.near_ds = []
+        self.tests = 0  # distance tests not yet taken by take_tests
+        self._near_done = []
+        self._xs = None
+        self._zs = None
+        self._far = []
+        self._none = []
+        self._zeros = []
+
+    def _reset(self, st):
+        self.t = st.snapshot_time()
+        n = st.car_count()
+        self.count = n
+        self.pairs = 0
+        self.measured = False
+        _grow(self.nearest_d, n, NO_NEIGHBOR_M)
+        _grow(self.nearest_id, n, -1)
+        _grow(self._near_done, n, 0)
+        # Room for every pair, so measuring never resizes
+        most = n * (n - 1) // 2
+        _grow(self.pair_i, most, 0)
+        _grow(self.pair_j, most, 0)
+        _grow(self.pair_d, most, 0.0)
+        _grow(self.near_ids, n, 0)
+        _grow(self.near_ds, n, 0.0)
+        if len(self._far) != n:
+            # Reset templates, copied over the live lists every snapshot
+            self._far = [NO_NEIGHBOR_M] * n
+            self._none = [-1] * n
+            self._zeros = [0] * n
+        self.nearest_d[:n] = self._far
+        self.nearest_id[:n] = self._none
+        self._near_done[:n] = self._zeros
+        snap = st.snapshot()
+        self._xs = snap.x
+        self._zs = snap.z
+
+    def measure_pairs(self):
+        """Measure every neighbour pair of the snapshot (once per snapshot).
+
+        Fills the pair lists and every car's nearest rival; returns the
+        number of pairs.
+        """
+        if self.measured:
+            return self.pairs
+        n = self.count
+        self.nearest_d[:n] = self._far
+        self.nearest_id[:n] = self._none
+        self.pairs = 0
+        self._measure_pairs(self._xs, self._zs)
+        self.tests += self.pairs
+        self.measured = True
+        return self.pairs
+
+    def measure_car(self, i):
+        """Measure car ``i`` against its neighbour candidates.
+
+        Leaves the rivals and distances in ``near_ids``/``near_ds``, sets
+        the car's nearest rival and returns how many were measured.
+        """
+        ids = self.near_ids
+        ds = self.near_ds
+        found = self.gather(i, ids)
+        xs = self._xs
+        zs = self._zs
+        x = xs[i]
+        z = zs[i]
+        best = NO_NEIGHBOR_M
+        best_id = -1
+        for m in range(found):
+            j = ids[m]
+            dx = x - xs[j]
+            dz = z - zs[j]
+            d = math.sqrt(dx * dx + dz * dz)
+            ds[m] = d
+            if d < best:
+                best = d
+                best_id = j
+        self.nearest_d[i] = best
+        self.nearest_id[i] = best_id
+        self._near_done[i] = 1
+        self.tests += found
+        return found
+
+    def take_tests(self):
+        """Distance tests done since the last call."""
+        tests = self.tests
+        self.tests = 0
+        return tests
+
+    def _add_pair(self, xs, zs, i, j):
+        dx = xs[i] - xs[j]
+        dz = zs[i] - zs[j]
+        d = math.sqrt(dx * dx + dz * dz)
+        k = self.pairs
+        self.pair_i[k] = i
+        self.pair_j[k] = j
+        self.pair_d[k] = d
+        self.pairs = k + 1
+        if d < self.nearest_d[i]:
+            self.nearest_d[i] = d
+            self.nearest_id[i] = j
+        if d < self.nearest_d[j]:
+            self.nearest_d[j] = d
+            self.nearest_id[j] = i
+
+    def nearest(self, i):
+        """Distance to the closest rival, or ``NO_NEIGHBOR_M``."""
+        if not 0 <= i < self.count:
+            return NO_NEIGHBOR_M
+        if not (self.measured or self._near_done[i]):
+            self.measure_car(i)
+        return self.nearest_d[i]
+
+
+class SpatialIndex(_PairIndex):
+    """Cars grouped by XZ cell in flat lists.
+
+    ``cars`` lists the cars with a position sorted by cell id; the cell
+    ``c`` holds ``cars[cell_start[c]:cell_start[c + 1]]`` and has id
+    ``cell_ids[c]``, and ``cell_of[i]`` is car ``i``'s cell (-1 without a
+    position). ``measure_pairs`` measures every pair of cars sharing a
+    3x3 cell neighbourhood once.
+    """
+
+    backend = "grid"
+
+    def __init__(self, cell_size_m):
+        _PairIndex.__init__(self)
+        self.cell = float(cell_size_m)
+        self.ids = []         # cell id per car
+        self.cell_of = []
+        self.cars = []
+        self.cell_ids = []
+        self.cell_start = []  # cells + 1 offsets into `cars`
+        self.cells = 0
+
+    def rebuild(self, st):
+        """Re-sort the current snapshot's cars by cell."""
+        self._reset(st)
+        n = self.count
+        _grow(self.ids, n, 0)
+        _grow(self.cell_of, n, -1)
+        _grow(self.cell_ids, n, 0)
+        _grow(self.cell_start, n + 1, 0)
+
+        snap = st.snapshot()
+        xs = snap.x
+        zs = snap.z
+        has_pos = snap.has_pos
+        cell = self.cell
+        ids = self.ids
+        cell_of = self.cell_of
+        cars = self.cars
+        del cars[:]
+        cell_of[:n] = self._none
+        for i in range(n):
+            if has_pos[i]:
+                try:
+                    ids[i] = int(xs[i] // cell) * _STRIDE + int(zs[i] // cell)
+                except (ValueError, OverflowError):
+                    continue  # NaN/inf position
+                cars.append(i)
+        cars.sort(key=ids.__getitem__)
+
+        # Runs of equal ids are the occupied cells
+        cell_ids = self.cell_ids
+        cell_start = self.cell_start
+        cells = -1
+        last = None
+        for k in range(len(cars)):
+            i = cars[k]
+            key = ids[i]
+            if key != last:
+                cells += 1
+                cell_ids[cells] = key
+                cell_start[cells] = k
+                last = key
+            cell_of[i] = cells
+        cells += 1
+        cell_start[cells] = len(cars)
+        self.cells = cells
+        return self
+
+    def _row(self, key, lo):
+        # (first, last + 1) cells with ids key - 1 .. key + 1, from cell lo
+        cell_ids = self.cell_ids
+        cells = self.cells
+        first = bisect_left(cell_ids, key - 1, lo, cells)
+        end = first
+        while end < cells and cell_ids[end] <= key + 1:
+            end += 1
+        return first, end
+
+    def _measure_pairs(self, xs, zs):
+        cars = self.cars
+        cell_ids = self.cell_ids
+        cell_start = self.cell_start
+        cells = self.cells
+        nearest_d = self.nearest_d
+        nearest_id = self.nearest_id
+        pair_i = self.pair_i
+        pair_j = self.pair_j
+        pair_d = self.pair_d
+        sqrt = math.sqrt
+        k = 0
+        r = 0  # first cell of the next row's three, found by a moving scan
+        for c in range(cells):
+            s = cell_start[c]
+            e = cell_start[c + 1]
+            key = cell_ids[c]
+            # The forward half of the neighbourhood: the cell itself (later
+            # cars only), the next cell in the row and three in the next row
+            hi = e
+            if c + 1 < cells and cell_ids[c + 1] == key + 1:
+                hi = cell_start[c + 2]
+            low = key + _STRIDE - 1
+            if r <= c:
+                r = c + 1
+            while r < cells and cell_ids[r] < low:
+                r += 1
+            up = r
+            while up < cells and cell_ids[up] <= low + 2:
+                up += 1
+            row_s = cell_start[r]
+            row_e = cell_start[up]
+            if hi - s < 2 and row_s == row_e:
+                continue  # a lone car with nobody ahead
+            for a in range(s, e):
+                i = cars[a]
+                x = xs[i]
+                z = zs[i]
+                # Two runs of cars: [a + 1, hi) in this row, then the next row's
+                lo = a + 1
+                end = hi
+                while True:
+                    for b in range(lo, end):
+                        j = cars[b]
+                        dx = x - xs[j]
+                        dz = z - zs[j]
+                        d = sqrt(dx * dx + dz * dz)
+                        pair_i[k] = i
+                        pair_j[k] = j
+                        pair_d[k] = d
+                        k += 1
+                        if d < nearest_d[i]:
+                            nearest_d[i] = d
+                            nearest_id[i] = j
+                        if d < nearest_d[j]:
+                            nearest_d[j] = d
+                            nearest_id[j] = i
+                    if end == row_e or row_s == row_e:
+                        break
+                    lo = row_s
+                    end = row_e
+        self.pairs = k
+
+    def gather(self, i, out):
+        """Write the ids of cars in the 3x3 cells around car ``i`` (itself
+        excluded) to ``out`` and return how many; ``out`` holds at least
+        ``count`` ids."""
+        c = self.cell_of[i] if 0 <= i < self.count else -1
+        if c < 0:
+            return 0
+        cars = self.cars
+        cell_start = self.cell_start
+        key = self.cell_ids[c]
+        m = 0
+        for row in (key - _STRIDE, key, key + _STRIDE):
+            first, end = self._row(row, 0)
+            for b in range(cell_start[first], cell_start[end]):
+                j = cars[b]
+                if j != i:
+                    out[m] = j
+                    m += 1
+        return m
+
+
+class SplineIndex(_PairIndex):
+    """Neighbours along the track instead of in XZ cells.
+
+    Cars with a position are sorted by spline once per snapshot; each car's
+    neighbours are the index window of cars ahead of it within ``window_m``
+    along the lap (wrapping at the line), so no cells are hashed. Pairs in
+    the window are measured in XZ like the grid's, and ``nearest`` means
+    the same. Cars close in XZ but far apart on the lap (parallel
+    straights, hairpins) are not paired.
+    """
+
+    backend = "spline"
+
+    def __init__(self, cell_size_m, window_m):
+        _PairIndex.__init__(self)
+        self.cell = float(cell_size_m)
+        self.window_m = float(window_m)
+        self.window = 0.0
+        self.order = []
+        self.splines = []
+        self.slot = []  # sorted slot per car, -1 without position
+
+    def rebuild(self, st):
+        """Re-sort the current snapshot's cars along the track."""
+        self._reset(st)
+        n = self.count
+        snap = st.snapshot()
+        splines = snap.spline
+        has_pos = snap.has_pos
+        order = self.order
+        order[:] = [c for c in range(n) if has_pos[c]]
+        order.sort(key=splines.__getitem__)
+        m = len(order)
+        _grow(self.splines, m, 0.0)
+        _grow(self.slot, n, -1)
+        sorted_splines = self.splines
+        slot = self.slot
+        slot[:n] = self._none
+        for k in range(m):
+            c = order[k]
+            sorted_splines[k] = splines[c]
+            slot[c] = k
+        self.window = lap_window(self.window_m, st.track_length())
+        return self
+
+    def _measure_pairs(self, xs, zs):
+        order = self.order
+        m = len(order)
+        for a in range(m):
+            i = order[a]
+            b, count = self.window_of(a)
+            for _ in range(count):
+                self._add_pair(xs, zs, i, order[b])
+                b += 1
+                if b == m:
+                    b = 0
+
+    def window_of(self, slot):
+        """``(first, count)``: the ``count`` sorted slots from ``first``
+        (wrapping) are the cars ahead of ``slot`` within the window."""
+        splines = self.splines
+        window = self.window
+        m = len(self.order)
+        s_a = splines[slot]
+        first = slot + 1 if slot + 1 < m else 0
+        b = first
+        count = 0
+        while count < m - 1:
+            gap = splines[b] - s_a
+            if gap < 0.0:
+                gap += 1.0
+            if gap > window:
+                break
+            count += 1
+            b += 1
+            if b == m:
+                b = 0
+        return first, count
+
+    def gather(self, i, out):
+        """Write the ids of cars within the window ahead of and behind car
+        ``i`` to ``out`` and return how many."""
+        a = self.slot[i] if 0 <= i < self.count else -1
+        if a < 0:
+            return 0
+        order = self.order
+        splines = self.splines
+        window = self.window
+        m = len(order)
+        b, count = self.window_of(a)
+        for k in range(count):
+            out[k] = order[b]
+            b += 1
+            if b == m:
+                b = 0
+        s_a = splines[a]
+        b = a
+        while count < m - 1:
+            b = b - 1 if b > 0 else m - 1
+            gap = s_a - splines[b]
+            if gap < 0.0:
+                gap += 1.0
+            if gap > window or order[b] == order[a]:
+                break
+            out[count] = order[b]
+            count += 1
+        return count
+
+
+def _backend(st):
+    # SPATIAL_BACKEND, falling back to the grid without a track length
+    if getattr(config, "SPATIAL_BACKEND", "grid") == "spline" and st.track_length() > 0.0:
+        return "spline"
+    return "grid"
+
+
+def build_index(st, cell_size_m, backend=None):
+    """A new neighbour index for the current snapshot."""
+    if backend is None:
+        backend = _backend(st)
+    if backend == "spline":
+        index = SplineIndex(cell_size_m, getattr(config, "SPLINE_WINDOW_M", 30.0))
+    else:
+        index = SpatialIndex(cell_size_m)
+    return index.rebuild(st)
+
+
+_indexes = {}  # backend -> index reused across snapshots
+_index = None
+
+
+def refresh_index(st, cell_size_m):
+    """Rebuild the index in place for the current snapshot unless current."""
+    global _index
+    backend = _backend(st)
+    index = _indexes.get(backend)
+    if (index is None or index.cell != float(cell_size_m)
+            or (backend == "spline"
+                and index.window_m != float(getattr(config, "SPLINE_WINDOW_M", 30.0)))):
+        index = build_index(st, cell_size_m, backend)
+        _indexes[backend] = index
+    elif index.t != st.snapshot_time() or index.count != st.car_count():
+        index.rebuild(st)
+    _index = index
+    return index
+
+
+def current_index(st):
+    """Index for the current snapshot (rebuilt with ``CELL_SIZE_M`` if stale)."""
+    return refresh_index(st, config.CELL_SIZE_M)
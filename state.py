@@ -1,14 +1,22 @@
 """Shared state and live snapshot buffers for ACTTV."""
 
+import math
+import os
 import time
 import ac
 import acsys
 
+from . import config
+from .ringbuf import RingBuffer
+from .snapshot import CarSnapshot, ALL_FIELDS
+from . import recorder
+
 # --- UI / state ---
 app_window = None
 status_label = None
 camera_label = None
 focus_label = None
+profile_label = None
 toggle_button = None
 force_tv_button = None
 force_tv_status_label = None
@@ -23,124 +31,445 @@ start_leader_done = False
 _last_update_t = 0.0
 _car_count = 0
 
-_pos = []           # (x, y, z)
-_speed_kmh = []     # float
-_vel = []           # (vx, vy, vz) or None
-_spline = []        # float
-_lap = []           # int
-_in_pit = []        # bool
-_in_pitlane = []    # bool
-
-# ring buffers short (store last 10)
-_speed_hist = []    # list[list[(t, speed_kmh)]]
-_yaw_hist = []      # list[list[(t, yaw_rate)]]
+_snap = CarSnapshot()  # struct-of-arrays: pos, speed, velocity, spline, lap, pit flags
+
+# fixed-capacity histories (config.HISTORY_SAMPLES samples per car)
+_speed_hist = []    # list[RingBuffer(t, speed_kmh)]
+_yaw_hist = []      # list[RingBuffer(t, |yaw_rate|)]
 _last_heading = []  # last heading radians (-pi..pi)
+_last_heading_t = []  # velocity sample time of _last_heading (0 = none yet)
 
 # focus bookkeeping
 _last_focused_at = []  # timestamps per car
 _unseen_set = set()    # car ids that never got focus yet
+_focus_version = 0     # bumped on every change to the two above
+
+# staggered polling: per-field round-robin cursor and fractional credit
+_poll_cursor = {}
+_poll_credit = {}
+_poll_full = True
+# Fields read in the slice of another one: lap + spline is one progress
+# value, and a lap read out of step with its spline jumps a lap at the line.
+_POLL_WITH = {"lap": "spline"}
 
 # stepping for proximity
 _prox_scan_index = 0
 
+# pit tracking: phase per car from the pit flags, edge-triggered
+PIT_OUT = 0   # on track
+PIT_LANE = 1  # driving in the pit lane
+PIT_BOX = 2   # stopped in the pit box
+_pit_phase = bytearray()
+_pit_known = 0           # cars whose previous phase is valid
+_pit_changed_at = []     # time of each car's last transition
+_pit_lane_since = []     # time the car entered the pit lane (0 = on track)
+_pit_box_since = []      # time the car stopped in the box (0 = not stopped)
+_pit_last_stop_s = []    # duration of the car's last box stop
+_pit_transitions = []    # (car, kind, duration) this tick, by car id
+_pit_version = 0         # bumped on every transition
+
+# track length in metres, read lazily (None = not read yet)
+_track_length = None
+
+# telemetry recording (config.RECORD_TELEMETRY)
+_recorder = None
+_recorder_failed = False
+
 
 def car_count():
     return _car_count
 
 
+def snapshot_time():
+    return _last_update_t
+
+
+def snapshot():
+    """Raw per-car columns (see ``snapshot.CarSnapshot``)."""
+    return _snap
+
+
 def active(i):
-    try:
-        if _speed_kmh[i] is None:
-            return False
-        if ac.isCarInPit(i) == 1:
-            return False
-        if _speed_kmh[i] < 1.0:
-            return False
-        return True
-    except Exception:
+    if not (0 <= i < _car_count):
+        return False
+    if _snap.pit[i]:
         return False
+    if _snap.speed[i] < 1.0:
+        return False
+    return True
 
 
 def pos(i):
     if 0 <= i < _car_count:
-        return _pos[i]
+        return _snap.pos(i)
+    return None
+
+
+def velocity(i):
+    if 0 <= i < _car_count:
+        return _snap.velocity(i)
     return None
 
 
 def speed_kmh(i):
     if 0 <= i < _car_count:
-        return _speed_kmh[i]
+        return _snap.speed[i]
     return 0.0
 
 
 def spline(i):
     if 0 <= i < _car_count:
-        return _spline[i]
+        return _snap.spline[i]
     return 0.0
 
 
-def update_snapshot(now):
-    global _last_update_t, _car_count, _prox_scan_index
-    _last_update_t = now
-    n = ac.getCarsCount()
-    if n != _car_count:
-        _resize(n)
-    _car_count = n
+def lap(i):
+    if 0 <= i < _car_count:
+        return _snap.lap[i]
+    return 0
 
+
+def in_pit(i):
+    if 0 <= i < _car_count:
+        return _snap.pit[i] != 0
+    return False
+
+
+def in_pitlane(i):
+    if 0 <= i < _car_count:
+        return _snap.pitlane[i] != 0
+    return False
+
+
+def pit_phase(i):
+    """``PIT_OUT``, ``PIT_LANE`` or ``PIT_BOX`` as of the last pit flag read."""
+    if 0 <= i < _pit_known:
+        return _pit_phase[i]
+    return PIT_OUT
+
+
+def pit_changed_at():
+    """Time of each car's last pit transition (0.0 = none), by car id."""
+    return _pit_changed_at
+
+
+def last_pit_stop(i):
+    """Duration in seconds of car ``i``'s last completed box stop (0.0 = none)."""
+    if 0 <= i < _pit_known:
+        return _pit_last_stop_s[i]
+    return 0.0
+
+
+def pit_transitions():
+    """Pit transitions of the last snapshot as ``(car, kind, duration)``.
+
+    Kinds: ``"entry"`` (into the pit lane), ``"stop"`` (into the box),
+    ``"release"`` (out of the box, duration of the stop) and ``"exit"``
+    (back on track, time spent in the pit lane). Each fires once, on the
+    snapshot that first reads the changed flags; the list is reused.
+    """
+    return _pit_transitions
+
+
+def pit_version():
+    return _pit_version
+
+
+def _update_pit(n, now):
+    # Compare every car's pit phase with the previous snapshot's
+    global _pit_known, _pit_version
+    del _pit_transitions[:]
+    pit = _snap.pit
+    pitlane = _snap.pitlane
+    phases = _pit_phase
     for i in range(n):
+        phase = PIT_BOX if pit[i] else (PIT_LANE if pitlane[i] else PIT_OUT)
+        if i >= _pit_known:
+            # First sight of this car: its current phase is not an edge
+            phases[i] = phase
+            _pit_changed_at[i] = 0.0
+            _pit_lane_since[i] = 0.0
+            _pit_box_since[i] = 0.0
+            _pit_last_stop_s[i] = 0.0
+            continue
+        prev = phases[i]
+        if phase == prev:
+            continue
+        phases[i] = phase
+        if prev == PIT_OUT:
+            _pit_lane_since[i] = now
+            _pit_transitions.append((i, "entry", 0.0))
+        elif prev == PIT_BOX:
+            stop = now - _pit_box_since[i] if _pit_box_since[i] > 0.0 else 0.0
+            _pit_box_since[i] = 0.0
+            _pit_last_stop_s[i] = stop
+            _pit_transitions.append((i, "release", stop))
+        if phase == PIT_BOX:
+            _pit_box_since[i] = now
+            _pit_transitions.append((i, "stop", 0.0))
+        elif phase == PIT_OUT:
+            lane = now - _pit_lane_since[i] if _pit_lane_since[i] > 0.0 else 0.0
+            _pit_lane_since[i] = 0.0
+            _pit_transitions.append((i, "exit", lane))
+        _pit_changed_at[i] = now
+        _pit_version += 1
+    _pit_known = n
+
+
+def _pitlane_reader():
+    # Older AC uses a different name; resolve once
+    fn = getattr(ac, "isCarInPitlane", None)
+    if fn is None:
+        fn = getattr(ac, "isCarInPitLane", None)
+    return fn
+
+
+def _read_car(i, fields, get, cs, pitlane_fn):
+    # Fast path: one guarded block for every requested field of the car
+    snap = _snap
+    if "pos" in fields:
+        snap.set_pos(i, get(i, cs.WorldPosition))
+    if "speed" in fields:
+        snap.speed[i] = get(i, cs.SpeedKMH)
+    if "velocity" in fields:
+        snap.set_velocity(i, get(i, cs.Velocity))
+    if "spline" in fields:
+        snap.spline[i] = get(i, cs.NormalizedSplinePosition)
+    if "lap" in fields:
+        snap.lap[i] = int(get(i, cs.LapCount))
+    if "pit" in fields:
+        snap.pit[i] = 1 if ac.isCarInPit(i) == 1 else 0
+        snap.pitlane[i] = 1 if (pitlane_fn is not None and pitlane_fn(i) == 1) else 0
+
+
+def _read_car_guarded(i, fields, get, cs, pitlane_fn):
+    # Slow path after a failed read: isolate the failing field
+    snap = _snap
+    if "pos" in fields:
         try:
-            p = ac.getCarState(i, acsys.CS.WorldPosition)
+            snap.set_pos(i, get(i, cs.WorldPosition))
         except Exception:
-            p = None
+            snap.set_pos(i, None)
+    if "speed" in fields:
         try:
-            sp = ac.getCarState(i, acsys.CS.SpeedKMH)
+            snap.speed[i] = get(i, cs.SpeedKMH)
         except Exception:
-            sp = 0.0
+            snap.speed[i] = 0.0
+    if "velocity" in fields:
         try:
-            v = ac.getCarState(i, acsys.CS.Velocity)
+            snap.set_velocity(i, get(i, cs.Velocity))
         except Exception:
-            v = None
+            snap.set_velocity(i, None)
+    if "spline" in fields:
         try:
-            s = ac.getCarState(i, acsys.CS.NormalizedSplinePosition)
+            snap.spline[i] = get(i, cs.NormalizedSplinePosition)
         except Exception:
-            s = 0.0
+            snap.spline[i] = 0.0
+    if "lap" in fields:
         try:
-            lap = ac.getCarState(i, acsys.CS.LapCount)
+            snap.lap[i] = int(get(i, cs.LapCount))
         except Exception:
-            lap = 0
+            snap.lap[i] = 0
+    if "pit" in fields:
         try:
-            pit = ac.isCarInPit(i) == 1
+            snap.pit[i] = 1 if ac.isCarInPit(i) == 1 else 0
         except Exception:
-            pit = False
+            snap.pit[i] = 0
         try:
-            pitl = ac.isCarInPitlane(i) == 1
+            snap.pitlane[i] = 1 if (pitlane_fn is not None and pitlane_fn(i) == 1) else 0
         except Exception:
-            # Older AC uses different name; fall back to false if not found
-            try:
-                pitl = ac.isCarInPitLane(i) == 1
-            except Exception:
-                pitl = False
-
-        _pos[i] = p
-        _speed_kmh[i] = sp
-        _vel[i] = v
-        _spline[i] = s
-        _lap[i] = lap
-        _in_pit[i] = pit
-        _in_pitlane[i] = pitl
-
-        _update_ring_buffers(i, now)
+            snap.pitlane[i] = 0
 
-    if not _unseen_set and n > 0 and all(t > 0.0 for t in _last_focused_at[:n]) is False:
-        # Initialize unseen set once at start
-        _unseen_set.update(range(n))
+
+def _read(i, fields, now, get, cs, pitlane_fn):
+    try:
+        _read_car(i, fields, get, cs, pitlane_fn)
+    except Exception:
+        _read_car_guarded(i, fields, get, cs, pitlane_fn)
+    stamps = _snap.t
+    for f in fields:
+        stamps[f][i] = now
+
+
+def _poll_hz(field):
+    rates = getattr(config, "SNAPSHOT_POLL_HZ", None) or {}
+    return rates.get(field, 0.0)
+
+
+def _poll_plan(fields):
+    """Split ``fields`` into those read every tick and staggered groups.
+
+    Returns ``(every, staggered)``; each staggered entry is ``(field, hz,
+    group)`` with ``group`` the fields read together in ``field``'s slice.
+    Fields in ``_POLL_WITH`` share their leader's slice at the faster rate.
+    """
+    rate = dict((f, _poll_hz(f)) for f in fields)
+    for f, lead in _POLL_WITH.items():
+        if f in rate and lead in rate:
+            lo = min(rate[f], rate[lead])
+            rate[f] = rate[lead] = max(rate[f], rate[lead]) if lo > 0.0 else 0.0
+    every = tuple(f for f in fields if rate[f] <= 0.0)
+    staggered = []
+    for f in fields:
+        if rate[f] <= 0.0 or _POLL_WITH.get(f) in rate:
+            continue
+        group = (f,) + tuple(g for g in fields if _POLL_WITH.get(g) == f)
+        staggered.append((f, rate[f], group))
+    return every, staggered
+
+
+def _staggered_slice(field, n, dt, hz):
+    """Advance the round-robin cursor of a rate-limited field.
+
+    Returns ``(start, count)``: the cars to refresh this tick so every car
+    is read ``hz`` times per second on average; ``(0, 0)`` with no cars.
+    """
+    if n <= 0:
+        return 0, 0
+    credit = _poll_credit.get(field, 0.0) + n * hz * dt
+    if credit > n:
+        credit = float(n)
+    count = int(credit)
+    _poll_credit[field] = credit - count
+    start = _poll_cursor.get(field, 0) % n
+    _poll_cursor[field] = (start + count) % n
+    return start, count
+
+
+def update_snapshot(now):
+    global _last_update_t, _car_count, _prox_scan_index, _poll_full
+    dt = now - _last_update_t if _last_update_t > 0.0 else 0.0
+    _last_update_t = now
+    n = ac.getCarsCount()
+    if n != _car_count:
+        _resize(n)
+    _car_count = n
+
+    fields = getattr(config, "SNAPSHOT_FIELDS", None) or ALL_FIELDS
+    get = ac.getCarState
+    cs = acsys.CS
+    pitlane_fn = _pitlane_reader()
+
+    if _poll_full:
+        # First tick after a resize: read everything once
+        every = fields
+        staggered = ()
+        _poll_full = False
+    else:
+        every, staggered = _poll_plan(fields)
+
+    if every:
+        for i in range(n):
+            _read(i, every, now, get, cs, pitlane_fn)
+    for f, hz, group in staggered:
+        start, count = _staggered_slice(f, n, dt, hz)
+        for k in range(count):
+            _read((start + k) % n, group, now, get, cs, pitlane_fn)
+
+    stamps = _snap.t
+    for i in range(n):
+        _update_ring_buffers(i, now, stamps["speed"][i], stamps["velocity"][i])
+
+    _update_pit(n, now)
+
+    if _recorder is not None or (config.RECORD_TELEMETRY and not _recorder_failed):
+        _record(now, n)
+
+    _init_unseen(n)
 
     # wrap scan index
     if _prox_scan_index >= n:
         _prox_scan_index = 0
 
 
+def _init_unseen(n):
+    global _focus_version
+    if not _unseen_set and n > 0 and all(t > 0.0 for t in _last_focused_at[:n]) is False:
+        # Initialize unseen set once at start
+        _unseen_set.update(range(n))
+        _focus_version += 1
+
+
+def apply_snapshot(now, snap, fresh=None):
+    """Install a ready-made snapshot (e.g. from a recording) for this tick.
+
+    Replaces the AC reads of ``update_snapshot``: columns are copied from
+    ``snap`` and histories updated as if the fields had been read at
+    ``now``. ``fresh`` holds per-car ``recorder.F_SPEED_FRESH`` /
+    ``F_VEL_FRESH`` flags; ``None`` treats every field as fresh.
+    """
+    global _last_update_t, _car_count
+    _last_update_t = now
+    n = snap.count
+    if n != _car_count:
+        _resize(n)
+    _car_count = n
+    for name in ("x", "y", "z", "speed", "vx", "vy", "vz", "spline", "lap"):
+        getattr(_snap, name)[:] = getattr(snap, name)
+    _snap.has_pos[:] = snap.has_pos
+    _snap.has_vel[:] = snap.has_vel
+    _snap.pit[:] = snap.pit
+    _snap.pitlane[:] = snap.pitlane
+    for i in range(n):
+        if fresh is None:
+            t_speed = t_vel = now
+        else:
+            t_speed = now if fresh[i] & recorder.F_SPEED_FRESH else 0.0
+            t_vel = now if fresh[i] & recorder.F_VEL_FRESH else 0.0
+        _update_ring_buffers(i, now, t_speed, t_vel)
+
+    _update_pit(n, now)
+    _init_unseen(n)
+
+
+def _record(now, n):
+    global _recorder_failed
+    try:
+        if _recorder is None:
+            start_recording()
+        _recorder.record(now, _snap, n)
+    except Exception as ex:
+        # Never let recording break the director; give up for the session
+        _recorder_failed = True
+        ac.log("[{}] Telemetry recording disabled: {}".format(config.APP_NAME, ex))
+        stop_recording()
+
+
+def track_length():
+    """Track length in metres from AC (read once), or 0.0 if unknown."""
+    global _track_length
+    if _track_length is None:
+        try:
+            _track_length = max(0.0, float(ac.getTrackLength(0)))
+        except Exception:
+            _track_length = 0.0
+    return _track_length
+
+
+def start_recording(path=None):
+    """Stream every snapshot to ``path`` (default: a new file in RECORD_DIR)."""
+    global _recorder
+    stop_recording()
+    if path is None:
+        directory = config.RECORD_DIR or os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+        path = recorder.default_path(directory)
+    _recorder = recorder.Recorder(path, track_length(), config.RECORD_FLUSH_BYTES)
+    ac.log("[{}] Recording telemetry to {}".format(config.APP_NAME, path))
+    return path
+
+
+def stop_recording():
+    global _recorder
+    if _recorder is None:
+        return
+    try:
+        _recorder.close()
+    finally:
+        _recorder = None
+
+
 def _resize(n):
+    global _poll_full, _pit_known
     # Resize all arrays to size n
     def grow(arr, fill):
         while len(arr) < n:
@@ -148,57 +477,69 @@ def _resize(n):
         while len(arr) > n:
             arr.pop()
 
-    grow(_pos, None)
-    grow(_speed_kmh, 0.0)
-    grow(_vel, None)
-    grow(_spline, 0.0)
-    grow(_lap, 0)
-    grow(_in_pit, False)
-    grow(_in_pitlane, False)
+    _snap.resize(n)
 
-    grow(_speed_hist, [])
-    grow(_yaw_hist, [])
+    # One buffer per car; each slot needs its own instance
+    cap = getattr(config, "HISTORY_SAMPLES", 10)
+    while len(_speed_hist) < n:
+        _speed_hist.append(RingBuffer(cap))
+        _yaw_hist.append(RingBuffer(cap))
+    del _speed_hist[n:]
+    del _yaw_hist[n:]
     grow(_last_heading, 0.0)
+    grow(_last_heading_t, 0.0)
     grow(_last_focused_at, 0.0)
-
-
-def _update_ring_buffers(i, now):
-    # Speed history
-    sh = _speed_hist[i]
-    if sh is None:
-        sh = []
-        _speed_hist[i] = sh
-    sh.append((now, _speed_kmh[i]))
-    if len(sh) > 10:
-        del sh[0:len(sh) - 10]
+    grow(_pit_changed_at, 0.0)
+    grow(_pit_lane_since, 0.0)
+    grow(_pit_box_since, 0.0)
+    grow(_pit_last_stop_s, 0.0)
+    del _pit_phase[n:]
+    _pit_phase.extend(bytearray(n - len(_pit_phase)))
+    # Cars that stay keep their pit phase; new ones are primed on first sight
+    _pit_known = min(_pit_known, n)
+
+    # Restart staggered polling with a full read
+    _poll_cursor.clear()
+    _poll_credit.clear()
+    _poll_full = True
+
+
+def heading_rate(heading, prev_heading, dt):
+    """Absolute yaw rate (rad/s) between two headings ``dt`` seconds apart."""
+    # unwrap small angle diff
+    diff = heading - prev_heading
+    while diff > math.pi:
+        diff -= 2.0 * math.pi
+    while diff < -math.pi:
+        diff += 2.0 * math.pi
+    if dt <= 0.0:
+        dt = 0.016
+    return abs(diff) / dt
+
+
+def _update_ring_buffers(i, now, t_speed, t_vel):
+    # Only fields refreshed this tick are appended, stamped with their own
+    # sample time so windowed rates stay correct under staggered polling.
+    if t_speed == now:
+        _speed_hist[i].append(t_speed, _snap.speed[i])
+    if t_vel != now:
+        return
 
     # Heading and yaw-rate from velocity (XZ plane)
     try:
-        v = _vel[i]
-        if v is not None:
-            vx, vy, vz = v
+        if _snap.has_vel[i]:
+            vx = _snap.vx[i]
+            vz = _snap.vz[i]
             if vx != 0.0 or vz != 0.0:
-                import math
-
                 heading = math.atan2(vz, vx)
-                prev = _last_heading[i]
-                dt = 0.0
-                if prev is None:
+                prev_t = _last_heading_t[i]
+                if prev_t <= 0.0:
                     yaw_rate = 0.0
                 else:
-                    # unwrap small angle diff
-                    diff = heading - prev
-                    while diff > math.pi:
-                        diff -= 2.0 * math.pi
-                    while diff < -math.pi:
-                        diff += 2.0 * math.pi
-                    # estimate dt from last speed sample
-                    if len(_speed_hist[i]) >= 2:
-                        dt = _speed_hist[i][-1][0] - _speed_hist[i][-2][0]
-                    if dt <= 0.0:
-                        dt = 0.016
-                    yaw_rate = abs(diff) / dt
+                    # dt between the two velocity samples
+                    yaw_rate = heading_rate(heading, _last_heading[i], t_vel - prev_t)
                 _last_heading[i] = heading
+                _last_heading_t[i] = t_vel
             else:
                 yaw_rate = 0.0
         else:
@@ -206,18 +547,13 @@ def _update_ring_buffers(i, now):
     except Exception:
         yaw_rate = 0.0
 
-    yh = _yaw_hist[i]
-    if yh is None:
-        yh = []
-        _yaw_hist[i] = yh
-    yh.append((now, yaw_rate))
-    if len(yh) > 10:
-        del yh[0:len(yh) - 10]
+    _yaw_hist[i].append(t_vel, yaw_rate)
 
 
 def set_current_focus(i, now):
-    global _current_car_id
+    global _current_car_id, _focus_version
     _current_car_id = i
+    _focus_version += 1
     if 0 <= i < len(_last_focused_at):
         _last_focused_at[i] = now
     mark_seen(i)
@@ -242,24 +578,44 @@ def last_focused_at(i):
     return 0.0
 
 
+def focus_version():
+    """Changes whenever focus times or the unseen set change."""
+    return _focus_version
+
+
+def focus_times():
+    """Last focus time of every car by car id (0.0 = never)."""
+    return _last_focused_at
+
+
 def unseen_set():
     return set(_unseen_set)
 
 
 def mark_seen(i):
+    global _focus_version
     try:
         if i in _unseen_set:
             _unseen_set.discard(i)
+            _focus_version += 1
     except Exception:
         pass
 
 
+_EMPTY_HIST = RingBuffer(2)
+
+
+def histories():
+    """``(speed_hists, yaw_hists)``: every car's ``RingBuffer``s by car id."""
+    return _speed_hist, _yaw_hist
+
+
 def speed_hist(i):
-    return _speed_hist[i] if 0 <= i < len(_speed_hist) else []
+    return _speed_hist[i] if 0 <= i < len(_speed_hist) else _EMPTY_HIST
 
 
 def yaw_hist(i):
-    return _yaw_hist[i] if 0 <= i < len(_yaw_hist) else []
+    return _yaw_hist[i] if 0 <= i < len(_yaw_hist) else _EMPTY_HIST
 
 
 def prox_scan_index():
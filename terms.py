@@ -0,0 +1,224 @@
+"""Registry of interest scoring terms.
+
+A term fills one column (``array('d')`` by car id) that ``interest`` adds
+to the score with the term's weight. Each term declares the inputs it
+reads and a refresh period; ``refresh`` recomputes a column only when one
+of its inputs changed since the last computation and, for inputs that
+change continuously (positions, splines, pit flags, clock), once its
+period has elapsed. Discrete inputs (focus, events, pit transitions)
+trigger a refresh on the next tick. Periods can be overridden per term with ``TERM_PERIODS``.
+
+New terms are added with ``register`` and never touch the scoring loop.
+"""
+
+from array import array
+
+from . import config, proximity
+from .race_order import current_order
+
+# Input name -> True if it changes continuously (rate-limited by the period)
+INPUTS = {
+    "positions": True,
+    "splines": True,
+    "pit": True,
+    "clock": True,
+    "focus": False,
+    "events": False,
+    "pit_transitions": False,
+}
+
+
+class ScoringTerm(object):
+    """One weighted column of the interest score.
+
+    ``compute(st, now, n, out)`` writes the term's value for every car into
+    ``out``. ``weight`` names the config weight; ``sign`` is -1.0 for
+    penalties.
+    """
+
+    __slots__ = ("name", "compute", "weight", "sign", "inputs", "period",
+                 "column", "t", "seen")
+
+    def __init__(self, name, compute, weight, inputs, period=0.0, sign=1.0):
+        for name_in in inputs:
+            if name_in not in INPUTS:
+                raise ValueError("unknown term input: {}".format(name_in))
+        self.name = name
+        self.compute = compute
+        self.weight = weight
+        self.sign = sign
+        self.inputs = tuple(inputs)
+        self.period = period
+        self.column = array("d")
+        self.t = 0.0
+        self.seen = None
+
+    def weight_value(self):
+        return self.sign * getattr(config, self.weight, 0.0)
+
+    def due(self, now, versions):
+        seen = self.seen
+        if seen is None:
+            return True
+        period = getattr(config, "TERM_PERIODS", {}).get(self.name, self.period)
+        elapsed = now - self.t >= period
+        for k in range(len(self.inputs)):
+            name = self.inputs[k]
+            if versions[name] != seen[k] and (elapsed or not INPUTS[name]):
+                return True
+        return False
+
+
+_terms = []
+_count = -1         # car count the columns are sized for
+_refreshed_at = None
+_event_version = 0
+_recomputed_last_tick = 0
+
+
+def register(term):
+    """Add ``term`` to the score (after the ones already registered)."""
+    for k in range(len(_terms)):
+        if _terms[k].name == term.name:
+            _terms[k] = term
+            break
+    else:
+        _terms.append(term)
+    term.seen = None
+    return term
+
+
+def terms():
+    return list(_terms)
+
+
+def note_events(count):
+    """Detector events were emitted (input ``"events"``)."""
+    global _event_version
+    if count > 0:
+        _event_version += 1
+
+
+def refresh(st, now):
+    """Recompute the columns that are due; once per director tick."""
+    global _count, _refreshed_at, _recomputed_last_tick
+    n = st.car_count()
+    if n == _count and now == _refreshed_at:
+        return
+    if n != _count:
+        for term in _terms:
+            term.column = array("d", [0.0]) * n
+            term.seen = None
+        _count = n
+    _refreshed_at = now
+    snap_t = st.snapshot_time()
+    versions = {
+        "positions": snap_t,
+        "splines": snap_t,
+        "pit": snap_t,
+        "clock": now,
+        "focus": st.focus_version(),
+        "events": _event_version,
+        "pit_transitions": st.pit_version(),
+    }
+    recomputed = 0
+    for term in _terms:
+        if term.due(now, versions):
+            if n > 0:
+                term.compute(st, now, n, term.column)
+            term.t = now
+            term.seen = tuple(versions[name] for name in term.inputs)
+            recomputed += 1
+    _recomputed_last_tick = recomputed
+
+
+def weighted():
+    """``[(weight, column)]`` in registration order."""
+    return [(term.weight_value(), term.column) for term in _terms]
+
+
+def recomputed_last_tick():
+    return _recomputed_last_tick
+
+
+def _clamp(x, a, b):
+    if x < a:
+        return a
+    if x > b:
+        return b
+    return x
+
+
+# --- built-in terms ---
+
+def _proximity(st, now, n, out):
+    # Cached, budgeted scores from proximity.update
+    prox = proximity.scores()
+    if len(prox) == n:
+        out[:] = prox
+    else:
+        for c in range(n):
+            out[c] = proximity.score(c)
+
+
+def _leader_moment(st, now, n, out):
+    # Field position from the lap-aware race order, boosted at the
+    # start/finish of the lap
+    position = current_order(st).position
+    splines = st.snapshot().spline
+    start_w = config.LEADER_START_WINDOW
+    end_w = config.LEADER_END_WINDOW
+    tail_from = 1.0 - end_w
+    fn = float(n)
+    for c in range(n):
+        progress = splines[c]
+        envelope = 1.0
+        if progress <= start_w:
+            envelope = progress / start_w if start_w > 0.0 else 1.0
+        elif progress >= tail_from:
+            envelope = (1.0 - progress) / end_w if end_w > 0.0 else 1.0
+        out[c] = float(n - position[c] + 1) / fn * envelope
+
+
+def _rarity(st, now, n, out):
+    # Grows with time since last focus
+    focused = st.focus_times()
+    full_after = max(15.0, 0.5 * config.DWELL_BASE * max(1, n))
+    for c in range(n):
+        last = focused[c]
+        since = now - last if last > 0.0 else 1e9
+        out[c] = _clamp(since / full_after, 0.0, 1.0)
+
+
+def _hysteresis(st, now, n, out):
+    # Holds the current/very recent focus against choppy flips
+    focused = st.focus_times()
+    window = config.HYSTERESIS_WINDOW
+    for c in range(n):
+        last = focused[c]
+        out[c] = 1.0 if last > 0.0 and (now - last) < window else 0.0
+
+
+def _pit_cameo(st, now, n, out):
+    # Fades from the car's last pit transition (state's pit tracker): into
+    # the lane, out of the box after a stop, back on track
+    changed = st.pit_changed_at()
+    fade = config.PIT_CAMEO_S
+    for c in range(n):
+        since = now - changed[c]
+        out[c] = 1.0 - since / fade if changed[c] > 0.0 and since < fade else 0.0
+
+
+def _unseen(st, now, n, out):
+    # Cars that never had the focus
+    unseen = st.unseen_set()
+    for c in range(n):
+        out[c] = 1.0 if c in unseen else 0.0
+
+
+register(ScoringTerm("proximity", _proximity, "W_PROX", ("positions",), period=0.2))
+register(ScoringTerm("leader", _leader_moment, "W_LEADER", ("splines",), period=0.1))
+register(ScoringTerm("rarity", _rarity, "W_RARITY", ("focus", "clock"), period=0.5))
+register(ScoringTerm("hysteresis", _hysteresis, "W_HYST", ("focus", "clock"), period=0.25, sign=-1.0))
+register(ScoringTerm("pit", _pit_cameo, "W_PIT", ("pit_transitions", "clock"), period=0.25))
+register(ScoringTerm("unseen", _unseen, "UNSEEN_BONUS", ("focus",)))
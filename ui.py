@@ -1,10 +1,9 @@
 """User interface helpers for the ACTTV app."""
 
-import time
 import ac
 
-from . import config, state
-from .scheduler import schedule_next_switch, get_race_intensity
+from . import candidates, clock, config, state, profiler
+from .scheduler import resume, get_race_intensity
 
 # ctypes may not be available in AC's embedded Python; load lazily and guard
 try:
@@ -24,7 +23,7 @@ def ctypes_available():
 
 def update_ui():
     """Refresh labels and button text."""
-    now = time.time()
+    now = clock.now()
     remaining = state.next_switch_time - now
     if remaining < 0.0:
         remaining = 0.0
@@ -40,6 +39,10 @@ def update_ui():
     if getattr(state, "force_tv_button", None) is not None:
         ac.setText(state.force_tv_button, "Force TV cam")
 
+    prof = profiler.active()
+    if prof is not None and getattr(state, "profile_label", None) is not None:
+        ac.setText(state.profile_label, prof.ui_text(now))
+
     # Focus info: current car id and reason
     if getattr(state, "focus_label", None) is not None:
         car_id = state.current_focus()
@@ -47,7 +50,11 @@ def update_ui():
         if car_id is None or car_id < 0:
             ac.setText(state.focus_label, "Focus: — | Reason: —")
         else:
-            ac.setText(state.focus_label, "Focus: car {} | Reason: {}".format(car_id, reason or ""))
+            text = "Focus: car {} | Reason: {}".format(car_id, reason or "")
+            next_car = candidates.next_up(state)
+            if next_car >= 0:
+                text += " | Next: car {}".format(next_car)
+            ac.setText(state.focus_label, text)
 
 
 def toggle_callback(*args):
@@ -55,7 +62,7 @@ def toggle_callback(*args):
     state.enabled = not state.enabled
     ac.log("[{}] Button pressed. Now: {}".format(config.APP_NAME, "enabled" if state.enabled else "paused"))
     if state.enabled:
-        schedule_next_switch()
+        resume()
     update_ui()
 
 